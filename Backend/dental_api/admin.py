@@ -0,0 +1,63 @@
+"""
+Utilidades compartidas del admin para tablas grandes.
+
+Incluye:
+- estimated_row_count: Filas estimadas de una tabla según las estadísticas de la BD
+- EstimatedCountPaginator: Paginador que evita COUNT(*) sobre tablas enormes
+- LargeTableAdminMixin: Paginador estimado y sin el segundo COUNT(*) del total
+
+El listado del admin hace un COUNT(*) de los resultados filtrados y otro de
+toda la tabla ("99 resultados (1.000.000 en total)"). Con millones de ventas
+ambos recorren la tabla completa en cada página.
+"""
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_row_count(model, using='default'):
+    """
+    Número aproximado de filas de la tabla del modelo, o None si la base de
+    datos no lo ofrece (SQLite no guarda estimaciones sin ANALYZE).
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # reltuples vale -1 si la tabla nunca se analizó
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Usa la estimación de la BD para el total de un listado sin filtros cuando
+    la tabla supera ADMIN_ESTIMATED_COUNT_THRESHOLD filas; en otro caso
+    (filtros, búsqueda, tablas pequeñas) hace el COUNT(*) exacto.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class LargeTableAdminMixin:
+    """
+    Mixin para ModelAdmin de tablas que crecen sin límite (ventas, gastos,
+    productos): total estimado y sin el COUNT(*) de la tabla completa.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
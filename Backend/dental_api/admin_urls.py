@@ -0,0 +1,10 @@
+"""
+URLs del admin, importadas la primera vez que se resuelve una ruta /admin/
+(o al hacer reverse() de cualquier ruta). Ver dental_api/apps.py.
+"""
+from django.contrib import admin
+
+admin.autodiscover()
+
+app_name = 'admin'
+urlpatterns = admin.site.get_urls()
@@ -0,0 +1,28 @@
+"""
+Configuración del admin con carga diferida.
+
+Incluye:
+- LazyAdminConfig: Admin sin autodiscover() en ready()
+- check_admin_app_discovered: Checks del admin con los admin.py ya importados
+
+Los admin.py de las apps (y con ellos formularios, widgets y el registro de
+cada ModelAdmin) se importan al resolver la primera URL /admin/ (ver
+dental_api/admin_urls.py), no al arrancar: un worker que solo sirve la API
+y los comandos de manage.py no pagan ese costo.
+"""
+from django.contrib.admin import autodiscover
+from django.contrib.admin.apps import SimpleAdminConfig
+from django.contrib.admin.checks import check_admin_app, check_dependencies
+from django.core import checks
+
+
+def check_admin_app_discovered(app_configs, **kwargs):
+    """check_admin_app necesita los ModelAdmin registrados para validarlos."""
+    autodiscover()
+    return check_admin_app(app_configs, **kwargs)
+
+
+class LazyAdminConfig(SimpleAdminConfig):
+    def ready(self):
+        checks.register(check_dependencies, checks.Tags.admin)
+        checks.register(check_admin_app_discovered, checks.Tags.admin)
@@ -0,0 +1,78 @@
+"""
+Listados sin serializadores para páginas grandes (POS, exportación estática).
+
+Incluye:
+- FastListMixin: Activa el modo rápido con ?fast=true en la acción list
+- decimal_str / DATETIME: Formato idéntico al de los campos de DRF
+- media_url_builder: URLs absolutas de media calculando el prefijo una sola vez
+
+Con PAGE_SIZE 12 el coste de DRF es tolerable; con page_size de 100–500 el
+SerializerMethodField, build_absolute_uri y las properties por objeto dominan.
+Las vistas que usan el mixin construyen las filas a partir de tuplas de
+values_list() y deben producir exactamente la misma salida que su serializador.
+"""
+from decimal import Decimal
+
+from django.core.files.storage import default_storage
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+from rest_framework.response import Response
+
+
+CENT = Decimal('0.01')
+
+# Una sola instancia: to_representation no depende del binding del campo
+DATETIME = serializers.DateTimeField()
+
+
+def decimal_str(value):
+    """Igual que DecimalField(decimal_places=2).to_representation (None -> None)."""
+    if value is None:
+        return None
+    return f'{value.quantize(CENT):f}'
+
+
+def media_url_builder(request):
+    """
+    Devuelve una función `nombre_archivo -> URL` equivalente a
+    request.build_absolute_uri(field.url), pero resolviendo el prefijo
+    (esquema, host y MEDIA_URL) una sola vez por respuesta.
+    """
+    base_url = default_storage.base_url
+    prefix = request.build_absolute_uri(base_url) if request is not None else base_url
+
+    def build(name):
+        if not name:
+            return None
+        return prefix + filepath_to_uri(name).lstrip('/')
+
+    return build
+
+
+class FastListMixin:
+    """
+    Modo de listado sin serializadores (?fast=true).
+
+    Las subclases implementan:
+    - fast_values(queryset): queryset con .values_list() de todo lo necesario
+    - fast_rows(tuples): lista de dicts idéntica a la del serializador
+    """
+
+    def is_fast_list(self):
+        return self.request.query_params.get('fast', '').lower() == 'true'
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_fast_list():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.fast_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.fast_rows(page))
+        return Response(self.fast_rows(list(queryset)))
+
+    def fast_values(self, queryset):
+        raise NotImplementedError
+
+    def fast_rows(self, tuples):
+        raise NotImplementedError
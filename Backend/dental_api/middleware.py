@@ -0,0 +1,142 @@
+"""
+Middleware propio del proyecto.
+
+Incluye:
+- QueryInspectorMiddleware: Detector de N+1 para desarrollo (opcional)
+- CompressionMiddleware: Compresión gzip/brotli negociada para respuestas JSON
+"""
+import gzip
+import logging
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .queries import QueryInspector
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se negocia gzip
+    brotli = None
+
+
+logger = logging.getLogger('dental_api.queries')
+
+
+class QueryInspectorMiddleware:
+    """
+    Cuenta las consultas SQL de cada petición y avisa de patrones N+1.
+
+    Se activa con DJANGO_QUERY_INSPECTOR=True (ver settings.py). Añade la
+    cabecera `X-Query-Count` a la respuesta y registra un warning cuando una
+    misma forma de SQL se repite QUERY_INSPECTOR_THRESHOLD veces o más.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = settings.QUERY_INSPECTOR_THRESHOLD
+
+    def __call__(self, request):
+        with QueryInspector() as inspector:
+            response = self.get_response(request)
+
+        response['X-Query-Count'] = str(inspector.count)
+        if inspector.repeated(self.threshold):
+            logger.warning(
+                "Posible N+1 en %s %s (%d consultas):\n%s",
+                request.method,
+                request.path,
+                inspector.count,
+                inspector.report(self.threshold),
+            )
+        return response
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """
+    Convierte `Accept-Encoding` en {codificación: q}.
+
+    Ej: "br;q=1.0, gzip;q=0.8, *;q=0" -> {'br': 1.0, 'gzip': 0.8, '*': 0.0}
+    """
+    encodings = {}
+    for part in header.split(','):
+        token, _, params = part.partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[token] = quality
+    return encodings
+
+
+class CompressionMiddleware:
+    """
+    Comprime respuestas JSON grandes con brotli o gzip según `Accept-Encoding`.
+
+    A diferencia de GZipMiddleware de Django, solo actúa sobre JSON (los
+    estáticos ya salen comprimidos por WhiteNoise), respeta los valores q del
+    cliente, prefiere brotli cuando está instalado y no toca respuestas
+    menores a COMPRESSION_MIN_SIZE bytes ni respuestas en streaming (SSE).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.gzip_level = settings.COMPRESSION_GZIP_LEVEL
+        self.brotli_quality = settings.COMPRESSION_BROTLI_QUALITY
+        self.available = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith('application/json')
+        ):
+            return response
+
+        # La representación varía según Accept-Encoding aunque esta respuesta
+        # concreta no se comprima (cachés intermedias / CDN)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < self.min_size:
+            return response
+
+        encoding = self.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed = self.compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        # Un ETag fuerte deja de ser válido al cambiar los bytes (RFC 9110 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+    def negotiate(self, header: str):
+        """Mejor codificación disponible aceptada por el cliente (o None)."""
+        accepted = parse_accept_encoding(header)
+        wildcard = accepted.get('*', 0.0)
+        best, best_quality = None, 0.0
+        for encoding in self.available:  # en orden de preferencia
+            quality = accepted.get(encoding, wildcard)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def compress(self, content: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(content, quality=self.brotli_quality)
+        return gzip.compress(content, compresslevel=self.gzip_level, mtime=0)
@@ -0,0 +1,18 @@
+"""
+Paginación de la API.
+
+Incluye:
+- StandardPagination: PAGE_SIZE por defecto, ajustable con ?page_size= (máx. 500)
+"""
+from rest_framework.pagination import PageNumberPagination
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    Paginación por número de página.
+
+    El catálogo usa el PAGE_SIZE de settings (12); el POS y la exportación
+    estática piden páginas grandes con ?page_size=100..500.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
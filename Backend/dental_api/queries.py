@@ -0,0 +1,89 @@
+"""
+Inspección de consultas SQL por petición.
+
+Incluye:
+- sql_shape: Normaliza una sentencia SQL a su "forma" (sin valores concretos)
+- QueryInspector: Registra las consultas ejecutadas y detecta patrones N+1
+
+Un patrón N+1 aparece como la misma forma de SQL repetida muchas veces dentro
+de una sola petición (ej: `obj.images.count()` por cada fila de un listado).
+Se usa desde los tests (ver dental_api/testing.py) y, opcionalmente, desde
+QueryInspectorMiddleware durante el desarrollo.
+"""
+import re
+from collections import Counter
+
+from django.db import connections
+
+
+# Número de repeticiones de una misma forma de SQL a partir del cual se
+# considera un patrón N+1. El admin repite legítimamente algún COUNT(*),
+# por eso no se usa 2.
+DEFAULT_REPEAT_THRESHOLD = 5
+
+_IN_CLAUSE = re.compile(r'IN \((?:%s, )*%s\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def sql_shape(sql: str) -> str:
+    """
+    Devuelve la forma normalizada de una sentencia SQL.
+
+    Django envía los parámetros por separado (placeholders %s), así que basta
+    con colapsar los espacios y las listas `IN (%s, %s, ...)` de longitud variable.
+    """
+    shape = _WHITESPACE.sub(' ', sql).strip()
+    return _IN_CLAUSE.sub('IN (...)', shape)
+
+
+class QueryInspector:
+    """
+    Context manager que registra todas las consultas ejecutadas en una conexión.
+
+    Uso:
+        with QueryInspector() as inspector:
+            client.get('/api/products/')
+        inspector.count          -> número total de consultas
+        inspector.repeated()     -> {forma_sql: repeticiones} sospechosas de N+1
+    """
+
+    def __init__(self, using: str = 'default'):
+        self.using = using
+        self.queries = []
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql_shape(sql))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.queries = []
+        self._wrapper = connections[self.using].execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._wrapper.__exit__(exc_type, exc_value, traceback)
+        self._wrapper = None
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    def repeated(self, threshold: int = DEFAULT_REPEAT_THRESHOLD) -> dict:
+        """Formas de SQL que se repiten `threshold` veces o más."""
+        return {
+            shape: times
+            for shape, times in Counter(self.queries).items()
+            if times >= threshold
+        }
+
+    def report(self, threshold: int = DEFAULT_REPEAT_THRESHOLD) -> str:
+        """Resumen legible de las repeticiones (para logs y mensajes de test)."""
+        lines = [
+            f"  {times}x {shape}"
+            for shape, times in sorted(
+                self.repeated(threshold).items(), key=lambda item: -item[1]
+            )
+        ]
+        return '\n'.join(lines)
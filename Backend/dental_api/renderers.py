@@ -0,0 +1,52 @@
+"""
+Renderers de la API.
+
+Incluye:
+- ORJSONRenderer: JSONRenderer de DRF acelerado con orjson (opcional)
+
+Se activa con DJANGO_FAST_JSON=True (ver settings.py). La salida es idéntica
+byte a byte a la de JSONRenderer: los tipos que orjson serializaría con otro
+formato (datetime, Decimal, lazy strings...) se delegan al encoder de DRF.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el renderer estándar
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renderer JSON con orjson.
+
+    Cae al JSONRenderer estándar cuando orjson no está instalado, cuando el
+    cliente pide indentación (?format=json con `indent=`) o cuando la
+    configuración de DRF no es la compacta/unicode por defecto.
+    """
+    _encoder = JSONEncoder()
+
+    if orjson is not None:
+        # Los datetime pasan por `default` para conservar el formato de DRF
+        # ("Z" en vez de "+00:00"); las claves no-string se convierten como en json.
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self._encoder.default, option=self.options)
+
+        # Igual que DRF: escapar U+2028/U+2029 para que el JSON sea JavaScript válido
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -8,6 +8,8 @@ Incluye configuración de CORS, MEDIA y Django REST Framework.
 import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -32,7 +34,7 @@ ALLOWED_HOSTS = ['dental-gest.onrender.com', 'localhost', '127.0.0.1', '*']
 # =============================================================================
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    "dental_api.apps.LazyAdminConfig",  # django.contrib.admin sin autodiscover al arrancar
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -46,6 +48,8 @@ INSTALLED_APPS = [
     # Local apps
     "products",
     "finance",
+    "jobs",
+    "live",
 ]
 
 MIDDLEWARE = [
@@ -54,6 +58,8 @@ MIDDLEWARE = [
     
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    # Comprime JSON grande (br/gzip); debe ir antes de lo que modifique el cuerpo
+    "dental_api.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -62,6 +68,26 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Detector de N+1 para desarrollo: cuenta consultas por petición y avisa
+# cuando una misma forma de SQL se repite (ver dental_api/queries.py)
+QUERY_INSPECTOR_ENABLED = os.environ.get("DJANGO_QUERY_INSPECTOR", "False") == "True"
+QUERY_INSPECTOR_THRESHOLD = int(os.environ.get("DJANGO_QUERY_INSPECTOR_THRESHOLD", "5"))
+
+if QUERY_INSPECTOR_ENABLED:
+    MIDDLEWARE.append("dental_api.middleware.QueryInspectorMiddleware")
+
+# Compresión de respuestas JSON (ver dental_api/middleware.py). brotli es
+# opcional: si no está instalado solo se ofrece gzip.
+COMPRESSION_MIN_SIZE = int(os.environ.get("DJANGO_COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5  # calidades altas son demasiado lentas para contenido dinámico
+
+# Listados del admin: por encima de este número de filas (estimado por la BD)
+# el total sin filtros se muestra aproximado en vez de hacer COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(
+    os.environ.get("DJANGO_ADMIN_ESTIMATED_COUNT_THRESHOLD", "100000")
+)
+
 ROOT_URLCONF = "dental_api.urls"
 
 TEMPLATES = [
@@ -107,6 +133,122 @@ DATABASES = {
 #     }
 # }
 
+# En PostgreSQL la búsqueda difusa usa pg_trgm (lookups de django.contrib.postgres)
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    INSTALLED_APPS.append("django.contrib.postgres")
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+# LocMem por defecto (un proceso). Con varios workers usar una caché compartida,
+# ej: DJANGO_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+#     DJANGO_CACHE_LOCATION=/var/tmp/dental_cache
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", "dental-gest"),
+    }
+}
+
+# Segundos que se guarda una respuesta del catálogo (ver products/cache.py)
+CATALOG_CACHE_TIMEOUT = int(os.environ.get("DJANGO_CATALOG_CACHE_TIMEOUT", "300"))
+
+# Índice de sugerencias en memoria (ver products/suggest.py): claves por
+# nombre y longitud máxima de cada clave, para acotar la memoria por proceso
+SUGGEST_MAX_WORDS = 6
+SUGGEST_MAX_KEY_LENGTH = 48
+
+# Búsqueda difusa de ?search= (ver products/search.py). El umbral es la
+# fracción de trigramas de la consulta que debe tener un producto (SQLite);
+# en PostgreSQL rige pg_trgm.word_similarity_threshold.
+FUZZY_SEARCH_ENABLED = os.environ.get("DJANGO_FUZZY_SEARCH", "True") == "True"
+FUZZY_SEARCH_THRESHOLD = float(os.environ.get("DJANGO_FUZZY_SEARCH_THRESHOLD", "0.6"))
+
+# Vecinos guardados por producto para /api/products/{id}/related/ (ver
+# products/related.py y el comando rebuild_related_products)
+RELATED_PRODUCTS_LIMIT = 8
+
+# Precalentamiento tras un deploy (ver products/warmup.py y el comando
+# warm_caches). El host forma parte de la clave de caché de las respuestas:
+# debe ser el que usan los visitantes.
+WARMUP_HOST = os.environ.get("DJANGO_WARMUP_HOST", ALLOWED_HOSTS[0])
+WARMUP_PATHS = []        # Rutas extra a precalentar, ej: ["/api/products/?in_stock=true"]
+WARMUP_BRAND_PAGES = 3   # Primeras páginas del listado de cada marca
+
+# Snapshots estáticos del catálogo para un CDN o la generación estática del
+# frontend (ver products/snapshots.py y el comando build_catalog_snapshots).
+# La URL base queda en las imágenes y enlaces de los JSON. Con
+# CATALOG_SNAPSHOT_AUTO cada cambio del catálogo actualiza solo los archivos
+# afectados, en segundo plano (cola "catalog").
+CATALOG_SNAPSHOT_DIR = Path(os.environ.get("DJANGO_CATALOG_SNAPSHOT_DIR", BASE_DIR / "catalog_snapshots"))
+CATALOG_SNAPSHOT_BASE_URL = os.environ.get("DJANGO_CATALOG_SNAPSHOT_URL", f"https://{WARMUP_HOST}")
+CATALOG_SNAPSHOT_AUTO = os.environ.get("DJANGO_CATALOG_SNAPSHOTS", "False") == "True"
+
+# Sincronización incremental (/api/products/changes/, ver products/changes.py):
+# cambios por respuesta y segundos que deben pasar antes de que el token
+# avance sobre un cambio (margen para commits concurrentes fuera de orden)
+CATALOG_CHANGES_PAGE_SIZE = 500
+CATALOG_CHANGES_SETTLE_SECONDS = 5
+
+# /api/storefront/bootstrap/: productos destacados (los más nuevos en stock)
+# y con descuento que se incluyen junto a la primera página del catálogo
+STOREFRONT_FEATURED_COUNT = 4
+STOREFRONT_DISCOUNTED_COUNT = 8
+
+# Reservas de stock del carrito (/api/cart/<id>/reservations/, ver
+# products/reservations.py): segundos que dura una reserva sin renovarse y
+# cada cuántos segundos, como máximo, se encola la limpieza de las vencidas
+STOCK_RESERVATION_TTL = int(os.environ.get("DJANGO_STOCK_RESERVATION_TTL", 15 * 60))
+STOCK_RESERVATION_SWEEP_INTERVAL = 60
+
+
+# =============================================================================
+# BACKGROUND JOBS
+# =============================================================================
+# Cola de tareas sobre la base de datos (ver jobs/queue.py). Worker:
+#     python manage.py run_jobs --processes 1 --threads 2
+# Con JOBS_EAGER = True las tareas se ejecutan al encolarlas (sin worker).
+
+JOBS_EAGER = os.environ.get("DJANGO_JOBS_EAGER", "False") == "True"
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_BASE_DELAY = 10      # segundos; se duplica en cada reintento
+JOBS_RETRY_MAX_DELAY = 3600
+JOBS_POLL_INTERVAL = 1.0        # segundos de espera con la cola vacía
+JOBS_HEARTBEAT_INTERVAL = 30    # segundos entre latidos de una tarea en curso
+JOBS_LEASE_TIMEOUT = 180        # una tarea RUNNING sin latido por este tiempo se considera colgada
+JOBS_KEEP_DONE_DAYS = 7
+
+
+# =============================================================================
+# LIVE EVENTS (SSE)
+# =============================================================================
+# Eventos en vivo para el dashboard y el stock (ver live/). Sin relay los
+# eventos solo llegan a las conexiones del proceso que los publica: con
+# varios workers usar DJANGO_LIVE_RELAY=database (la BD reparte entre procesos).
+
+LIVE_EVENTS_RELAY = os.environ.get("DJANGO_LIVE_RELAY") or None
+LIVE_POLL_INTERVAL = 1.0        # segundos entre lecturas del relay (una por proceso)
+LIVE_EVENTS_RETENTION = 300     # segundos que se guardan los eventos del relay
+LIVE_HEARTBEAT = 15             # segundos sin eventos antes de enviar un ping
+LIVE_STREAM_MAX_AGE = 600       # segundos; luego el cliente reconecta solo
+LIVE_RETRY_MS = 3000
+# Con WSGI cada conexión SSE retiene un hilo: conexiones abiertas a la vez
+# por proceso (0 = sin tope). Las siguientes reciben 503 con Retry-After
+# LIVE_BUSY_RETRY segundos. Con ASGI no hay tope.
+LIVE_WSGI_MAX_STREAMS = int(os.environ.get("DJANGO_LIVE_WSGI_MAX_STREAMS", 2))
+LIVE_BUSY_RETRY = 30
+LIVE_MAX_PENDING = 100          # claves sin enviar por conexión antes de pedir resync
+LIVE_STOCK_MAX_PRODUCTS = 100   # productos por conexión en /api/products/stock/stream/
+LIVE_STOCK_LINGER = 0.5         # segundos para combinar una ráfaga de ventas del mismo producto
+
+# Métricas del dashboard (ver finance/dashboard.py): se invalidan con cada
+# venta, gasto o cambio de stock; el timeout solo acota la memoria.
+DASHBOARD_CACHE_TIMEOUT = 3600
+
 
 # =============================================================================
 # PASSWORD VALIDATION
@@ -146,6 +288,23 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Comprobantes de gastos (ver finance/uploads.py y finance/receipts.py). Se
+# reciben directo a disco hasta RECEIPT_MAX_UPLOAD_SIZE y después una tarea
+# en segundo plano reduce las fotos y, con pikepdf instalado, los PDF.
+RECEIPT_MAX_UPLOAD_SIZE = int(os.environ.get("DJANGO_RECEIPT_MAX_UPLOAD_MB", "15")) * 1024 * 1024
+RECEIPT_IMAGE_MAX_SIDE = 2000   # px del lado mayor (legible para facturas A4)
+RECEIPT_JPEG_QUALITY = 80
+RECEIPT_PDF_OPTIMIZE = True     # linealizar y comprimir (requiere pikepdf, opcional)
+
+# Resumen de gastos (ver finance/analytics.py). Se invalida con cada cambio de
+# Expense; el timeout solo acota la memoria de entradas que ya nadie pide.
+EXPENSE_SUMMARY_CACHE_TIMEOUT = 24 * 3600
+EXPENSE_SUMMARY_MAX_PERIODS = 366   # ej. un año por día o 30 años por mes
+
+# Idempotency-Key en las altas de ventas y gastos (ver finance/idempotency.py):
+# segundos durante los que un reintento recibe la respuesta original
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("DJANGO_IDEMPOTENCY_KEY_TTL", str(24 * 3600)))
+
 
 # =============================================================================
 # DEFAULT PRIMARY KEY FIELD TYPE
@@ -160,6 +319,9 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Permitir todas las conexiones (demo/prueba)
 CORS_ALLOW_ALL_ORIGINS = True
+# Reintentos del POS (ver finance/idempotency.py)
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+CORS_EXPOSE_HEADERS = ["Idempotent-Replayed"]
 
 
 # =============================================================================
@@ -170,6 +332,37 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",  # Lectura pública para el catálogo
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "dental_api.pagination.StandardPagination",
     "PAGE_SIZE": 12,
+    # Proxies delante de gunicorn (Render: 1): la IP del cliente se toma de
+    # X-Forwarded-For. 0 (default): se ignora la cabecera y se usa REMOTE_ADDR.
+    "NUM_PROXIES": int(os.environ.get("DJANGO_NUM_PROXIES", 0)),
+}
+
+# Límites por cliente con token bucket (ver dental_api/throttling.py). Cada
+# tasa "N/periodo" permite ráfagas de N peticiones y luego N por periodo.
+THROTTLE_ENABLED = os.environ.get("DJANGO_THROTTLE", "True") == "True"
+THROTTLE_RATES = {
+    "catalog": "300/min",        # lecturas anónimas del catálogo
+    "search": "60/min",          # ?search=
+    "export": "20/min",          # ?fast=true o páginas grandes
+    "finance_write": "120/min",  # POST/PUT/PATCH/DELETE de finanzas
+    "cart": "120/min",           # PUT/DELETE de reservas del carrito
+    "live": "30/min",            # conexiones SSE nuevas
 }
+THROTTLE_EXPORT_PAGE_SIZE = 100
+# None: buckets en memoria de cada worker. Alias de CACHES para compartirlos.
+THROTTLE_CACHE = os.environ.get("DJANGO_THROTTLE_CACHE") or None
+THROTTLE_MAX_CLIENTS = 10000  # buckets por proceso (LRU)
+# Sin límite: el propio servidor (warm_caches, benchmark_server). Se compara
+# con REMOTE_ADDR y solo sin X-Forwarded-For (ver TokenBucketThrottle.is_exempt)
+THROTTLE_EXEMPT_IPS = ["127.0.0.1", "::1"]
+
+# Renderer JSON rápido con orjson (opcional, salida idéntica a JSONRenderer)
+FAST_JSON_ENABLED = os.environ.get("DJANGO_FAST_JSON", "False") == "True"
+
+if FAST_JSON_ENABLED:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = [
+        "dental_api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ]
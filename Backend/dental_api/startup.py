@@ -0,0 +1,143 @@
+"""
+Perfil del tiempo de arranque (comando profile_startup).
+
+Incluye:
+- PROBE: Script que arranca Django en un intérprete nuevo y mide cada fase
+- parse_importtime: Convierte la salida de `python -X importtime` en filas
+- profile_startup: Ejecuta el probe y devuelve fases, ready() por app e imports
+
+Cada medición corre en un proceso nuevo (`python -X importtime -c PROBE`):
+dentro del proceso actual todo ya estaría importado. Los objetivos son:
+- setup: django.setup() (settings, modelos y ready() de cada app)
+- command: setup + checks del sistema, lo que paga cualquier `manage.py <comando>`
+- worker: setup + aplicación WSGI + primera petición (lo que paga un worker de gunicorn)
+"""
+import json
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+
+TARGETS = ('setup', 'command', 'worker')
+
+PROBE = r'''
+import json, os, sys, time
+
+started = time.perf_counter()
+phases, ready = [], {}
+
+def mark(name, since=[started]):
+    now = time.perf_counter()
+    phases.append((name, now - since[0]))
+    since[0] = now
+
+target, path = sys.argv[1], sys.argv[2]
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "dental_api.settings")
+
+import django
+from django.apps.config import AppConfig
+from django.conf import settings
+
+settings.INSTALLED_APPS
+mark("settings")
+
+create = AppConfig.create.__func__
+
+def timed_create(cls, entry):
+    config = create(cls, entry)
+    original = config.ready
+
+    def timed_ready():
+        begin = time.perf_counter()
+        original()
+        ready[config.label] = time.perf_counter() - begin
+
+    config.ready = timed_ready
+    return config
+
+AppConfig.create = classmethod(timed_create)
+django.setup()
+mark("django.setup()")
+
+if target == "command":
+    from django.core import checks
+    checks.run_checks(include_deployment_checks=False)
+    mark("system checks")
+elif target == "worker":
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+    mark("wsgi + middleware")
+
+    environ = {
+        "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "",
+        "SERVER_NAME": "localhost", "SERVER_PORT": "80", "HTTP_HOST": "localhost",
+        "wsgi.url_scheme": "http", "wsgi.input": sys.stdin.buffer, "wsgi.errors": sys.stderr,
+    }
+    response = application(environ, lambda status, headers: None)
+    b"".join(response)
+    response.close()
+    mark("primera petición")
+
+print(json.dumps({"phases": phases, "ready": ready, "total": time.perf_counter() - started}))
+'''
+
+
+@dataclass
+class ImportRow:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+    @property
+    def package(self):
+        return self.module.split('.')[0]
+
+
+def parse_importtime(stderr):
+    """Filas de `-X importtime` (ignora el resto de la salida de error)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line.removeprefix('import time:').split('|')
+        module = parts[2].rstrip()
+        rows.append(ImportRow(
+            module=module.strip(),
+            self_us=int(parts[0]),
+            cumulative_us=int(parts[1]),
+            depth=(len(module) - len(module.lstrip())) // 2,
+        ))
+    return rows
+
+
+def profile_startup(target='command', path='/api/categories/', base_dir=None):
+    """
+    Arranca Django en un proceso nuevo (`path` es la primera petición del
+    objetivo worker) y retorna:
+        {'total': s, 'phases': [(fase, s)], 'ready': {app: s},
+         'imports': [ImportRow], 'packages': {paquete: s}}
+    """
+    if target not in TARGETS:
+        raise ValueError(f"target debe ser uno de {TARGETS}")
+    base_dir = base_dir or Path(__file__).resolve().parent.parent
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE, target, path],
+        cwd=base_dir,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(process.stderr)
+    packages = defaultdict(float)
+    for row in imports:
+        packages[row.package] += row.self_us / 1e6
+    result['imports'] = imports
+    result['packages'] = dict(packages)
+    return result
@@ -0,0 +1,146 @@
+"""
+Utilidades compartidas por los tests de las apps.
+
+Incluye:
+- build_catalog: Catálogo de prueba con volumen realista (varias páginas)
+- route_names: Nombres de todas las rutas declaradas en un urlconf
+- QueryBudgetMixin: Aserciones de presupuesto de consultas y detección de N+1
+- parse_events: Eventos de un trozo de una respuesta SSE
+"""
+import json
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.urls import URLPattern, URLResolver
+from django.utils import timezone
+
+from .queries import DEFAULT_REPEAT_THRESHOLD, QueryInspector
+
+
+def build_catalog(products=40, images_per_product=2, sales=30, expenses=30):
+    """
+    Crea un catálogo de prueba con suficientes filas para que un N+1 sea visible.
+
+    Los tamaños por defecto superan PAGE_SIZE (12) y list_per_page del admin (20).
+    Retorna un dict con las instancias creadas.
+    """
+    from finance.models import EXPENSE_CATEGORIES, Expense, Sale
+    from products.models import AUDIENCE_CHOICES, Brand, Category, Product, ProductImage
+
+    audiences = [code for code, _ in AUDIENCE_CHOICES]
+    categories = [
+        Category.objects.create(name=f"Categoría {i}", target_audience=audiences[i % 3])
+        for i in range(6)
+    ]
+    brands = [
+        Brand.objects.create(name=f"Marca {i}", target_audience=audiences[i % 3])
+        for i in range(5)
+    ]
+
+    product_list = []
+    for i in range(products):
+        price = Decimal('10.00') + i
+        product_list.append(Product.objects.create(
+            name=f"Producto {i}",
+            description=f"Descripción del producto {i}",
+            price=price,
+            discount_price=price - Decimal('2.50') if i % 3 == 0 else None,
+            cost_price=price / 2,
+            category=categories[i % len(categories)],
+            brand=brands[i % len(brands)] if i % 4 else None,
+            target_audience=audiences[i % 3],
+            stock_count=(i * 7) % 40,
+            # Algunos productos solo tienen galería (fallback de imagen)
+            image=f"products/producto-{i}.jpg" if i % 2 else None,
+        ))
+
+    ProductImage.objects.bulk_create([
+        ProductImage(product=product, image=f"products/gallery/{product.pk}-{n}.jpg", order=n)
+        for product in product_list
+        for n in range(images_per_product)
+    ])
+
+    now = timezone.now()
+    in_stock = [product for product in product_list if product.stock_count > 0]
+    sale_list = [
+        Sale.objects.create(
+            product=in_stock[i % len(in_stock)],
+            quantity=1,
+            unit_price=in_stock[i % len(in_stock)].current_price,
+            sale_date=now - timedelta(days=i),
+            customer_name=f"Cliente {i}",
+        )
+        for i in range(sales)
+    ]
+
+    expense_list = Expense.objects.bulk_create([
+        Expense(
+            concept=f"Gasto {i}",
+            amount=Decimal('15.00') + i,
+            category=EXPENSE_CATEGORIES[i % len(EXPENSE_CATEGORIES)][0],
+            date=date.today() - timedelta(days=i * 3),
+        )
+        for i in range(expenses)
+    ])
+
+    return {
+        'categories': categories,
+        'brands': brands,
+        'products': product_list,
+        'sales': sale_list,
+        'expenses': expense_list,
+    }
+
+
+def route_names(urlpatterns):
+    """Nombres de todas las rutas (recursivo sobre include())."""
+    names = set()
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+class QueryBudgetMixin:
+    """
+    Mixin para TestCase con aserciones sobre el número de consultas SQL.
+
+    assertQueryBudget falla si se supera el presupuesto o si alguna forma de
+    SQL se repite `repeat_threshold` veces o más (patrón N+1). La caché se
+    vacía antes de cada test para medir siempre el camino sin cachear.
+    """
+    repeat_threshold = DEFAULT_REPEAT_THRESHOLD
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    @contextmanager
+    def assertQueryBudget(self, budget: int, label: str = ''):
+        with QueryInspector() as inspector:
+            yield inspector
+
+        if inspector.repeated(self.repeat_threshold):
+            self.fail(
+                f"Patrón N+1 detectado en {label} ({inspector.count} consultas):\n"
+                f"{inspector.report(self.repeat_threshold)}"
+            )
+        if inspector.count > budget:
+            self.fail(
+                f"{label}: {inspector.count} consultas, presupuesto {budget}:\n"
+                + '\n'.join(f"  {shape}" for shape in inspector.queries)
+            )
+
+
+def parse_events(chunk):
+    """Bloques SSE de un trozo del stream -> [(tipo, datos)] (los ping no cuentan)."""
+    events = []
+    for block in chunk.decode().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
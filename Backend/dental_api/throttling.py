@@ -0,0 +1,224 @@
+"""
+Límites de peticiones por cliente (token bucket).
+
+Incluye:
+- parse_rate: "300/min" -> (capacidad, tokens por segundo)
+- LocalBuckets: Buckets en memoria del proceso (LRU acotado, con lock)
+- CacheBuckets: Buckets en una caché compartida entre workers (opcional)
+- TokenBucketThrottle: Throttle de DRF por scope con Retry-After
+- CatalogThrottle / SearchThrottle / ExportThrottle / FinanceWriteThrottle / CartThrottle
+- LiveStreamThrottle: Conexiones SSE nuevas
+- throttle_view: Los mismos límites en vistas de Django sin DRF
+
+Cada cliente (usuario autenticado o IP) tiene un bucket por scope con
+capacidad igual al número de la tasa, que se rellena de forma continua: se
+permite una ráfaga de hasta N peticiones y luego N por periodo. Decidir cuesta
+O(1) y no consulta la BD (DRF ya autenticó al llegar a los throttles).
+
+Los buckets viven en memoria de cada worker: con W workers un cliente puede
+llegar a W veces la tasa. THROTTLE_CACHE = "<alias de CACHES>" los comparte
+entre procesos (lectura y escritura no atómicas: en una carrera se admite
+alguna petición de más, nunca de menos).
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'300/min' -> (300, 5.0): capacidad del bucket y tokens por segundo."""
+    number, period = rate.split('/')
+    capacity = int(number)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def take(tokens, last, capacity, refill, now):
+    """
+    Rellena el bucket hasta `now` e intenta sacar un token.
+    Retorna (tokens restantes, espera en segundos; 0 si se permitió).
+    """
+    tokens = min(capacity, tokens + (now - last) * refill)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / refill
+
+
+class LocalBuckets:
+    """
+    Buckets en memoria del proceso. Guarda como mucho `max_clients` claves:
+    al superarlo descarta la usada hace más tiempo (un bucket olvidado
+    equivale a uno lleno, que es lo que tendría tras un rato sin peticiones).
+    """
+
+    def __init__(self, max_clients):
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill, now):
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (capacity, now))
+            tokens, wait = take(tokens, last, capacity, refill, now)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBuckets:
+    """Buckets en una caché de Django (compartida entre workers)."""
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def consume(self, key, capacity, refill, now):
+        tokens, last = self.cache.get(key, (capacity, now))
+        tokens, wait = take(tokens, last, capacity, refill, now)
+        # Sin peticiones, en capacity / refill segundos el bucket vuelve a estar lleno
+        self.cache.set(key, (tokens, now), timeout=max(1, int(capacity / refill) + 1))
+        return wait
+
+    def clear(self):
+        pass
+
+
+_local_buckets = None
+
+
+def get_buckets():
+    global _local_buckets
+    if settings.THROTTLE_CACHE:
+        return CacheBuckets(settings.THROTTLE_CACHE)
+    if _local_buckets is None:
+        _local_buckets = LocalBuckets(settings.THROTTLE_MAX_CLIENTS)
+    return _local_buckets
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle de un scope de THROTTLE_RATES. Las subclases definen `scope` y
+    `applies(request, view)`; si no aplica, la petición pasa sin gastar token.
+
+    Con `wait()` DRF responde 429 con la cabecera Retry-After.
+    """
+    scope = None
+
+    def applies(self, request, view):
+        return True
+
+    def get_client(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def is_exempt(self, request):
+        """
+        Peticiones del propio servidor (warm_caches, benchmark_server). Se mira
+        REMOTE_ADDR, nunca X-Forwarded-For (lo escribe el cliente), y no cuenta
+        lo que llega con esa cabecera: detrás de un proxy local REMOTE_ADDR es
+        siempre 127.0.0.1.
+        """
+        return (
+            request.META.get('REMOTE_ADDR') in settings.THROTTLE_EXEMPT_IPS
+            and 'HTTP_X_FORWARDED_FOR' not in request.META
+        )
+
+    def allow_request(self, request, view):
+        self._wait = 0.0
+        if not settings.THROTTLE_ENABLED or not self.applies(request, view):
+            return True
+        if self.is_exempt(request):
+            return True
+        capacity, refill = parse_rate(settings.THROTTLE_RATES[self.scope])
+        key = f'throttle:{self.scope}:{self.get_client(request)}'
+        self._wait = get_buckets().consume(key, capacity, refill, time.time())
+        return self._wait == 0
+
+    def wait(self):
+        return self._wait
+
+
+class CatalogThrottle(TokenBucketThrottle):
+    """Lecturas anónimas del catálogo (páginas, detalles, sugerencias)."""
+    scope = 'catalog'
+
+    def applies(self, request, view):
+        return request.method in SAFE_METHODS and not request.user.is_authenticated
+
+
+class SearchThrottle(TokenBucketThrottle):
+    """Listados con ?search= (búsqueda difusa, la consulta más cara del catálogo)."""
+    scope = 'search'
+
+    def applies(self, request, view):
+        return bool(request.query_params.get('search', '').strip())
+
+
+class ExportThrottle(TokenBucketThrottle):
+    """Listados grandes: ?fast=true o ?page_size= por encima de THROTTLE_EXPORT_PAGE_SIZE."""
+    scope = 'export'
+
+    def applies(self, request, view):
+        if request.query_params.get('fast', '').lower() == 'true':
+            return True
+        try:
+            return int(request.query_params.get('page_size', 0)) > settings.THROTTLE_EXPORT_PAGE_SIZE
+        except ValueError:
+            return False
+
+
+class FinanceWriteThrottle(TokenBucketThrottle):
+    """Escrituras de finanzas (POST/PUT/PATCH/DELETE)."""
+    scope = 'finance_write'
+
+    def applies(self, request, view):
+        return request.method not in SAFE_METHODS
+
+
+class CartThrottle(TokenBucketThrottle):
+    """Reservas de stock del carrito (PUT/DELETE)."""
+    scope = 'cart'
+
+    def applies(self, request, view):
+        return request.method not in SAFE_METHODS
+
+
+class LiveStreamThrottle(TokenBucketThrottle):
+    """Conexiones SSE nuevas (dashboard y stock en vivo)."""
+    scope = 'live'
+
+
+def throttle_view(*throttle_classes):
+    """
+    Aplica throttles de DRF a una vista de Django (ej. las SSE, que no pasan
+    por APIView): 429 con Retry-After igual que DRF.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            for throttle_class in throttle_classes:
+                throttle = throttle_class()
+                if not throttle.allow_request(request, None):
+                    wait = math.ceil(throttle.wait())
+                    return JsonResponse(
+                        {'detail': f'Demasiadas peticiones. Reintentar en {wait} s.'},
+                        status=429, headers={'Retry-After': str(wait)},
+                    )
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
@@ -2,18 +2,19 @@
 URL configuration for dental_api project.
 
 Incluye:
-- Panel de administración en /admin/
+- Panel de administración en /admin/ (se carga con la primera petición, ver admin_urls.py)
 - API REST en /api/
 - Archivos media en desarrollo (CRÍTICO para imágenes)
 """
-from django.contrib import admin
-from django.urls import path, include
+from django.urls import URLResolver, path, include
+from django.urls.resolvers import RoutePattern
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
-    # Panel de administración
-    path('admin/', admin.site.urls),
+    # Panel de administración. Con el urlconf como texto el módulo se importa
+    # al resolver la primera ruta /admin/ (include() lo importaría ya)
+    URLResolver(RoutePattern('admin/'), 'dental_api.admin_urls', app_name='admin', namespace='admin'),
     
     # API REST - Productos
     path('api/', include('products.urls')),
@@ -4,15 +4,42 @@ Configuración del Admin Panel para el módulo de Finanzas.
 Incluye:
 - ExpenseAdmin: Gestión de gastos con filtros por categoría y fecha
 - SaleAdmin: Gestión de ventas con cálculo de ganancias
+- ClosedPeriodAdmin: Meses cerrados (solo lectura; borrar = reabrir)
+
+Ambas tablas crecen sin límite: usan total estimado, sin el COUNT(*) de la
+tabla completa, y date_hierarchy sobre columnas indexadas (ver models.py).
 """
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Expense, Sale
+
+from dental_api.admin import LargeTableAdminMixin
+from .models import ClosedPeriod, Expense, PeriodClosed, Sale, ensure_period_open
+
+
+class ClosedPeriodLockMixin:
+    """Los registros de un mes cerrado se ven pero no se editan ni se borran."""
+    period_field = None
+
+    def in_closed_period(self, obj):
+        if obj is None:
+            return False
+        try:
+            ensure_period_open(getattr(obj, self.period_field), self.period_field)
+        except PeriodClosed:
+            return True
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return super().has_change_permission(request, obj) and not self.in_closed_period(obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return super().has_delete_permission(request, obj) and not self.in_closed_period(obj)
 
 
 @admin.register(Expense)
-class ExpenseAdmin(admin.ModelAdmin):
+class ExpenseAdmin(ClosedPeriodLockMixin, LargeTableAdminMixin, admin.ModelAdmin):
     """Admin para gestión de gastos operativos."""
+    period_field = 'date'
     
     list_display = [
         'concept',
@@ -26,13 +53,14 @@ class ExpenseAdmin(admin.ModelAdmin):
     search_fields = ['concept', 'notes']
     date_hierarchy = 'date'
     ordering = ['-date', '-created_at']
+    readonly_fields = ['receipt_processed']
     
     fieldsets = (
         ('Información del Gasto', {
             'fields': ('concept', 'amount', 'category', 'date')
         }),
         ('Documentación', {
-            'fields': ('receipt', 'notes'),
+            'fields': ('receipt', 'receipt_processed', 'notes'),
             'classes': ('collapse',)
         }),
     )
@@ -52,11 +80,12 @@ class ExpenseAdmin(admin.ModelAdmin):
 
 
 @admin.register(Sale)
-class SaleAdmin(admin.ModelAdmin):
+class SaleAdmin(ClosedPeriodLockMixin, LargeTableAdminMixin, admin.ModelAdmin):
     """Admin para gestión de ventas manuales."""
+    period_field = 'sale_date'
     
     list_display = [
-        'product',
+        'product_name',
         'quantity',
         'formatted_unit_price',
         'formatted_total',
@@ -68,6 +97,9 @@ class SaleAdmin(admin.ModelAdmin):
     search_fields = ['product__name', 'customer_name', 'notes']
     date_hierarchy = 'sale_date'
     ordering = ['-sale_date', '-created_at']
+    # product es obligatorio (el admin ya hace el JOIN); se declara explícito
+    # porque product_name y __str__ lo necesitan en cada fila
+    list_select_related = ['product']
     autocomplete_fields = ['product']
     readonly_fields = ['total', 'profit_display']
     
@@ -83,6 +115,11 @@ class SaleAdmin(admin.ModelAdmin):
         }),
     )
 
+    def product_name(self, obj):
+        return obj.product.name
+    product_name.short_description = "Producto"
+    product_name.admin_order_field = 'product__name'
+
     def formatted_unit_price(self, obj):
         """Precio unitario formateado."""
         return f"${obj.unit_price:,.2f}"
@@ -120,3 +157,26 @@ class SaleAdmin(admin.ModelAdmin):
             return f"${obj.profit:,.2f} ({obj.profit_margin_percentage}%)"
         return "Se calculará al guardar"
     profit_display.short_description = "Ganancia calculada"
+
+
+
+@admin.register(ClosedPeriod)
+class ClosedPeriodAdmin(admin.ModelAdmin):
+    """Snapshots de meses cerrados. Se crean con `close_period` o la API."""
+
+    list_display = ['month_label', 'revenue', 'cost_of_goods_sold', 'expenses', 'net_profit', 'sales_count', 'closed_at']
+    readonly_fields = [
+        'month', 'revenue', 'cost_of_goods_sold', 'expenses', 'net_profit',
+        'sales_count', 'expense_count', 'expenses_by_category', 'products', 'closed_at',
+    ]
+
+    def month_label(self, obj):
+        return f"{obj.month:%Y-%m}"
+    month_label.short_description = "Mes"
+    month_label.admin_order_field = 'month'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
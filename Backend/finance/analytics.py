@@ -0,0 +1,168 @@
+"""
+Resumen de gastos por categoría y periodo (/api/finance/expenses/summary/).
+
+Incluye:
+- GRANULARITIES: Periodos admitidos (day, week, month, quarter, year)
+- period_starts: Inicio de cada periodo entre dos fechas (incluye los vacíos)
+- expense_summary: Totales por categoría x periodo, variaciones y participación
+- get_expense_summary: expense_summary cacheado hasta el próximo cambio de Expense
+
+Todo sale de una sola consulta agrupada (periodo, categoría) que recorre el
+índice expense_date_category_idx (date, category, amount) sin leer la tabla.
+Los periodos sin gastos se completan en Python para que las variaciones
+comparen siempre periodos consecutivos.
+"""
+import hashlib
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import Trunc
+
+from dental_api.fastlist import decimal_str
+from products.cache import bump_version, get_version
+from .models import EXPENSE_CATEGORIES, Expense
+
+
+GRANULARITIES = ('day', 'week', 'month', 'quarter', 'year')
+
+EXPENSES_VERSION_KEY = 'finance:expenses:version'
+
+CATEGORY_LABELS = dict(EXPENSE_CATEGORIES)
+
+
+def bump_expenses_version():
+    """Invalida los resúmenes cacheados (ver finance/signals.py)."""
+    bump_version(EXPENSES_VERSION_KEY)
+
+
+def add_months(day, months):
+    """Primer día del mes `months` meses después (o antes) del de `day`."""
+    month = day.month - 1 + months
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def truncate(day, granularity):
+    """Inicio del periodo que contiene `day` (igual que Trunc en la BD)."""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    return day.replace(month=1, day=1)
+
+
+def period_starts(start, end, granularity):
+    """Inicio de cada periodo de `granularity` que toca el rango [start, end]."""
+    current = truncate(start, granularity)
+    while current <= end:
+        yield current
+        if granularity == 'day':
+            current += timedelta(days=1)
+        elif granularity == 'week':
+            current += timedelta(days=7)
+        else:
+            current = add_months(current, {'month': 1, 'quarter': 3, 'year': 12}[granularity])
+
+
+def _change_percentage(current, previous):
+    """Misma regla que el dashboard: de 0 a algo positivo es +100 %."""
+    if previous == 0:
+        return 100.0 if current > 0 else 0.0
+    return round(float((current - previous) / previous * 100), 2)
+
+
+def expense_summary(start, end, granularity='month', category=None):
+    """
+    Gastos entre `start` y `end` (inclusive) agrupados por periodo y categoría.
+
+    Retorna un dict listo para la respuesta JSON: totales por categoría con su
+    participación en el total y, por periodo, el total, la variación contra el
+    periodo anterior y el detalle por categoría (con su propia variación).
+    """
+    expenses = Expense.objects.filter(date__gte=start, date__lte=end)
+    if category:
+        expenses = expenses.filter(category=category)
+    rows = (
+        expenses
+        .annotate(period=Trunc('date', granularity))
+        .values_list('period', 'category')
+        .annotate(total=Sum('amount'), count=Count('pk'))
+        .order_by()
+    )
+
+    cells = {}
+    for period, code, total, count in rows:
+        cells[period, code] = (total, count)
+
+    codes = [category] if category else list(CATEGORY_LABELS)
+    zero = (Decimal('0'), 0)
+    category_totals = {code: Decimal('0') for code in codes}
+    category_counts = {code: 0 for code in codes}
+    periods = []
+    previous = None
+    for period in period_starts(start, end, granularity):
+        by_category = {}
+        for code in codes:
+            total, count = cells.get((period, code), zero)
+            category_totals[code] += total
+            category_counts[code] += count
+            before = previous['by_category'][code]['_total'] if previous else None
+            by_category[code] = {
+                '_total': total,
+                'total': decimal_str(total),
+                'delta': decimal_str(total - before) if previous else None,
+            }
+        period_total = sum((item['_total'] for item in by_category.values()), Decimal('0'))
+        entry = {
+            'period': period.isoformat(),
+            '_total': period_total,
+            'total': decimal_str(period_total),
+            'delta': decimal_str(period_total - previous['_total']) if previous else None,
+            'change_percentage': _change_percentage(period_total, previous['_total']) if previous else None,
+            'by_category': by_category,
+        }
+        periods.append(entry)
+        previous = entry
+
+    # Los totales sin formatear solo hacían falta para las variaciones
+    for entry in periods:
+        del entry['_total']
+        for item in entry['by_category'].values():
+            del item['_total']
+
+    grand_total = sum(category_totals.values(), Decimal('0'))
+    return {
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'granularity': granularity,
+        'total': decimal_str(grand_total),
+        'count': sum(category_counts.values()),
+        'categories': [
+            {
+                'category': code,
+                'label': CATEGORY_LABELS.get(code, code),
+                'total': decimal_str(category_totals[code]),
+                'count': category_counts[code],
+                'share': round(float(category_totals[code] / grand_total * 100), 2) if grand_total else 0.0,
+            }
+            for code in codes
+        ],
+        'periods': periods,
+    }
+
+
+def get_expense_summary(start, end, granularity='month', category=None):
+    """expense_summary desde la caché; se recalcula tras cualquier alta, cambio o baja de Expense."""
+    params = f'{get_version(EXPENSES_VERSION_KEY)}:{start}:{end}:{granularity}:{category}'
+    key = 'finance:expense-summary:' + hashlib.md5(params.encode(), usedforsecurity=False).hexdigest()
+    summary = cache.get(key)
+    if summary is None:
+        summary = expense_summary(start, end, granularity, category)
+        cache.set(key, summary, settings.EXPENSE_SUMMARY_CACHE_TIMEOUT)
+    return summary
@@ -0,0 +1,160 @@
+"""
+Métricas del dashboard de finanzas y sus actualizaciones en vivo.
+
+Incluye:
+- dashboard_stats: Métricas del mes (las de /api/finance/dashboard/)
+- get_dashboard_stats: dashboard_stats serializado y cacheado hasta el próximo cambio
+- publish_dashboard_update: Evento `metrics` con las métricas que cambia una venta o gasto
+- publish_stock_alert: Evento `stock_alert` cuando una venta deja stock crítico
+
+El stream /api/finance/dashboard/stream/ envía primero las métricas
+completas y después solo las que cambian. Cada alta, cambio o baja de una
+venta o gasto las recalcula una vez al hacer commit (dos consultas, tres con
+el top de productos) para todas las conexiones abiertas, en vez de que cada
+pestaña repita el dashboard completo en cada sondeo.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from live.broadcast import has_subscribers, publish, publish_on_commit
+from products.cache import bump_version, get_catalog_version, get_version
+from products.models import Product
+from .models import Expense, Sale
+from .serializers import DashboardStatsSerializer
+
+
+DASHBOARD_CHANNEL = 'finance.dashboard'
+DASHBOARD_VERSION_KEY = 'finance:dashboard:version'
+
+# Menos de estas unidades (y más de 0) es stock crítico
+CRITICAL_STOCK = 5
+
+ZERO = Decimal('0')
+
+
+def bump_dashboard_version():
+    """Invalida las métricas cacheadas (ver finance/signals.py)."""
+    bump_version(DASHBOARD_VERSION_KEY)
+
+
+def month_starts(now=None):
+    """Inicio del mes actual y del anterior."""
+    now = now or timezone.now()
+    current = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    previous = (current - timedelta(days=1)).replace(day=1)
+    return current, previous
+
+
+def _percentage_change(current, previous):
+    if previous == 0:
+        return 100.0 if current > 0 else 0.0
+    return round(((current - previous) / previous) * 100, 2)
+
+
+def sale_totals(current, previous):
+    """Ingresos de los dos meses, COGS y número de ventas del mes: una consulta."""
+    in_month = Q(sale_date__gte=current)
+    totals = Sale.objects.filter(sale_date__gte=previous).aggregate(
+        current_month_revenue=Sum('total', filter=in_month, default=ZERO),
+        previous_month_revenue=Sum('total', filter=~in_month, default=ZERO),
+        cost_of_goods_sold=Sum(
+            F('quantity') * F('unit_cost'), filter=in_month & Q(unit_cost__isnull=False), default=ZERO
+        ),
+        total_sales_count=Count('pk', filter=in_month),
+    )
+    totals['revenue_change_percentage'] = _percentage_change(
+        float(totals['current_month_revenue']), float(totals['previous_month_revenue'])
+    )
+    return totals
+
+
+def expense_total(current):
+    return Expense.objects.filter(date__gte=current.date()).aggregate(total=Sum('amount', default=ZERO))['total']
+
+
+def top_products(current, limit=5):
+    rows = (
+        Sale.objects.filter(sale_date__gte=current)
+        .values('product__id', 'product__name')
+        .annotate(total_sold=Sum('quantity'), revenue=Sum('total'))
+        .order_by('-total_sold')[:limit]
+    )
+    return [
+        {
+            'product_id': row['product__id'],
+            'product_name': row['product__name'],
+            'total_sold': row['total_sold'],
+            'revenue': row['revenue'],
+        }
+        for row in rows
+    ]
+
+
+def stock_alerts(limit=10):
+    """Productos con stock crítico y agotados (hasta `limit` de cada uno)."""
+    critical = Product.objects.filter(stock_count__lt=CRITICAL_STOCK, stock_count__gt=0)
+    out_of_stock = Product.objects.filter(stock_count=0)
+    return [
+        *critical.values('id', 'name', 'stock_count')[:limit],
+        *out_of_stock.values('id', 'name', 'stock_count')[:limit],
+    ]
+
+
+def dashboard_stats():
+    """Métricas completas del mes actual (valores sin serializar)."""
+    current, previous = month_starts()
+    stats = sale_totals(current, previous)
+    stats['total_expenses'] = expense_total(current)
+    stats['net_profit'] = stats['current_month_revenue'] - stats['cost_of_goods_sold'] - stats['total_expenses']
+    stats['top_products'] = top_products(current)
+    stats['critical_stock_alerts'] = stock_alerts()
+    return stats
+
+
+def get_dashboard_stats():
+    """dashboard_stats serializado, cacheado hasta la próxima venta, gasto o cambio del catálogo."""
+    current, _ = month_starts()
+    key = (
+        f'finance:dashboard:{get_version(DASHBOARD_VERSION_KEY)}:'
+        f'{get_catalog_version()}:{current:%Y-%m}'
+    )
+    data = cache.get(key)
+    if data is None:
+        data = dict(DashboardStatsSerializer(dashboard_stats()).data)
+        cache.set(key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+def publish_dashboard_update(sales=True):
+    """
+    Publica las métricas que puede haber cambiado una venta (`sales`) o un
+    gasto, con sus valores actuales. Se llama al hacer commit; sin conexiones
+    abiertas no consulta nada.
+    """
+    if not has_subscribers(DASHBOARD_CHANNEL):
+        return
+    current, previous = month_starts()
+    stats = sale_totals(current, previous)
+    stats['total_expenses'] = expense_total(current)
+    stats['net_profit'] = stats['current_month_revenue'] - stats['cost_of_goods_sold'] - stats['total_expenses']
+    if sales:
+        stats['top_products'] = top_products(current)
+    else:
+        # Un gasto solo mueve los gastos y la ganancia
+        stats = {name: stats[name] for name in ('total_expenses', 'net_profit')}
+
+    fields = DashboardStatsSerializer().fields
+    data = {name: fields[name].to_representation(value) for name, value in stats.items()}
+    publish(DASHBOARD_CHANNEL, 'metrics', data, key='metrics')
+
+
+def publish_stock_alert(product):
+    """Alerta del producto si quedó en stock crítico o agotado (al hacer commit)."""
+    if product.stock_count < CRITICAL_STOCK and has_subscribers(DASHBOARD_CHANNEL):
+        data = {'id': product.pk, 'name': product.name, 'stock_count': product.stock_count}
+        publish_on_commit(DASHBOARD_CHANNEL, 'stock_alert', data, key=str(product.pk))
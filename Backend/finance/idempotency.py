@@ -0,0 +1,101 @@
+"""
+Altas idempotentes con la cabecera `Idempotency-Key` (POS con conexión inestable).
+
+Incluye:
+- request_fingerprint: Huella del contenido de una petición
+- IdempotentCreateMixin: create() que ejecuta una vez por clave y repite la respuesta
+
+El cliente genera una clave (ej. un UUID) por venta y la reenvía en cada
+reintento. La primera petición guarda la clave junto con la respuesta en la
+misma transacción que el alta; un reintento recibe esa respuesta con
+`Idempotent-Replayed: true` sin volver a crear nada ni descontar stock.
+
+Dos peticiones simultáneas con la misma clave insertan la misma fila del
+índice único (scope, key): la segunda espera a que la primera termine y,
+si hizo commit, responde lo mismo; si falló, se ejecuta ella. Un alta
+rechazada (400) no guarda la clave. Las vencidas se borran con
+`python manage.py purge_idempotency_keys`.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request):
+    """SHA-256 de método, ruta y datos (de los archivos, nombre y tamaño)."""
+    items = []
+    for name in sorted(request.data):
+        values = request.data.getlist(name) if hasattr(request.data, 'getlist') else [request.data[name]]
+        for value in values:
+            if hasattr(value, 'read'):
+                value = f'{value.name}:{value.size}'
+            items.append([name, value])
+    payload = json.dumps([request.method, request.path, items], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(record):
+    return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+class IdempotentCreateMixin:
+    """Para ViewSets con create(); sin la cabecera el alta funciona como siempre."""
+
+    def idempotency_scope(self, request):
+        return f'{request.user.pk or ""}:{request.path}'
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'detail': f'{HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        scope = self.idempotency_scope(request)
+        fingerprint = request_fingerprint(request)
+        now = timezone.now()
+        with transaction.atomic():
+            # Reservar la clave antes del alta: un duplicado concurrente se
+            # bloquea aquí hasta que esta transacción termine
+            try:
+                record = _reserve(scope, key, fingerprint, now)
+            except IntegrityError:
+                record = IdempotencyKey.objects.get(scope=scope, key=key)
+                if record.expires_at > now:
+                    if record.fingerprint != fingerprint:
+                        return Response(
+                            {'detail': f'{HEADER} ya se usó con otro contenido.'},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        )
+                    return _replay(record)
+                record.delete()
+                record = _reserve(scope, key, fingerprint, now)
+
+            response = super().create(request, *args, **kwargs)
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=['status_code', 'response'])
+        return response
+
+
+def _reserve(scope, key, fingerprint, now):
+    with transaction.atomic():
+        return IdempotencyKey.objects.create(
+            scope=scope, key=key, fingerprint=fingerprint, status_code=0, response={},
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+        )
@@ -0,0 +1,56 @@
+"""
+Cierra (o reabre) un mes contable.
+
+Al cerrar se guarda el estado de resultados del mes en ClosedPeriod y sus
+ventas y gastos dejan de poder modificarse.
+
+Uso:
+    python manage.py close_period 2026-01
+    python manage.py close_period --previous      # el mes anterior (cron el día 1)
+    python manage.py close_period 2026-01 --reopen
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from finance.analytics import add_months
+from finance.models import PeriodClosed
+from finance.periods import close_period, parse_month, reopen_period
+
+
+class Command(BaseCommand):
+    help = "Cierra un mes contable (congela su estado de resultados) o lo reabre."
+    requires_system_checks = []  # Arranque rápido: no importa URLs, vistas ni admin
+
+    def add_arguments(self, parser):
+        parser.add_argument('month', nargs='?', help="Mes AAAA-MM")
+        parser.add_argument('--previous', action='store_true',
+                            help="Cerrar el mes anterior al actual")
+        parser.add_argument('--reopen', action='store_true',
+                            help="Reabrir el mes (borra su snapshot)")
+
+    def handle(self, *args, **options):
+        if options['previous']:
+            month = add_months(timezone.localdate(), -1)
+        elif options['month']:
+            try:
+                month = parse_month(options['month'])
+            except ValueError:
+                raise CommandError("El mes debe tener formato AAAA-MM.")
+        else:
+            raise CommandError("Indicar el mes (AAAA-MM) o --previous.")
+
+        if options['reopen']:
+            if not reopen_period(month):
+                raise CommandError(f"El periodo {month:%Y-%m} no está cerrado.")
+            self.stdout.write(self.style.SUCCESS(f"Periodo {month:%Y-%m} reabierto"))
+            return
+
+        try:
+            period = close_period(month)
+        except PeriodClosed as exc:
+            raise CommandError(' '.join(exc.messages))
+        self.stdout.write(self.style.SUCCESS(
+            f"Periodo {period} cerrado: ingresos ${period.revenue:,.2f} · "
+            f"costo ${period.cost_of_goods_sold:,.2f} · gastos ${period.expenses:,.2f} · "
+            f"ganancia neta ${period.net_profit:,.2f}"
+        ))
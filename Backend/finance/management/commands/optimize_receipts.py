@@ -0,0 +1,54 @@
+"""
+Comprime los comprobantes de gastos que aún no se procesaron.
+
+Los comprobantes nuevos se comprimen solos (tarea optimize_receipt_task); este
+comando recorre los anteriores. Sin pikepdf los PDF se marcan revisados sin
+cambios: --pdf los vuelve a procesar después de instalarlo.
+
+Uso:
+    python manage.py optimize_receipts            # encola una tarea por gasto
+    python manage.py optimize_receipts --now      # los procesa en este proceso
+    python manage.py optimize_receipts --now --pdf   # también los PDF ya revisados
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from finance.models import Expense
+from finance.receipts import optimize_receipt
+from finance.tasks import optimize_receipt_task
+
+
+class Command(BaseCommand):
+    help = "Comprime los comprobantes de gastos pendientes."
+    requires_system_checks = []  # Arranque rápido: no importa URLs, vistas ni admin
+
+    def add_arguments(self, parser):
+        parser.add_argument('--now', action='store_true',
+                            help="Procesar aquí en vez de encolar tareas")
+        parser.add_argument('--pdf', action='store_true',
+                            help="Incluir los PDF ya revisados (tras instalar pikepdf)")
+
+    def handle(self, *args, **options):
+        pending = Q(receipt_processed=False)
+        if options['pdf']:
+            pending |= Q(receipt__iendswith='.pdf')
+        expenses = Expense.objects.exclude(receipt='').filter(pending)
+        ids = list(expenses.values_list('pk', flat=True))
+
+        if not options['now']:
+            for expense_id in ids:
+                optimize_receipt_task.enqueue(expense_id)
+            self.stdout.write(self.style.SUCCESS(f"{len(ids)} comprobantes encolados"))
+            return
+
+        before = after = replaced = 0
+        for expense_id in ids:
+            result = optimize_receipt(expense_id)
+            if result:
+                replaced += 1
+                before += result[0]
+                after += result[1]
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(ids)} comprobantes revisados, {replaced} comprimidos: "
+            f"{before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB"
+        ))
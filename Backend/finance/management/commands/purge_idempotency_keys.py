@@ -0,0 +1,20 @@
+"""
+Borra las claves de idempotencia vencidas (IDEMPOTENCY_KEY_TTL).
+
+Uso:
+    python manage.py purge_idempotency_keys       # cron, ej. una vez por hora
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from finance.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Borra las claves de Idempotency-Key vencidas."
+    requires_system_checks = []  # Arranque rápido: no importa URLs, vistas ni admin
+
+    def handle(self, *args, **options):
+        # Por el índice de expires_at, sin recorrer la tabla
+        deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} claves vencidas borradas."))
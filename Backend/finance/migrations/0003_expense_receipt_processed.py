@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:38
+
+import finance.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finance", "0002_sale_expense_date_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="expense",
+            name="receipt_processed",
+            field=models.BooleanField(
+                default=False, editable=False, verbose_name="Comprobante optimizado"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="expense",
+            name="receipt",
+            field=models.FileField(
+                blank=True,
+                help_text="Factura o recibo (opcional)",
+                null=True,
+                upload_to=finance.models.receipt_path,
+                validators=[finance.models.validate_receipt_size],
+                verbose_name="Comprobante",
+            ),
+        ),
+    ]
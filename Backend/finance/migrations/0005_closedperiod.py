@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finance", "0004_expense_date_category_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClosedPeriod",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "month",
+                    models.DateField(
+                        help_text="Primer día del mes cerrado",
+                        unique=True,
+                        verbose_name="Mes",
+                    ),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=14, verbose_name="Ingresos ($)"
+                    ),
+                ),
+                (
+                    "cost_of_goods_sold",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=14,
+                        verbose_name="Costo de ventas ($)",
+                    ),
+                ),
+                (
+                    "expenses",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=14, verbose_name="Gastos ($)"
+                    ),
+                ),
+                (
+                    "net_profit",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=14,
+                        verbose_name="Ganancia neta ($)",
+                    ),
+                ),
+                ("sales_count", models.PositiveIntegerField(verbose_name="Ventas")),
+                (
+                    "expense_count",
+                    models.PositiveIntegerField(verbose_name="Gastos registrados"),
+                ),
+                (
+                    "expenses_by_category",
+                    models.JSONField(default=dict, verbose_name="Gastos por categoría"),
+                ),
+                (
+                    "products",
+                    models.JSONField(default=list, verbose_name="Ventas por producto"),
+                ),
+                (
+                    "closed_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Cerrado el"),
+                ),
+            ],
+            options={
+                "verbose_name": "Periodo cerrado",
+                "verbose_name_plural": "Periodos cerrados",
+                "ordering": ["-month"],
+            },
+        ),
+    ]
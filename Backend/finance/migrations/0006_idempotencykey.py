@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:57
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finance", "0005_closedperiod"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdempotencyKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        help_text="Endpoint (y usuario) al que pertenece la clave",
+                        max_length=200,
+                        verbose_name="Ámbito",
+                    ),
+                ),
+                ("key", models.CharField(max_length=255, verbose_name="Clave")),
+                (
+                    "fingerprint",
+                    models.CharField(
+                        help_text="SHA-256 del contenido de la petición original",
+                        max_length=64,
+                        verbose_name="Huella",
+                    ),
+                ),
+                (
+                    "status_code",
+                    models.PositiveSmallIntegerField(
+                        verbose_name="Código de respuesta"
+                    ),
+                ),
+                (
+                    "response",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        verbose_name="Respuesta",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Creada"),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(db_index=True, verbose_name="Expira"),
+                ),
+            ],
+            options={
+                "verbose_name": "Clave de idempotencia",
+                "verbose_name_plural": "Claves de idempotencia",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("scope", "key"), name="idempotency_scope_key_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
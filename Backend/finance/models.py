@@ -4,10 +4,17 @@ Modelos para el módulo de Inteligencia Financiera.
 Incluye:
 - Expense: Registro de gastos operativos
 - Sale: Registro de ventas manuales con cálculo automático de stock
+- ClosedPeriod: Mes contable cerrado con su estado de resultados congelado
+- IdempotencyKey: Respuesta guardada de un alta con cabecera Idempotency-Key
 """
+from datetime import datetime
 from decimal import Decimal
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 
 # Categorías de gastos para análisis financiero
@@ -21,6 +28,36 @@ EXPENSE_CATEGORIES = [
 ]
 
 
+class PeriodClosed(ValidationError):
+    """Alta, cambio o baja de una venta o gasto en un mes ya cerrado."""
+
+
+def month_of(value):
+    """Primer día del mes (hora local) de una fecha o fecha-hora (o su texto ISO)."""
+    if isinstance(value, str):
+        value = parse_datetime(value) or parse_date(value)
+    if isinstance(value, datetime):
+        value = timezone.localtime(value) if timezone.is_aware(value) else value
+        value = value.date()
+    return value.replace(day=1)
+
+
+def ensure_period_open(value, field):
+    """Lanza PeriodClosed si el mes de `value` tiene un ClosedPeriod."""
+    if value is None:
+        return
+    month = month_of(value)
+    if ClosedPeriod.objects.filter(month=month).exists():
+        raise PeriodClosed({field: f"El periodo {month:%Y-%m} está cerrado."})
+
+
+def validate_receipt_size(file):
+    """Tope de RECEIPT_MAX_UPLOAD_SIZE también para el admin (la API corta antes, ver uploads.py)."""
+    if file.size > settings.RECEIPT_MAX_UPLOAD_SIZE:
+        limit = settings.RECEIPT_MAX_UPLOAD_SIZE / 1024 / 1024
+        raise ValidationError(f"El comprobante supera el máximo de {limit:.0f} MB.")
+
+
 def receipt_path(instance, filename):
     """Genera ruta para comprobantes de gastos."""
     from uuid import uuid4
@@ -57,11 +94,18 @@ class Expense(models.Model):
     )
     receipt = models.FileField(
         upload_to=receipt_path,
+        validators=[validate_receipt_size],
         null=True,
         blank=True,
         verbose_name="Comprobante",
         help_text="Factura o recibo (opcional)"
     )
+    # False hasta que finance.tasks comprime el comprobante (ver receipts.py)
+    receipt_processed = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="Comprobante optimizado"
+    )
     notes = models.TextField(
         blank=True,
         verbose_name="Notas",
@@ -76,10 +120,20 @@ class Expense(models.Model):
         verbose_name = "Gasto"
         verbose_name_plural = "Gastos"
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Orden por defecto, date_hierarchy y filtros por rango de fechas
+            models.Index(fields=['-date', '-created_at'], name='expense_date_idx'),
+            models.Index(fields=['category', '-date'], name='expense_category_date_idx'),
+            # Cubre el resumen por periodo y categoría (se resuelve solo con el índice)
+            models.Index(fields=['date', 'category', 'amount'], name='expense_date_category_idx'),
+        ]
 
     def __str__(self):
         return f"{self.concept} - ${self.amount} ({self.get_category_display()})"
 
+    def clean(self):
+        ensure_period_open(self.date, 'date')
+
 
 class Sale(models.Model):
     """
@@ -142,12 +196,18 @@ class Sale(models.Model):
         verbose_name = "Venta"
         verbose_name_plural = "Ventas"
         ordering = ['-sale_date', '-created_at']
+        indexes = [
+            # Orden por defecto, date_hierarchy y filtros por rango de fechas
+            models.Index(fields=['-sale_date', '-created_at'], name='sale_date_idx'),
+            models.Index(fields=['product', '-sale_date'], name='sale_product_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.quantity}x {self.product.name} - ${self.total}"
 
     def clean(self):
-        """Validar que hay suficiente stock antes de guardar."""
+        """Validar que hay suficiente stock y que el mes no está cerrado."""
+        ensure_period_open(self.sale_date, 'sale_date')
         if self.pk is None:  # Solo para nuevas ventas
             if self.product.stock_count < self.quantity:
                 raise ValidationError({
@@ -183,3 +243,78 @@ class Sale(models.Model):
         if cost_total == 0:
             return 0
         return int(((self.total - cost_total) / cost_total) * 100)
+
+
+class ClosedPeriod(models.Model):
+    """
+    Mes contable cerrado: estado de resultados congelado al cerrar.
+
+    Los reportes usan esta fila en vez de recorrer las ventas y gastos del
+    mes, que desde el cierre no se pueden crear, modificar ni borrar (ver
+    finance/periods.py y finance/signals.py). La fila no se modifica: para
+    corregir un mes se reabre (se borra) y se vuelve a cerrar.
+    """
+    month = models.DateField(
+        unique=True,
+        verbose_name="Mes",
+        help_text="Primer día del mes cerrado"
+    )
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Ingresos ($)")
+    cost_of_goods_sold = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Costo de ventas ($)")
+    expenses = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Gastos ($)")
+    net_profit = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Ganancia neta ($)")
+    sales_count = models.PositiveIntegerField(verbose_name="Ventas")
+    expense_count = models.PositiveIntegerField(verbose_name="Gastos registrados")
+    # {"MARKETING": "120.00", ...} con todas las categorías de EXPENSE_CATEGORIES
+    expenses_by_category = models.JSONField(default=dict, verbose_name="Gastos por categoría")
+    # [{"product_id", "product_name", "quantity", "revenue", "cost_of_goods_sold"}], por ingresos
+    products = models.JSONField(default=list, verbose_name="Ventas por producto")
+    closed_at = models.DateTimeField(auto_now_add=True, verbose_name="Cerrado el")
+
+    class Meta:
+        verbose_name = "Periodo cerrado"
+        verbose_name_plural = "Periodos cerrados"
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValidationError("Un periodo cerrado no se modifica: reabrirlo y volver a cerrarlo.")
+        super().save(*args, **kwargs)
+
+
+class IdempotencyKey(models.Model):
+    """
+    Alta ya ejecutada con una Idempotency-Key (ver finance/idempotency.py).
+
+    La fila se crea en la misma transacción que la venta o el gasto: existe
+    solo si el alta hizo commit, y un reintento concurrente con la misma
+    clave espera en el índice único hasta que la primera termine.
+    """
+    scope = models.CharField(
+        max_length=200,
+        verbose_name="Ámbito",
+        help_text="Endpoint (y usuario) al que pertenece la clave"
+    )
+    key = models.CharField(max_length=255, verbose_name="Clave")
+    fingerprint = models.CharField(
+        max_length=64,
+        verbose_name="Huella",
+        help_text="SHA-256 del contenido de la petición original"
+    )
+    status_code = models.PositiveSmallIntegerField(verbose_name="Código de respuesta")
+    response = models.JSONField(encoder=DjangoJSONEncoder, verbose_name="Respuesta")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creada")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Expira")
+
+    class Meta:
+        verbose_name = "Clave de idempotencia"
+        verbose_name_plural = "Claves de idempotencia"
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='idempotency_scope_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
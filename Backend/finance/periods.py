@@ -0,0 +1,240 @@
+"""
+Cierre de meses contables y estado de resultados histórico.
+
+Incluye:
+- parse_month: "2026-01" -> date(2026, 1, 1)
+- month_range: Límites [inicio, fin) de un rango de meses en hora local
+- month_results: Estado de resultados de un mes calculado desde Sale y Expense
+- close_period / reopen_period: Congelar un mes en ClosedPeriod o deshacerlo
+- profit_and_loss: Reporte por mes (snapshots cerrados + meses abiertos en vivo)
+
+Un mes cerrado se lee de una fila de ClosedPeriod; solo los meses abiertos
+del rango se agregan desde las tablas de ventas y gastos, con una consulta
+agrupada por mes para cada una.
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from dental_api.fastlist import decimal_str
+from .analytics import add_months
+from .models import EXPENSE_CATEGORIES, ClosedPeriod, Expense, PeriodClosed, Sale, month_of
+
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+COGS = Sum(
+    ExpressionWrapper(F('quantity') * F('unit_cost'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+    filter=Q(unit_cost__isnull=False),
+    default=ZERO,
+)
+
+
+def _money(value):
+    # SQLite suma decimales en coma flotante: redondear al centavo
+    return Decimal(value).quantize(CENT)
+
+
+def _format(values):
+    """Decimales como en los DecimalField de DRF ("12.50"), también en dicts anidados."""
+    return {
+        key: decimal_str(value) if isinstance(value, Decimal)
+        else _format(value) if isinstance(value, dict) else value
+        for key, value in values.items()
+    }
+
+
+def parse_month(value):
+    """'AAAA-MM' (o una fecha AAAA-MM-DD) -> primer día del mes; ValueError si no es válido."""
+    return date.fromisoformat(f'{value}-01' if len(value) == 7 else value).replace(day=1)
+
+
+def month_range(first, last):
+    """(inicio, fin) aware en hora local para los meses first..last (inclusive)."""
+    start = timezone.make_aware(datetime.combine(first, time.min))
+    end = timezone.make_aware(datetime.combine(add_months(last, 1), time.min))
+    return start, end
+
+
+def month_results(month):
+    """
+    Estado de resultados del mes (primer día) desde las tablas: totales,
+    gastos por categoría y ventas por producto, en el formato de ClosedPeriod.
+    """
+    start, end = month_range(month, month)
+    sales = Sale.objects.filter(sale_date__gte=start, sale_date__lt=end)
+    expenses = Expense.objects.filter(date__gte=month, date__lt=add_months(month, 1))
+
+    products = list(
+        sales.values('product_id', 'product__name')
+        .annotate(units=Sum('quantity'), revenue=Sum('total'), cogs=COGS, count=Count('pk'))
+        .order_by('-revenue', 'product_id')
+    )
+    by_category = dict(
+        expenses.values_list('category').annotate(total=Sum('amount')).order_by()
+    )
+
+    for row in products:
+        row['revenue'], row['cogs'] = _money(row['revenue']), _money(row['cogs'])
+    by_category = {code: _money(total) for code, total in by_category.items()}
+    revenue = sum((row['revenue'] for row in products), ZERO)
+    cogs = sum((row['cogs'] for row in products), ZERO)
+    total_expenses = sum(by_category.values(), ZERO)
+    return {
+        'month': month,
+        'revenue': revenue,
+        'cost_of_goods_sold': cogs,
+        'expenses': total_expenses,
+        'net_profit': revenue - cogs - total_expenses,
+        'sales_count': sum(row['count'] for row in products),
+        'expense_count': expenses.count(),
+        'expenses_by_category': {
+            code: str(by_category.get(code, ZERO)) for code, _ in EXPENSE_CATEGORIES
+        },
+        'products': [
+            {
+                'product_id': row['product_id'],
+                'product_name': row['product__name'],
+                'quantity': row['units'],
+                'revenue': str(row['revenue']),
+                'cost_of_goods_sold': str(row['cogs']),
+            }
+            for row in products
+        ],
+    }
+
+
+def close_period(month):
+    """
+    Cierra el mes que contiene `month` y retorna su ClosedPeriod.
+
+    Solo se cierran meses ya terminados. Las lecturas y el INSERT van en una
+    transacción: en PostgreSQL conviene cerrar fuera del horario de ventas,
+    porque una venta que entre durante el cálculo no bloquea el cierre.
+    """
+    month = month_of(month)
+    if month >= timezone.localdate().replace(day=1):
+        raise PeriodClosed({'month': "Solo se pueden cerrar meses terminados."})
+    with transaction.atomic():
+        if ClosedPeriod.objects.filter(month=month).exists():
+            raise PeriodClosed({'month': f"El periodo {month:%Y-%m} ya está cerrado."})
+        return ClosedPeriod.objects.create(**month_results(month))
+
+
+def reopen_period(month):
+    """Borra el cierre del mes: sus ventas y gastos vuelven a ser editables."""
+    deleted, _ = ClosedPeriod.objects.filter(month=month_of(month)).delete()
+    return bool(deleted)
+
+
+def _runs(months):
+    """Meses ordenados -> tramos consecutivos [(primero, último), ...]."""
+    runs = []
+    for month in months:
+        if runs and add_months(runs[-1][1], 1) == month:
+            runs[-1] = (runs[-1][0], month)
+        else:
+            runs.append((month, month))
+    return runs
+
+
+def _live_months(open_months):
+    """
+    Totales por mes desde las tablas, solo de `open_months`: dos consultas
+    agrupadas con un rango por tramo de meses abiertos consecutivos (los
+    cerrados intermedios no se recorren).
+    """
+    runs = _runs(open_months)
+    sales_filter, expenses_filter = Q(), Q()
+    for first, last in runs:
+        start, end = month_range(first, last)
+        sales_filter |= Q(sale_date__gte=start, sale_date__lt=end)
+        expenses_filter |= Q(date__gte=first, date__lt=add_months(last, 1))
+    months = {}
+
+    def row(month):
+        return months.setdefault(month, {
+            'revenue': ZERO, 'cost_of_goods_sold': ZERO, 'expenses': ZERO,
+            'sales_count': 0, 'expense_count': 0,
+            'expenses_by_category': {code: ZERO for code, _ in EXPENSE_CATEGORIES},
+        })
+
+    sales = (
+        Sale.objects.filter(sales_filter)
+        .annotate(month=TruncMonth('sale_date'))
+        .values_list('month')
+        .annotate(revenue=Sum('total'), cogs=COGS, count=Count('pk'))
+        .order_by()
+    )
+    for month, revenue, cogs, count in sales:
+        entry = row(month_of(month))
+        entry.update(revenue=_money(revenue), cost_of_goods_sold=_money(cogs), sales_count=count)
+
+    expenses = (
+        Expense.objects.filter(expenses_filter)
+        .annotate(month=TruncMonth('date'))
+        .values_list('month', 'category')
+        .annotate(total=Sum('amount'), count=Count('pk'))
+        .order_by()
+    )
+    for month, category, total, count in expenses:
+        entry = row(month)
+        entry['expenses'] += _money(total)
+        entry['expense_count'] += count
+        entry['expenses_by_category'][category] = _money(total)
+
+    return months, row
+
+
+def profit_and_loss(first, last):
+    """
+    Estado de resultados de los meses first..last (primeros días), uno por
+    mes y el acumulado. Los meses cerrados salen de ClosedPeriod; el resto,
+    de las tablas, solo por los tramos de meses abiertos.
+    """
+    months = []
+    current = first
+    while current <= last:
+        months.append(current)
+        current = add_months(current, 1)
+
+    closed = {period.month: period for period in ClosedPeriod.objects.filter(month__gte=first, month__lte=last)}
+    open_months = [month for month in months if month not in closed]
+    live, empty = _live_months(open_months) if open_months else ({}, None)
+
+    rows = []
+    totals = {'revenue': ZERO, 'cost_of_goods_sold': ZERO, 'expenses': ZERO, 'net_profit': ZERO,
+              'sales_count': 0, 'expense_count': 0}
+    by_category = {code: ZERO for code, _ in EXPENSE_CATEGORIES}
+    for month in months:
+        if month in closed:
+            period = closed[month]
+            entry = {
+                'revenue': period.revenue,
+                'cost_of_goods_sold': period.cost_of_goods_sold,
+                'expenses': period.expenses,
+                'sales_count': period.sales_count,
+                'expense_count': period.expense_count,
+                'expenses_by_category': {code: Decimal(value) for code, value in period.expenses_by_category.items()},
+            }
+        else:
+            entry = live.get(month) or empty(month)
+        entry['net_profit'] = entry['revenue'] - entry['cost_of_goods_sold'] - entry['expenses']
+
+        for key in totals:
+            totals[key] += entry[key]
+        for code, value in entry['expenses_by_category'].items():
+            by_category[code] = by_category.get(code, ZERO) + value
+        rows.append(_format({'month': f'{month:%Y-%m}', 'closed': month in closed, **entry}))
+
+    return {
+        'start': f'{first:%Y-%m}',
+        'end': f'{last:%Y-%m}',
+        **_format({**totals, 'expenses_by_category': by_category}),
+        'months': rows,
+    }
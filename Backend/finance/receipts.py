@@ -0,0 +1,113 @@
+"""
+Compresión de comprobantes de gastos (la ejecuta finance.tasks en segundo plano).
+
+Incluye:
+- compress_image: Foto -> JPEG orientado, reducido a RECEIPT_IMAGE_MAX_SIDE
+- compress_pdf: PDF linealizado y con streams comprimidos (si hay pikepdf)
+- optimize_receipt: Reemplaza el archivo de un gasto por su versión comprimida
+
+Una foto de un teléfono (4000 px, 5–10 MB) queda en unos cientos de KB sin
+perder legibilidad. El archivo solo se reemplaza si el resultado es más
+chico; en cualquier caso el gasto queda con receipt_processed = True.
+"""
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from .models import Expense, receipt_path
+
+try:
+    import pikepdf
+except ImportError:  # pikepdf es opcional: sin él los PDF se guardan tal cual
+    pikepdf = None
+
+
+logger = logging.getLogger('finance.receipts')
+
+
+def compress_image(source):
+    """Bytes JPEG de la imagen `source` (archivo abierto), o None si no es una imagen."""
+    # Import local: Pillow tarda en importarse y solo lo necesita el worker
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    max_side = settings.RECEIPT_IMAGE_MAX_SIDE
+    try:
+        image = Image.open(source)
+        # En JPEG decodifica directamente a escala reducida (1/2, 1/4, 1/8)
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, Image.DecompressionBombError):
+        return None
+
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        # Fondo blanco para las zonas transparentes (capturas de pantalla, PNG)
+        rgba = image.convert('RGBA')
+        image = Image.new('RGB', rgba.size, 'white')
+        image.paste(rgba, mask=rgba.getchannel('A'))
+    elif image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=settings.RECEIPT_JPEG_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def compress_pdf(source):
+    """Bytes del PDF linealizado (primera página visible antes de bajar todo), o None."""
+    if pikepdf is None or not settings.RECEIPT_PDF_OPTIMIZE:
+        return None
+    if source.read(5) != b'%PDF-':
+        return None
+    source.seek(0)
+    try:
+        with pikepdf.open(source) as pdf:
+            output = BytesIO()
+            pdf.save(
+                output,
+                linearize=True,
+                compress_streams=True,
+                recompress_flate=True,
+                object_stream_mode=pikepdf.ObjectStreamMode.generate,
+            )
+    except pikepdf.PdfError:
+        return None
+    return output.getvalue()
+
+
+def optimize_receipt(expense_id):
+    """
+    Comprime el comprobante del gasto. Retorna (bytes antes, bytes después)
+    si se reemplazó el archivo, o None.
+
+    Si mientras tanto se subió otro comprobante, el resultado se descarta
+    (el UPDATE solo aplica si el gasto sigue apuntando al archivo original).
+    """
+    expense = Expense.objects.filter(pk=expense_id).only('receipt').first()
+    if expense is None or not expense.receipt:
+        return None
+    original = expense.receipt.name
+    storage = expense.receipt.storage
+    unchanged = Expense.objects.filter(pk=expense_id, receipt=original)
+
+    try:
+        with storage.open(original, 'rb') as source:
+            before = storage.size(original)
+            is_pdf = original.lower().endswith('.pdf')
+            data, extension = (compress_pdf(source), 'pdf') if is_pdf else (compress_image(source), 'jpg')
+    except FileNotFoundError:
+        logger.warning("Comprobante %s del gasto %s no existe", original, expense_id)
+        data = None
+
+    if data is None or len(data) >= before:
+        unchanged.update(receipt_processed=True)
+        return None
+
+    compressed = storage.save(receipt_path(expense, f'receipt.{extension}'), ContentFile(data))
+    if unchanged.update(receipt=compressed, receipt_processed=True):
+        storage.delete(original)
+        return before, len(data)
+    storage.delete(compressed)
+    return None
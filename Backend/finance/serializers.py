@@ -4,14 +4,31 @@ Serializadores para el módulo de Finanzas.
 Incluye serializadores para:
 - Expense (gastos)
 - Sale (ventas)
+- ClosedPeriod (meses cerrados)
 - Dashboard stats (métricas de negocio)
+
+Las altas y cambios de gastos y ventas se rechazan si caen en un mes cerrado
+(o si el registro ya pertenecía a uno).
 """
 from rest_framework import serializers
-from .models import Expense, Sale
+from .models import ClosedPeriod, Expense, Sale, ensure_period_open
+
+
+class OpenPeriodValidationMixin:
+    """Valida que ni la fecha nueva ni la original caen en un mes cerrado."""
+    period_field = None
 
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        ensure_period_open(attrs.get(self.period_field), self.period_field)
+        if self.instance is not None:
+            ensure_period_open(getattr(self.instance, self.period_field), self.period_field)
+        return attrs
 
-class ExpenseSerializer(serializers.ModelSerializer):
+
+class ExpenseSerializer(OpenPeriodValidationMixin, serializers.ModelSerializer):
     """Serializador para gastos operativos."""
+    period_field = 'date'
     category_display = serializers.CharField(source='get_category_display', read_only=True)
     
     class Meta:
@@ -30,8 +47,9 @@ class ExpenseSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
-class SaleSerializer(serializers.ModelSerializer):
+class SaleSerializer(OpenPeriodValidationMixin, serializers.ModelSerializer):
     """Serializador para ventas manuales."""
+    period_field = 'sale_date'
     product_name = serializers.CharField(source='product.name', read_only=True)
     profit = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     profit_margin_percentage = serializers.IntegerField(read_only=True)
@@ -56,6 +74,27 @@ class SaleSerializer(serializers.ModelSerializer):
         read_only_fields = ['total', 'profit', 'profit_margin_percentage', 'created_at']
 
 
+class ClosedPeriodSerializer(serializers.ModelSerializer):
+    """Estado de resultados congelado de un mes (solo lectura)."""
+    month = serializers.DateField(format='%Y-%m', read_only=True)
+
+    class Meta:
+        model = ClosedPeriod
+        fields = [
+            'month',
+            'revenue',
+            'cost_of_goods_sold',
+            'expenses',
+            'net_profit',
+            'sales_count',
+            'expense_count',
+            'expenses_by_category',
+            'products',
+            'closed_at',
+        ]
+        read_only_fields = fields
+
+
 class TopProductSerializer(serializers.Serializer):
     """Serializador para productos más vendidos."""
     product_id = serializers.IntegerField()
@@ -3,10 +3,44 @@ Django Signals para automatización del módulo de finanzas.
 
 Implementa:
 - Descuento automático de stock al registrar una venta
+- Compresión en segundo plano de cada comprobante nuevo (finance/tasks.py)
+- Invalidación del resumen de gastos cacheado (finance/analytics.py)
+- Bloqueo de altas, cambios y bajas en meses cerrados (ClosedPeriod)
+- Métricas del dashboard: invalidación y eventos en vivo (finance/dashboard.py)
 """
-from django.db.models.signals import post_save
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Sale
+from .models import Expense, Sale, ensure_period_open
+from .tasks import optimize_receipt_task
+
+
+# Campo de fecha que determina el mes contable de cada modelo
+PERIOD_DATE_FIELDS = {Expense: 'date', Sale: 'sale_date'}
+
+
+@receiver(pre_save, sender=Expense)
+@receiver(pre_save, sender=Sale)
+def protect_closed_periods(sender, instance, **kwargs):
+    """
+    Última barrera para cualquier camino (shell, comandos, código nuevo): la
+    API y el admin ya validan antes con mensajes por campo. Un cambio revisa
+    el mes nuevo y el original, para no sacar un registro de un mes cerrado.
+    """
+    field = PERIOD_DATE_FIELDS[sender]
+    ensure_period_open(getattr(instance, field), field)
+    if instance.pk is not None:
+        original = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+        ensure_period_open(original, field)
+
+
+@receiver(pre_delete, sender=Expense)
+@receiver(pre_delete, sender=Sale)
+def protect_closed_periods_on_delete(sender, instance, **kwargs):
+    field = PERIOD_DATE_FIELDS[sender]
+    ensure_period_open(getattr(instance, field), field)
 
 
 @receiver(post_save, sender=Sale)
@@ -23,3 +57,50 @@ def update_stock_on_sale(sender, instance, created, **kwargs):
         # Usar update_fields para evitar llamar save() completo
         # Esto también actualiza in_stock automáticamente
         product.save(update_fields=['stock_count', 'in_stock'])
+
+        # Import local: dashboard.py importa DRF, que no debe cargarse en ready()
+        from .dashboard import publish_stock_alert
+
+        publish_stock_alert(product)
+
+
+@receiver(pre_save, sender=Expense)
+def reset_receipt_processed(sender, instance, **kwargs):
+    """
+    Un comprobante subido en este save() aún no está escrito en el storage
+    (FileField.pre_save lo guarda después de esta señal): queda pendiente.
+    """
+    if instance.receipt and not instance.receipt._committed:
+        instance.receipt_processed = False
+
+
+@receiver(post_save, sender=Expense)
+def enqueue_receipt_optimization(sender, instance, **kwargs):
+    if instance.receipt and not instance.receipt_processed:
+        optimize_receipt_task.enqueue_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def invalidate_expense_summary(sender, **kwargs):
+    """
+    Las operaciones masivas (queryset.update, bulk_create) no emiten señales:
+    quien las use debe llamar a bump_expenses_version().
+    """
+    # Import local: analytics.py importa DRF, que no debe cargarse en ready()
+    from .analytics import bump_expenses_version
+
+    bump_expenses_version()
+
+
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def publish_dashboard_changes(sender, **kwargs):
+    """Igual que el resumen: las operaciones masivas no emiten señales."""
+    # Import local (ver invalidate_expense_summary)
+    from .dashboard import bump_dashboard_version, publish_dashboard_update
+
+    bump_dashboard_version()
+    transaction.on_commit(partial(publish_dashboard_update, sales=sender is Sale))
@@ -0,0 +1,16 @@
+"""
+Tareas en segundo plano de finanzas (ver jobs/queue.py).
+
+Incluye:
+- optimize_receipt_task: Comprime el comprobante recién subido de un gasto
+"""
+from jobs.queue import task
+
+
+@task(queue='files')
+def optimize_receipt_task(expense_id):
+    # Import local: signals.py importa este módulo en ready() y receipts.py
+    # carga pikepdf (si está instalado), que solo necesita el worker
+    from .receipts import optimize_receipt
+
+    optimize_receipt(expense_id)
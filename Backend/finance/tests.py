@@ -1,3 +1,603 @@
-from django.test import TestCase
+"""
+Tests del módulo de finanzas.
 
-# Create your tests here.
+Incluye:
+- Presupuestos de consultas por endpoint de finance.urls
+- Presupuesto de los listados del admin (ventas y gastos) y total estimado
+- Listado rápido de ventas sin serializador (?fast=true)
+- Límite de escrituras por cliente (throttle finance_write)
+- Comprobantes: tope de subida y compresión en segundo plano
+- Resumen de gastos por categoría y periodo (/api/finance/expenses/summary/)
+- Cierre de meses contables y estado de resultados con snapshots
+- Métricas del dashboard en vivo por SSE (/api/finance/dashboard/stream/)
+- Altas idempotentes con Idempotency-Key (reintentos del POS)
+"""
+import os
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from dental_api.admin import EstimatedCountPaginator
+from dental_api.testing import QueryBudgetMixin, build_catalog, parse_events, route_names
+from dental_api.throttling import get_buckets
+from finance import urls as finance_urls
+from finance.analytics import add_months, period_starts
+from finance.dashboard import DASHBOARD_CHANNEL, publish_dashboard_update
+from finance.models import ClosedPeriod, Expense, IdempotencyKey, PeriodClosed, Sale
+from finance.periods import close_period
+from jobs.queue import work_off
+from live.broadcast import Event, get_broadcaster
+from products.models import Product
+
+
+# Presupuesto de consultas por ruta de finance.urls. Toda ruta nueva debe
+# declarar aquí su presupuesto (test_every_route_has_budget).
+QUERY_BUDGETS = {
+    'api-root': 0,
+    'dashboard-stats': 5,   # ventas (un agregado), gastos, top, stock crítico y agotados
+    'dashboard-stream': 5,  # estado inicial: las mismas métricas (o 0 desde la caché)
+    'expense-list': 2,      # COUNT de paginación + página
+    'expense-detail': 1,
+    'expense-summary': 1,   # una consulta agrupada (periodo, categoría)
+    'closed-period-list': 2,
+    'closed-period-detail': 1,
+    'profit-and-loss': 3,   # snapshots del rango + ventas y gastos agrupados de los meses abiertos
+    'sale-list': 2,         # producto vía select_related
+    'sale-detail': 1,
+}
+
+# Presupuesto de los listados del admin (incluye sesión y usuario)
+ADMIN_QUERY_BUDGETS = {
+    'admin:finance_sale_changelist': 8,
+    'admin:finance_expense_changelist': 6,
+}
+
+
+class FinanceQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Cada endpoint de finanzas respeta su presupuesto con datos realistas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = build_catalog()
+        cls.closed = close_period(add_months(timezone.localdate(), -2))
+
+    def _url(self, name):
+        if name == 'api-root':
+            return '/api/finance/'
+        kwargs = {
+            'expense-detail': {'pk': self.catalog['expenses'][0].pk},
+            'sale-detail': {'pk': self.catalog['sales'][0].pk},
+            'closed-period-detail': {'month': f'{self.closed.month:%Y-%m}'},
+        }.get(name, {})
+        return reverse(name, kwargs=kwargs)
+
+    def test_every_route_has_budget(self):
+        self.assertEqual(route_names(finance_urls.urlpatterns), set(QUERY_BUDGETS))
+
+    def test_routes_within_budget(self):
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(route=name):
+                with self.assertQueryBudget(budget, label=name):
+                    response = self.client.get(self._url(name))
+                response.close()  # libera la suscripción de las rutas SSE
+                self.assertEqual(response.status_code, 200)
+
+
+class FinanceAdminQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Los listados del admin no crecen en consultas con el número de filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        build_catalog()
+        cls.admin_user = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'admin123'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def test_changelists_within_budget(self):
+        for name, budget in ADMIN_QUERY_BUDGETS.items():
+            with self.subTest(changelist=name):
+                with self.assertQueryBudget(budget, label=name):
+                    response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+
+    def test_filters_and_drilldown_within_budget(self):
+        url = reverse('admin:finance_sale_changelist')
+        year = timezone.localdate().year
+        for params in (
+            {'product__category__id__exact': Product.objects.first().category_id},
+            {'sale_date__year': year},
+            {'sale_date__year': year, 'sale_date__month': timezone.localdate().month},
+        ):
+            with self.subTest(params=params):
+                with self.assertQueryBudget(8, label=f'sale changelist {params}'):
+                    response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+
+    def test_estimated_count_only_without_filters(self):
+        with mock.patch('dental_api.admin.estimated_row_count', return_value=10**6):
+            self.assertEqual(EstimatedCountPaginator(Sale.objects.all(), 20).count, 10**6)
+            filtered = Sale.objects.filter(quantity=1)
+            self.assertEqual(EstimatedCountPaginator(filtered, 20).count, filtered.count())
+        # Sin estimación (SQLite) se hace el COUNT exacto
+        self.assertEqual(EstimatedCountPaginator(Sale.objects.all(), 20).count, Sale.objects.count())
+
+
+def _without_fast_param(content):
+    """Los enlaces next/previous conservan ?fast=true; el resto debe ser idéntico."""
+    return content.replace(b'fast=true&', b'').replace(b'&fast=true', b'')
+
+
+class SaleFastListTests(QueryBudgetMixin, TestCase):
+    """?fast=true en ventas devuelve exactamente los mismos bytes que SaleSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        catalog = build_catalog(products=20, sales=40, expenses=0)
+        # Venta sin costo unitario (producto sin cost_price) y con margen negativo
+        no_cost = Product.objects.create(
+            name="Sin costo", description="-", price='9.99',
+            category=catalog['categories'][0], stock_count=10,
+        )
+        Sale.objects.create(product=no_cost, quantity=2, unit_price=Decimal('9.99'), sale_date=timezone.now())
+        Sale.objects.create(
+            product=catalog['products'][3], quantity=3, unit_price=Decimal('1.00'), unit_cost=Decimal('3.33'),
+            sale_date=timezone.now(), notes="Liquidación",
+        )
+
+    def test_same_output(self):
+        for params in ({'page_size': 100}, {'page_size': 7, 'page': 3}):
+            with self.subTest(params=params):
+                expected = self.client.get('/api/finance/sales/', params)
+                with self.assertQueryBudget(2, label='sale-list ?fast'):
+                    fast = self.client.get('/api/finance/sales/', {**params, 'fast': 'true'})
+                self.assertEqual(_without_fast_param(fast.content), expected.content)
+
+
+@override_settings(THROTTLE_RATES={**settings.THROTTLE_RATES, 'finance_write': '2/min'})
+class FinanceThrottleTests(TestCase):
+    """Las escrituras de finanzas tienen su propio límite; las lecturas no lo gastan."""
+
+    def setUp(self):
+        get_buckets().clear()
+
+    def test_writes_limited_reads_not(self):
+        payload = {'concept': 'Luz', 'amount': '10.00', 'category': 'UTILITIES', 'date': '2026-01-05'}
+        client_ip = {'REMOTE_ADDR': '203.0.113.7'}
+        for _ in range(2):
+            self.assertEqual(self.client.post('/api/finance/expenses/', payload, **client_ip).status_code, 201)
+        response = self.client.post('/api/finance/expenses/', payload, **client_ip)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.client.get('/api/finance/expenses/', **client_ip).status_code, 200)
+
+
+def _photo(size=(4000, 3000), orientation=None, format='JPEG', mode='RGB'):
+    """Foto de teléfono simulada: ruido (no comprime bien) y orientación EXIF opcional."""
+    image = Image.effect_noise(size, 64).convert(mode)
+    output = BytesIO()
+    if format == 'JPEG':
+        exif = Image.Exif()
+        if orientation:
+            exif[0x0112] = orientation
+        image.save(output, format, quality=95, exif=exif)
+    else:
+        image.save(output, format)
+    return output.getvalue()
+
+
+class ReceiptTests(TestCase):
+    """Los comprobantes se reciben a disco con tope y se comprimen en segundo plano."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.payload = {'concept': 'Factura', 'amount': '25.00', 'category': 'OTHER', 'date': '2026-03-01'}
+
+    def upload(self, name, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/finance/expenses/',
+                {**self.payload, 'receipt': SimpleUploadedFile(name, content)},
+            )
+        return response
+
+    def test_photo_is_downscaled_and_reoriented(self):
+        content = _photo(orientation=6)  # rotada 90°: el lado mayor pasa a ser el alto
+        response = self.upload('IMG_2001.JPG', content)
+        self.assertEqual(response.status_code, 201)
+        expense = Expense.objects.get()
+        self.assertFalse(expense.receipt_processed)
+        original = expense.receipt.path
+
+        self.assertEqual(work_off(), 1)
+        expense.refresh_from_db()
+        self.assertTrue(expense.receipt_processed)
+        self.assertTrue(expense.receipt.name.endswith('.jpg'))
+        self.assertFalse(os.path.exists(original))
+        self.assertLess(expense.receipt.size, len(content) / 4)
+        with Image.open(expense.receipt.path) as image:
+            self.assertEqual(image.size, (1500, 2000))
+
+    def test_transparent_png_gets_white_background(self):
+        self.upload('captura.png', _photo((2400, 1200), format='PNG', mode='RGBA'))
+        work_off()
+        expense = Expense.objects.get()
+        with Image.open(expense.receipt.path) as image:
+            self.assertEqual((image.format, image.mode, image.size), ('JPEG', 'RGB', (2000, 1000)))
+
+    def test_non_image_kept_as_is(self):
+        self.upload('factura.pdf', b'%PDF-1.4 no es un PDF valido')
+        work_off()
+        expense = Expense.objects.get()
+        self.assertTrue(expense.receipt_processed)
+        self.assertTrue(expense.receipt.name.endswith('.pdf'))
+        self.assertEqual(expense.receipt.read(), b'%PDF-1.4 no es un PDF valido')
+
+    def test_oversized_upload_rejected_while_streaming(self):
+        with override_settings(RECEIPT_MAX_UPLOAD_SIZE=100 * 1024):
+            # Content-Length ya supera el tope: se rechaza antes de leer el cuerpo
+            response = self.upload('grande.jpg', b'x' * 300 * 1024)
+            self.assertEqual(response.status_code, 413)
+            # Cuerpo dentro del margen pero archivo sobre el tope: se corta al recibirlo
+            response = self.upload('justo.jpg', b'x' * (100 * 1024 + 10))
+            self.assertEqual(response.status_code, 413)
+        self.assertFalse(Expense.objects.exists())
+        self.assertEqual(os.listdir(settings.MEDIA_ROOT), [])
+
+
+class ExpenseSummaryTests(QueryBudgetMixin, TestCase):
+    """Totales por categoría x periodo en una consulta, cacheados hasta el próximo cambio."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for day, category, amount in [
+            ('2026-01-05', 'MARKETING', '100.00'),
+            ('2026-01-20', 'MARKETING', '50.00'),
+            ('2026-01-31', 'UTILITIES', '50.00'),
+            ('2026-03-02', 'MARKETING', '300.00'),
+            ('2026-04-01', 'OTHER', '999.00'),   # fuera del rango
+        ]:
+            Expense.objects.create(concept='Gasto', amount=Decimal(amount), category=category, date=day)
+
+    def summary(self, **params):
+        return self.client.get('/api/finance/expenses/summary/', params)
+
+    def test_totals_deltas_and_share(self):
+        with self.assertQueryBudget(1, label='expense-summary'):
+            response = self.summary(start_date='2026-01-01', end_date='2026-03-31')
+        data = response.json()
+        self.assertEqual((data['total'], data['count']), ('500.00', 4))
+        shares = {row['category']: (row['total'], row['share']) for row in data['categories']}
+        self.assertEqual(shares['MARKETING'], ('450.00', 90.0))
+        self.assertEqual(shares['UTILITIES'], ('50.00', 10.0))
+        self.assertEqual(shares['OTHER'], ('0.00', 0.0))
+
+        # Febrero sin gastos también aparece: marzo se compara con él
+        periods = [(p['period'], p['total'], p['delta'], p['change_percentage']) for p in data['periods']]
+        self.assertEqual(periods, [
+            ('2026-01-01', '200.00', None, None),
+            ('2026-02-01', '0.00', '-200.00', -100.0),
+            ('2026-03-01', '300.00', '300.00', 100.0),
+        ])
+        self.assertEqual(data['periods'][2]['by_category']['MARKETING'], {'total': '300.00', 'delta': '300.00'})
+
+    def test_granularity_and_category(self):
+        data = self.summary(start_date='2026-01-01', end_date='2026-12-31',
+                            granularity='quarter', category='MARKETING').json()
+        self.assertEqual([c['category'] for c in data['categories']], ['MARKETING'])
+        self.assertEqual([(p['period'], p['total']) for p in data['periods']], [
+            ('2026-01-01', '450.00'), ('2026-04-01', '0.00'), ('2026-07-01', '0.00'), ('2026-10-01', '0.00'),
+        ])
+        weeks = list(period_starts(date(2026, 1, 1), date(2026, 1, 12), 'week'))
+        self.assertEqual(weeks, [date(2025, 12, 29), date(2026, 1, 5), date(2026, 1, 12)])
+
+    def test_cached_until_expense_changes(self):
+        params = {'start_date': '2026-01-01', 'end_date': '2026-03-31'}
+        self.summary(**params)
+        with self.assertQueryBudget(0, label='expense-summary cacheado'):
+            self.summary(**params)
+        with self.captureOnCommitCallbacks(execute=True):
+            Expense.objects.create(concept='Nuevo', amount=Decimal('25.00'), category='OTHER', date='2026-02-10')
+        self.assertEqual(self.summary(**params).json()['total'], '525.00')
+
+    def test_validation(self):
+        for params in ({'start_date': '2026-13-01'}, {'granularity': 'hour'}, {'category': 'NOPE'},
+                       {'start_date': '2026-05-01', 'end_date': '2026-01-01'},
+                       {'start_date': '1990-01-01', 'end_date': '2026-01-01', 'granularity': 'day'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.summary(**params).status_code, 400)
+
+
+class ClosedPeriodTests(QueryBudgetMixin, TestCase):
+    """Un mes cerrado congela su estado de resultados y no admite cambios."""
+
+    @classmethod
+    def setUpTestData(cls):
+        products = [p for p in build_catalog(products=6, sales=0, expenses=0)['products'] if p.stock_count]
+        cls.product, other = products[0], products[1]
+
+        def sale(product, day, quantity, price, cost):
+            return Sale.objects.create(
+                product=product, quantity=quantity, unit_price=Decimal(price), unit_cost=Decimal(cost),
+                sale_date=timezone.make_aware(timezone.datetime.fromisoformat(day)),
+            )
+
+        cls.january_sale = sale(cls.product, '2025-01-10 10:00', 2, '30.00', '10.00')
+        sale(other, '2025-01-31 23:30', 1, '50.00', '20.00')   # hora local: sigue siendo enero
+        cls.february_sale = sale(cls.product, '2025-02-01 00:10', 1, '30.00', '10.00')
+        cls.january_expense = Expense.objects.create(
+            concept='Publicidad', amount=Decimal('25.00'), category='MARKETING', date='2025-01-15')
+        cls.february_expense = Expense.objects.create(
+            concept='Luz', amount=Decimal('5.00'), category='UTILITIES', date='2025-02-03')
+
+    def close(self, month):
+        return self.client.post('/api/finance/periods/', {'month': month})
+
+    def test_snapshot_contents(self):
+        response = self.close('2025-01')
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(
+            (data['month'], data['revenue'], data['cost_of_goods_sold'], data['expenses'], data['net_profit']),
+            ('2025-01', '110.00', '40.00', '25.00', '45.00'),
+        )
+        self.assertEqual((data['sales_count'], data['expense_count']), (2, 1))
+        self.assertEqual(data['expenses_by_category']['MARKETING'], '25.00')
+        self.assertEqual(data['expenses_by_category']['OTHER'], '0.00')
+        self.assertEqual(
+            [(row['product_id'], row['quantity'], row['revenue']) for row in data['products']],
+            [(self.product.pk, 2, '60.00'), (data['products'][1]['product_id'], 1, '50.00')],
+        )
+        self.assertEqual(self.client.get('/api/finance/periods/2025-01/').json(), data)
+
+    def test_writes_to_closed_month_rejected(self):
+        self.close('2025-01')
+        payload = {'concept': 'Tardío', 'amount': '1.00', 'category': 'OTHER', 'date': '2025-01-20'}
+        response = self.client.post('/api/finance/expenses/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date', response.json())
+
+        url = f'/api/finance/sales/{self.january_sale.pk}/'
+        self.assertEqual(self.client.patch(url, {'notes': 'x'}, content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        # Mover un gasto abierto a un mes cerrado tampoco
+        moved = self.client.patch(f'/api/finance/expenses/{self.february_expense.pk}/',
+                                  {'date': '2025-01-31'}, content_type='application/json')
+        self.assertEqual(moved.status_code, 400)
+
+        # Fuera de la API, el signal es la última barrera (la baja corre en
+        # un atomic sin savepoint: aislarla para seguir usando la conexión)
+        with self.assertRaises(PeriodClosed), transaction.atomic():
+            self.january_expense.delete()
+        self.february_expense.date = '2025-01-05'
+        with self.assertRaises(PeriodClosed):
+            self.february_expense.save()
+
+        # Febrero sigue abierto
+        payload['date'] = '2025-02-20'
+        self.assertEqual(self.client.post('/api/finance/expenses/', payload).status_code, 201)
+
+    def test_profit_and_loss_reads_snapshots(self):
+        self.close('2025-01')
+        # Un cambio masivo (sin signals) en enero no altera el mes cerrado
+        Sale.objects.filter(pk=self.january_sale.pk).update(total=Decimal('999.00'))
+        with self.assertQueryBudget(3, label='profit-and-loss'):
+            data = self.client.get('/api/finance/pnl/', {'start': '2025-01', 'end': '2025-03'}).json()
+        months = [(m['month'], m['closed'], m['revenue'], m['net_profit']) for m in data['months']]
+        self.assertEqual(months, [
+            ('2025-01', True, '110.00', '45.00'),
+            ('2025-02', False, '30.00', '15.00'),
+            ('2025-03', False, '0.00', '0.00'),
+        ])
+        self.assertEqual((data['revenue'], data['expenses'], data['net_profit']), ('140.00', '30.00', '60.00'))
+        self.assertEqual(data['expenses_by_category']['UTILITIES'], '5.00')
+
+    def test_profit_and_loss_skips_closed_months_between_open_ones(self):
+        self.close('2025-02')
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/finance/pnl/', {'start': '2025-01', 'end': '2025-03'}).json()
+        months = [(m['month'], m['closed'], m['revenue']) for m in data['months']]
+        self.assertEqual(months, [('2025-01', False, '110.00'), ('2025-02', True, '30.00'), ('2025-03', False, '0.00')])
+        # Un rango por tramo abierto (enero, marzo): febrero no se recorre
+        [sales_sql] = [q['sql'] for q in queries if f'FROM "{Sale._meta.db_table}"' in q['sql']]
+        self.assertEqual(sales_sql.count('"sale_date" >='), 2)
+
+    def test_close_rules_and_reopen(self):
+        this_month = f'{timezone.localdate():%Y-%m}'
+        self.assertEqual(self.close(this_month).status_code, 400)
+        self.assertEqual(self.close('enero').status_code, 400)
+        self.assertEqual(self.close('2025-01').status_code, 201)
+        self.assertEqual(self.close('2025-01').status_code, 400)
+
+        with self.assertRaises(Exception):
+            ClosedPeriod.objects.get().save()
+
+        self.assertEqual(self.client.delete('/api/finance/periods/2025-01/').status_code, 204)
+        self.january_expense.amount = Decimal('30.00')
+        self.january_expense.save()
+
+    def test_command(self):
+        out = StringIO()
+        call_command('close_period', '2025-02', stdout=out)
+        self.assertIn('ganancia neta $15.00', out.getvalue())
+        call_command('close_period', '2025-02', '--reopen', stdout=out)
+        self.assertFalse(ClosedPeriod.objects.exists())
+
+
+@override_settings(LIVE_HEARTBEAT=0.05)
+class DashboardStreamTests(TestCase):
+    """El stream envía las métricas completas y luego solo las que cambian."""
+
+    @classmethod
+    def setUpTestData(cls):
+        products = build_catalog(products=8, sales=0, expenses=0)['products']
+        cls.product = next(product for product in products if product.stock_count >= 6)
+
+    def setUp(self):
+        cache.clear()
+
+    def open_stream(self):
+        response = self.client.get(reverse('dashboard-stream'))
+        self.addCleanup(response.close)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = iter(response.streaming_content)
+        [(kind, snapshot)] = parse_events(next(stream))
+        self.assertEqual(kind, 'snapshot')
+        return snapshot, stream
+
+    def dashboard(self):
+        return self.client.get(reverse('dashboard-stats')).json()
+
+    def test_sale_pushes_metrics_and_stock_alert(self):
+        snapshot, stream = self.open_stream()
+        self.assertEqual(snapshot, self.dashboard())
+        self.assertEqual(parse_events(next(stream)), [])  # ping
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Sale.objects.create(
+                product=self.product, quantity=self.product.stock_count - 2,
+                unit_price=Decimal('10.00'), sale_date=timezone.now(),
+            )
+        events = dict(parse_events(next(stream)))
+
+        self.assertEqual(events['stock_alert'], {'id': self.product.pk, 'name': self.product.name, 'stock_count': 2})
+        metrics = events['metrics']
+        self.assertIn('top_products', metrics)
+        self.assertNotIn('critical_stock_alerts', metrics)
+        # Los valores enviados son los que ahora devuelve el dashboard
+        current = self.dashboard()
+        self.assertEqual(metrics, {name: current[name] for name in metrics})
+        self.assertEqual(metrics['total_sales_count'], snapshot['total_sales_count'] + 1)
+
+    def test_expense_pushes_only_what_it_changes(self):
+        _, stream = self.open_stream()
+        with self.captureOnCommitCallbacks(execute=True):
+            Expense.objects.create(concept='Luz', amount=Decimal('12.50'), category='UTILITIES', date=timezone.now().date())
+        [(kind, metrics)] = parse_events(next(stream))
+        self.assertEqual(kind, 'metrics')
+        self.assertEqual(set(metrics), {'total_expenses', 'net_profit'})
+        self.assertEqual(metrics['total_expenses'], self.dashboard()['total_expenses'])
+
+    @override_settings(LIVE_WSGI_MAX_STREAMS=1)
+    def test_wsgi_streams_are_capped_per_process(self):
+        first = self.client.get(reverse('dashboard-stream'))
+        busy = self.client.get(reverse('dashboard-stream'))
+        self.assertEqual(busy.status_code, 503)
+        self.assertEqual(busy['Retry-After'], str(settings.LIVE_BUSY_RETRY))
+        self.assertEqual(busy.content.decode(), f'retry: {settings.LIVE_BUSY_RETRY * 1000}\n\n')
+        self.assertEqual(get_broadcaster().subscriber_count(DASHBOARD_CHANNEL), 1)
+
+        first.close()
+        second = self.client.get(reverse('dashboard-stream'))
+        self.addCleanup(second.close)
+        self.assertEqual(second.status_code, 200)
+
+    @override_settings(THROTTLE_RATES={**settings.THROTTLE_RATES, 'live': '2/min'})
+    def test_new_connections_are_throttled(self):
+        get_buckets().clear()
+        client_ip = {'REMOTE_ADDR': '203.0.113.7'}
+        for _ in range(2):
+            self.client.get(reverse('dashboard-stream'), **client_ip).close()
+        response = self.client.get(reverse('dashboard-stream'), **client_ip)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_no_work_without_subscribers(self):
+        with self.assertNumQueries(0):
+            publish_dashboard_update()
+
+    async def test_asgi_stream(self):
+        response = await self.async_client.get(reverse('dashboard-stream'))
+        stream = aiter(response.streaming_content)
+        [(kind, _)] = parse_events(await anext(stream))
+        self.assertEqual(kind, 'snapshot')
+
+        get_broadcaster().publish(Event(DASHBOARD_CHANNEL, 'metrics', {'net_profit': '1.00'}, key='metrics'))
+        self.assertEqual(parse_events(await anext(stream)), [('metrics', {'net_profit': '1.00'})])
+        await stream.aclose()
+
+
+class IdempotencyTests(TestCase):
+    """Un reintento con la misma Idempotency-Key no crea otra venta ni descuenta stock dos veces."""
+
+    @classmethod
+    def setUpTestData(cls):
+        products = build_catalog(products=6, sales=0, expenses=0)['products']
+        cls.product = next(product for product in products if product.stock_count >= 6)
+
+    def post_sale(self, key, quantity=2, **extra):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key is not None else {}
+        return self.client.post('/api/finance/sales/', {
+            'product': self.product.pk, 'quantity': quantity,
+            'unit_price': '10.00', 'sale_date': '2026-03-02T10:00:00Z',
+        }, content_type='application/json', **headers, **extra)
+
+    def stock(self):
+        return Product.objects.values_list('stock_count', flat=True).get(pk=self.product.pk)
+
+    def test_retry_replays_original_response(self):
+        stock = self.stock()
+        first = self.post_sale('pos-1-0001')
+        self.assertEqual(first.status_code, 201)
+        retry = self.post_sale('pos-1-0001')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Sale.objects.count(), 1)
+        self.assertEqual(self.stock(), stock - 2)
+
+        # Otra clave (u otra sin clave) es otra venta
+        self.assertEqual(self.post_sale('pos-1-0002').status_code, 201)
+        self.assertEqual(self.post_sale(None).status_code, 201)
+        self.assertEqual(Sale.objects.count(), 3)
+
+    def test_same_key_different_payload(self):
+        self.post_sale('pos-1-0001')
+        response = self.post_sale('pos-1-0001', quantity=3)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_rejected_create_does_not_keep_key(self):
+        self.assertEqual(self.post_sale('pos-1-0001', quantity='dos').status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post_sale('pos-1-0001').status_code, 201)
+
+    def test_expired_key_runs_again_and_purge(self):
+        self.post_sale('pos-1-0001')
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        response = self.post_sale('pos-1-0001')
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Sale.objects.count(), 2)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('1 claves', out.getvalue())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_expense_and_invalid_key(self):
+        data = {'concept': 'Luz', 'amount': '12.50', 'category': 'UTILITIES', 'date': '2026-03-02'}
+        for _ in range(2):
+            response = self.client.post('/api/finance/expenses/', data, HTTP_IDEMPOTENCY_KEY='gasto-1')
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(Expense.objects.count(), 1)
+        self.assertEqual(self.post_sale('x' * 256).status_code, 400)
@@ -0,0 +1,53 @@
+"""
+Recepción de comprobantes de gastos.
+
+Incluye:
+- ReceiptTooLarge: Error 413 de la API cuando el archivo supera el límite
+- ReceiptUploadHandler: Handler que escribe a disco y corta al pasar el límite
+- use_receipt_upload_handler: Lo instala en una petición antes de leer el cuerpo
+
+Con los handlers por defecto un archivo de hasta 2,5 MB se guarda completo en
+memoria y no hay tope de tamaño. Este handler escribe cada trozo a un archivo
+temporal según llega y rechaza la petición apenas supera
+RECEIPT_MAX_UPLOAD_SIZE (o antes de leer nada si Content-Length ya lo supera).
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# Margen para los campos de texto del formulario multipart
+FORM_OVERHEAD = 64 * 1024
+
+
+class ReceiptTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_code = 'receipt_too_large'
+
+    def __init__(self):
+        limit = settings.RECEIPT_MAX_UPLOAD_SIZE / 1024 / 1024
+        super().__init__(f'El comprobante supera el máximo de {limit:.0f} MB.')
+
+
+class ReceiptUploadHandler(TemporaryFileUploadHandler):
+    """Archivos siempre a disco (nunca en memoria) con tope de tamaño."""
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > settings.RECEIPT_MAX_UPLOAD_SIZE + FORM_OVERHEAD:
+            raise ReceiptTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.RECEIPT_MAX_UPLOAD_SIZE:
+            self.file.close()  # borra el temporal
+            raise ReceiptTooLarge()
+        return super().receive_data_chunk(raw_data, start)
+
+
+def use_receipt_upload_handler(request):
+    """`request` es el HttpRequest de Django, antes de acceder a POST/FILES."""
+    request.upload_handlers = [ReceiptUploadHandler(request)]
@@ -3,21 +3,35 @@ URLs para el módulo de Finanzas.
 
 Endpoints disponibles:
 - /api/finance/dashboard/ - Métricas del dashboard
+- /api/finance/dashboard/stream/ - Métricas del dashboard en vivo (SSE)
 - /api/finance/expenses/ - CRUD de gastos
+- /api/finance/expenses/summary/ - Gastos por categoría y periodo
 - /api/finance/sales/ - CRUD de ventas
+- /api/finance/periods/ - Cierre de meses contables
+- /api/finance/pnl/ - Estado de resultados por mes
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import DashboardStatsView, ExpenseViewSet, SaleViewSet
+from .views import (
+    ClosedPeriodViewSet,
+    DashboardStatsView,
+    ExpenseViewSet,
+    ProfitAndLossView,
+    SaleViewSet,
+    dashboard_stream,
+)
 
 # Router para ViewSets
 router = DefaultRouter()
 router.register(r'expenses', ExpenseViewSet, basename='expense')
 router.register(r'sales', SaleViewSet, basename='sale')
+router.register(r'periods', ClosedPeriodViewSet, basename='closed-period')
 
 urlpatterns = [
     # Dashboard endpoint
     path('dashboard/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('dashboard/stream/', dashboard_stream, name='dashboard-stream'),
+    path('pnl/', ProfitAndLossView.as_view(), name='profit-and-loss'),
     
     # ViewSets (expenses, sales)
     path('', include(router.urls)),
@@ -3,30 +3,58 @@ Vistas API para el módulo de Inteligencia Financiera.
 
 Incluye:
 - DashboardStatsView: Métricas de negocio en tiempo real
-- ExpenseViewSet: CRUD de gastos
+- dashboard_stream: Las mismas métricas por SSE, actualizadas en cada venta o gasto
+- ExpenseViewSet: CRUD de gastos y resumen por categoría y periodo
 - SaleViewSet: CRUD de ventas
+- ClosedPeriodViewSet: Cierre y reapertura de meses contables
+- ProfitAndLossView: Estado de resultados por mes (cerrados + abiertos)
 """
 from decimal import Decimal
-from datetime import timedelta
+from datetime import date
+from itertools import islice
 
-from django.db.models import Sum, Count, F, Value
-from django.db.models.functions import Coalesce
 from django.utils import timezone
 
-from rest_framework import viewsets, status
+from django.conf import settings
+from django.http import Http404
+from django.views.decorators.http import require_GET
+
+from rest_framework import mixins, viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 
-from products.models import Product
-from .models import Expense, Sale
+from dental_api.fastlist import DATETIME, FastListMixin, decimal_str
+from dental_api.throttling import ExportThrottle, FinanceWriteThrottle, LiveStreamThrottle, throttle_view
+from live.broadcast import Event, get_broadcaster
+from live.sse import stream_response
+from .analytics import GRANULARITIES, add_months, get_expense_summary, period_starts
+from .dashboard import DASHBOARD_CHANNEL, get_dashboard_stats
+from .idempotency import IdempotentCreateMixin
+from .models import EXPENSE_CATEGORIES, ClosedPeriod, Expense, PeriodClosed, Sale, ensure_period_open
+from .periods import close_period, parse_month, profit_and_loss, reopen_period
+from .uploads import use_receipt_upload_handler
 from .serializers import (
+    ClosedPeriodSerializer,
     ExpenseSerializer,
     SaleSerializer,
-    DashboardStatsSerializer
 )
 
 
+class OpenPeriodDestroyMixin:
+    """DELETE de un registro de un mes cerrado: 400 en vez del error del signal."""
+    period_field = None
+
+    def perform_destroy(self, instance):
+        try:
+            ensure_period_open(getattr(instance, self.period_field), self.period_field)
+        except PeriodClosed as exc:
+            raise ValidationError(exc.message_dict)
+        super().perform_destroy(instance)
+
+
 class DashboardStatsView(APIView):
     """
     Dashboard con métricas de negocio en tiempo real.
@@ -38,161 +66,57 @@ class DashboardStatsView(APIView):
     - Ganancia neta real
     - Top 5 productos más vendidos
     - Alertas de stock crítico
+    
+    Se calcula una vez por cada venta, gasto o cambio del catálogo (ver
+    finance/dashboard.py); para seguirlo en vivo usar dashboard_stream.
     """
     permission_classes = [AllowAny]  # Cambiar a IsAdminUser en producción
     
     def get(self, request):
-        now = timezone.now()
-        
-        # Calcular inicio del mes actual y anterior
-        current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        previous_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
-        
-        # ========================================
-        # INGRESOS
-        # ========================================
-        
-        # Ingresos mes actual
-        current_revenue = Sale.objects.filter(
-            sale_date__gte=current_month_start
-        ).aggregate(
-            total=Coalesce(Sum('total'), Value(Decimal('0')))
-        )['total']
-        
-        # Ingresos mes anterior
-        previous_revenue = Sale.objects.filter(
-            sale_date__gte=previous_month_start,
-            sale_date__lt=current_month_start
-        ).aggregate(
-            total=Coalesce(Sum('total'), Value(Decimal('0')))
-        )['total']
-        
-        # Calcular porcentaje de cambio
-        revenue_change = self._calculate_percentage_change(
-            float(current_revenue),
-            float(previous_revenue)
-        )
-        
-        # ========================================
-        # GASTOS
-        # ========================================
-        
-        total_expenses = Expense.objects.filter(
-            date__gte=current_month_start.date()
-        ).aggregate(
-            total=Coalesce(Sum('amount'), Value(Decimal('0')))
-        )['total']
-        
-        # ========================================
-        # COSTO DE PRODUCTOS VENDIDOS (COGS)
-        # ========================================
-        
-        # Sumamos quantity * unit_cost para todas las ventas del mes
-        cogs_result = Sale.objects.filter(
-            sale_date__gte=current_month_start,
-            unit_cost__isnull=False
-        ).aggregate(
-            total=Sum(F('quantity') * F('unit_cost'))
-        )
-        cogs = cogs_result['total'] or Decimal('0')
-        
-        # ========================================
-        # GANANCIA NETA
-        # ========================================
-        
-        net_profit = current_revenue - cogs - total_expenses
-        
-        # ========================================
-        # CONTEO DE VENTAS
-        # ========================================
-        
-        total_sales_count = Sale.objects.filter(
-            sale_date__gte=current_month_start
-        ).count()
-        
-        # ========================================
-        # TOP 5 PRODUCTOS MÁS VENDIDOS
-        # ========================================
-        
-        top_products = Sale.objects.filter(
-            sale_date__gte=current_month_start
-        ).values(
-            'product__id',
-            'product__name'
-        ).annotate(
-            total_sold=Sum('quantity'),
-            revenue=Sum('total')
-        ).order_by('-total_sold')[:5]
-        
-        # Formatear para el serializador
-        top_products_formatted = [
-            {
-                'product_id': p['product__id'],
-                'product_name': p['product__name'],
-                'total_sold': p['total_sold'],
-                'revenue': p['revenue']
-            }
-            for p in top_products
-        ]
-        
-        # ========================================
-        # ALERTAS DE STOCK CRÍTICO
-        # ========================================
-        
-        # Productos con menos de 5 unidades pero más de 0
-        critical_stock = Product.objects.filter(
-            stock_count__lt=5,
-            stock_count__gt=0
-        ).values('id', 'name', 'stock_count')[:10]
-        
-        # Productos agotados
-        out_of_stock = Product.objects.filter(
-            stock_count=0
-        ).values('id', 'name', 'stock_count')[:10]
-        
-        # Combinar alertas
-        alerts = list(critical_stock) + list(out_of_stock)
-        
-        # ========================================
-        # RESPUESTA
-        # ========================================
-        
-        data = {
-            'current_month_revenue': current_revenue,
-            'previous_month_revenue': previous_revenue,
-            'revenue_change_percentage': revenue_change,
-            'total_expenses': total_expenses,
-            'cost_of_goods_sold': cogs,
-            'net_profit': net_profit,
-            'total_sales_count': total_sales_count,
-            'top_products': top_products_formatted,
-            'critical_stock_alerts': alerts,
-        }
-        
-        serializer = DashboardStatsSerializer(data)
-        return Response(serializer.data)
-    
-    def _calculate_percentage_change(self, current: float, previous: float) -> float:
-        """Calcular porcentaje de cambio entre dos valores."""
-        if previous == 0:
-            return 100.0 if current > 0 else 0.0
-        return round(((current - previous) / previous) * 100, 2)
+        return Response(get_dashboard_stats())
+
+
+@require_GET
+@throttle_view(LiveStreamThrottle)
+def dashboard_stream(request):
+    """
+    GET /api/finance/dashboard/stream/ - Métricas del dashboard por SSE
+
+    Eventos:
+    - snapshot: Métricas completas (igual que /api/finance/dashboard/)
+    - metrics: Métricas que cambiaron tras una venta o gasto (valores actuales)
+    - stock_alert: Producto que una venta dejó en stock crítico o agotado
+    - resync: Se perdieron eventos; volver a pedir /api/finance/dashboard/
+    """
+    subscription = get_broadcaster().subscribe([DASHBOARD_CHANNEL])
+    snapshot = Event(DASHBOARD_CHANNEL, 'snapshot', get_dashboard_stats())
+    return stream_response(request, subscription, [snapshot])
 
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(IdempotentCreateMixin, OpenPeriodDestroyMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de gastos.
     
     Endpoints:
     - GET /api/finance/expenses/ - Listar gastos
-    - POST /api/finance/expenses/ - Crear gasto
+    - POST /api/finance/expenses/ - Crear gasto (admite `Idempotency-Key`)
     - GET /api/finance/expenses/{id}/ - Detalle de gasto
     - PUT /api/finance/expenses/{id}/ - Actualizar gasto
     - DELETE /api/finance/expenses/{id}/ - Eliminar gasto
+    - GET /api/finance/expenses/summary/ - Totales por categoría y periodo
+    
+    El comprobante (multipart, campo `receipt`) se recibe directo a disco con
+    tope RECEIPT_MAX_UPLOAD_SIZE (413 si lo supera) y se comprime después.
     """
     queryset = Expense.objects.all()
     serializer_class = ExpenseSerializer
+    period_field = 'date'
     permission_classes = [AllowAny]  # Cambiar a IsAdminUser en producción
+    throttle_classes = [FinanceWriteThrottle, ExportThrottle]
+    
+    def initialize_request(self, request, *args, **kwargs):
+        use_receipt_upload_handler(request)
+        return super().initialize_request(request, *args, **kwargs)
     
     def get_queryset(self):
         """Permitir filtrar por categoría y rango de fechas."""
@@ -213,21 +137,70 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    
+    @action(detail=False, methods=['get'], url_path='summary')
+    def summary(self, request):
+        """
+        Totales por categoría x periodo, variación contra el periodo anterior
+        y participación de cada categoría en el total (ver analytics.py).
+        
+        Parámetros:
+            ?start_date=2026-01-01&end_date=2026-06-30  (default: últimos 12 meses)
+            ?granularity=month                          (day, week, month, quarter, year)
+            ?category=MARKETING                         (opcional)
+        """
+        params = request.query_params
+        today = timezone.localdate()
+        try:
+            end = date.fromisoformat(params['end_date']) if params.get('end_date') else today
+            start = (
+                date.fromisoformat(params['start_date']) if params.get('start_date')
+                else add_months(end, -11)
+            )
+        except ValueError:
+            return Response(
+                {'detail': 'Las fechas deben tener formato AAAA-MM-DD.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        granularity = params.get('granularity', 'month')
+        category = params.get('category') or None
+        
+        errors = {}
+        if start > end:
+            errors['start_date'] = 'Debe ser anterior o igual a end_date.'
+        if granularity not in GRANULARITIES:
+            errors['granularity'] = f"Debe ser una de: {', '.join(GRANULARITIES)}."
+        if category and category not in dict(EXPENSE_CATEGORIES):
+            errors['category'] = 'Categoría de gasto desconocida.'
+        if not errors:
+            max_periods = settings.EXPENSE_SUMMARY_MAX_PERIODS
+            if len(list(islice(period_starts(start, end, granularity), max_periods + 1))) > max_periods:
+                errors['granularity'] = f'El rango abarca más de {max_periods} periodos: use uno más largo.'
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(get_expense_summary(start, end, granularity, category))
 
-class SaleViewSet(viewsets.ModelViewSet):
+
+class SaleViewSet(IdempotentCreateMixin, OpenPeriodDestroyMixin, FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de ventas manuales.
     
     Endpoints:
     - GET /api/finance/sales/ - Listar ventas
     - POST /api/finance/sales/ - Registrar venta (descuenta stock automáticamente)
+      Con `Idempotency-Key` un reintento devuelve la venta original sin duplicarla.
     - GET /api/finance/sales/{id}/ - Detalle de venta
     - PUT /api/finance/sales/{id}/ - Actualizar venta
     - DELETE /api/finance/sales/{id}/ - Eliminar venta
+    
+    Listado sin serializador para el POS: ?fast=true&page_size=500
     """
     queryset = Sale.objects.select_related('product').all()
     serializer_class = SaleSerializer
+    period_field = 'sale_date'
     permission_classes = [AllowAny]  # Cambiar a IsAdminUser en producción
+    throttle_classes = [FinanceWriteThrottle, ExportThrottle]
     
     def get_queryset(self):
         """Permitir filtrar por producto y rango de fechas."""
@@ -247,3 +220,112 @@ class SaleViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(sale_date__lte=end_date)
         
         return queryset
+    
+    # =========================================================================
+    # LISTADO RÁPIDO (?fast=true)
+    # =========================================================================
+    
+    fast_columns = (
+        'id', 'product_id', 'product__name', 'quantity', 'unit_price', 'unit_cost',
+        'total', 'sale_date', 'customer_name', 'notes', 'created_at',
+    )
+    
+    def fast_values(self, queryset):
+        return queryset.values_list(*self.fast_columns)
+    
+    def fast_rows(self, tuples):
+        """Filas idénticas a SaleSerializer (ganancia con la misma aritmética Decimal que Sale)."""
+        rows = []
+        for (pk, product_id, product_name, quantity, unit_price, unit_cost,
+             total, sale_date, customer_name, notes, created_at) in tuples:
+            if unit_cost is None:
+                profit = Decimal('0')
+                margin = 0
+            else:
+                cost_total = Decimal(str(quantity)) * unit_cost
+                profit = total - cost_total
+                margin = int((profit / cost_total) * 100) if cost_total != 0 else 0
+            rows.append({
+                'id': pk,
+                'product': product_id,
+                'product_name': product_name,
+                'quantity': quantity,
+                'unit_price': decimal_str(unit_price),
+                'unit_cost': decimal_str(unit_cost),
+                'total': decimal_str(total),
+                'profit': decimal_str(profit),
+                'profit_margin_percentage': margin,
+                'sale_date': DATETIME.to_representation(sale_date),
+                'customer_name': customer_name,
+                'notes': notes,
+                'created_at': DATETIME.to_representation(created_at),
+            })
+        return rows
+
+
+class ClosedPeriodViewSet(mixins.CreateModelMixin, mixins.DestroyModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Meses contables cerrados.
+    
+    Endpoints:
+    - GET /api/finance/periods/ - Meses cerrados con su estado de resultados
+    - GET /api/finance/periods/{AAAA-MM}/ - Detalle (por categoría y producto)
+    - POST /api/finance/periods/ {"month": "AAAA-MM"} - Cerrar un mes terminado
+    - DELETE /api/finance/periods/{AAAA-MM}/ - Reabrir el mes
+    
+    Las ventas y gastos de un mes cerrado no se pueden crear, modificar ni borrar.
+    """
+    queryset = ClosedPeriod.objects.all()
+    serializer_class = ClosedPeriodSerializer
+    permission_classes = [AllowAny]  # Cambiar a IsAdminUser en producción
+    throttle_classes = [FinanceWriteThrottle]
+    lookup_field = 'month'
+    lookup_value_regex = r'\d{4}-\d{2}'
+    
+    def get_object(self):
+        try:
+            self.kwargs['month'] = parse_month(self.kwargs['month'])
+        except ValueError:
+            raise Http404
+        return super().get_object()
+    
+    def create(self, request, *args, **kwargs):
+        try:
+            period = close_period(parse_month(str(request.data.get('month', ''))))
+        except ValueError:
+            raise ValidationError({'month': 'Debe tener formato AAAA-MM.'})
+        except PeriodClosed as exc:
+            raise ValidationError(exc.message_dict)
+        return Response(self.get_serializer(period).data, status=status.HTTP_201_CREATED)
+    
+    def perform_destroy(self, instance):
+        reopen_period(instance.month)
+
+
+class ProfitAndLossView(APIView):
+    """
+    Estado de resultados por mes y acumulado.
+    
+    GET /api/finance/pnl/                              - Año en curso hasta este mes
+    GET /api/finance/pnl/?start=2025-01&end=2025-12    - Cualquier rango de meses
+    
+    Los meses cerrados se leen de su snapshot (una fila cada uno); solo los
+    abiertos se calculan desde las ventas y gastos.
+    """
+    permission_classes = [AllowAny]  # Cambiar a IsAdminUser en producción
+    
+    def get(self, request):
+        this_month = timezone.localdate().replace(day=1)
+        try:
+            end = parse_month(request.query_params['end']) if request.query_params.get('end') else this_month
+            start = (
+                parse_month(request.query_params['start']) if request.query_params.get('start')
+                else end.replace(month=1)
+            )
+        except ValueError:
+            return Response({'detail': 'Los meses deben tener formato AAAA-MM.'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'start': 'Debe ser anterior o igual a end.'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end.year - start.year) * 12 + end.month - start.month >= settings.EXPENSE_SUMMARY_MAX_PERIODS:
+            return Response({'start': 'Rango demasiado largo.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(profit_and_loss(start, end))
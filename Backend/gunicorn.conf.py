@@ -0,0 +1,153 @@
+"""
+Configuración de gunicorn (se lee sola al ejecutar `gunicorn` desde Backend/).
+
+Uso (sin módulo: lo define wsgi_app, que cambia con el tipo de worker):
+    gunicorn
+    GUNICORN_WORKER_CLASS=sync GUNICORN_WORKERS=3 gunicorn
+    GUNICORN_WORKER_CLASS=uvicorn gunicorn      # usa dental_api.asgi
+
+Todo se ajusta por variables de entorno (GUNICORN_*); sin ellas los valores
+se derivan de las CPU disponibles para el contenedor (cgroup), no de las del
+host (o de GUNICORN_CPUS si se define). Para comparar configuraciones:
+`python manage.py benchmark_server`.
+
+- sync: un request por proceso. 2 x CPU + 1 procesos.
+- gthread: CPU + 1 procesos x GUNICORN_THREADS hilos (4). Menos memoria por
+  request concurrente y respeta keep-alive.
+- uvicorn: ASGI (requiere uvicorn / uvicorn-worker). Las vistas de DRF son
+  síncronas y corren en un hilo: sirve si se agregan vistas async.
+
+Esos valores suponen estado compartido entre procesos: caché de respuestas
+(DJANGO_CACHE_BACKEND distinto de LocMemCache), relay de eventos en vivo
+(DJANGO_LIVE_RELAY) y buckets de límites (DJANGO_THROTTLE_CACHE). Sin los
+tres, el default es 1 proceso: con varios, un cambio invalidaría la caché y
+el ETag de un solo proceso, los eventos SSE no llegarían a las pestañas de
+los demás y cada cliente tendría N veces su límite.
+
+Con preload_app la aplicación se importa una vez en el master, se precargan
+URLs, vistas y renderers, se congelan los objetos del GC y se cierran las
+conexiones a la BD antes de hacer fork: los workers comparten esas páginas
+de memoria (copy-on-write) y arrancan sin importar nada.
+"""
+import gc
+import math
+import os
+from importlib.util import find_spec
+
+
+def available_cpus():
+    """CPU utilizables: cuota del cgroup (contenedores) o afinidad del proceso."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as handle:
+            quota, period = handle.read().split()
+        if quota != 'max':
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(cpus, 1)
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_bool(name, default):
+    return os.environ.get(name, str(default)) == 'True'
+
+
+def shared_state():
+    """Caché, relay de eventos y límites compartidos entre procesos (ver arriba)."""
+    cache_backend = os.environ.get('DJANGO_CACHE_BACKEND', '')
+    return bool(
+        cache_backend and not cache_backend.endswith('LocMemCache')
+        and os.environ.get('DJANGO_LIVE_RELAY')
+        and os.environ.get('DJANGO_THROTTLE_CACHE')
+    )
+
+
+CPUS = env_int('GUNICORN_CPUS', 0) or available_cpus()
+WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+SHARED_STATE = shared_state()
+
+wsgi_app = 'dental_api.wsgi:application'
+
+if WORKER_CLASS == 'uvicorn':
+    worker_class = (
+        'uvicorn_worker.UvicornWorker' if find_spec('uvicorn_worker') else 'uvicorn.workers.UvicornWorker'
+    )
+    wsgi_app = 'dental_api.asgi:application'
+    default_workers = CPUS + 1
+elif WORKER_CLASS == 'gthread':
+    worker_class = 'gthread'
+    default_workers = CPUS + 1
+else:
+    worker_class = 'sync'
+    default_workers = 2 * CPUS + 1
+
+if not SHARED_STATE:
+    default_workers = 1
+
+
+# =============================================================================
+# PROCESOS E HILOS
+# =============================================================================
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+workers = env_int('GUNICORN_WORKERS', default_workers)
+threads = env_int('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1)
+
+# Reciclar workers cada ~1000 requests (fugas de memoria); el jitter evita
+# que todos se reinicien a la vez
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+
+# Detrás del proxy de Render: mantener la conexión algo más que su intervalo
+# entre requests (el worker sync ignora keep-alive)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+
+# Latido de los workers en memoria, no en el disco del contenedor
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+
+# Formato combined: `warm_caches --from-log` lee este log
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+# =============================================================================
+# HOOKS
+# =============================================================================
+
+def when_ready(server):
+    """
+    Master listo (con preload_app, la app ya está importada): cargar lo que
+    el primer request importaría y congelar el GC antes de los forks.
+    """
+    if not preload_app:
+        return
+    from django.db import connections
+    from django.urls import get_resolver
+    from rest_framework.settings import api_settings
+
+    get_resolver().url_patterns  # URLconf de la API, vistas y serializers (no el admin)
+    api_settings.DEFAULT_RENDERER_CLASSES
+    api_settings.DEFAULT_PAGINATION_CLASS
+    # Un socket abierto en el master quedaría compartido por todos los hijos
+    connections.close_all()
+    # Los objetos actuales pasan a la generación permanente: el GC de los
+    # workers no los recorre ni escribe en sus cabeceras (que romperían el COW)
+    gc.freeze()
+    server.log.info(
+        "Workers: %s x %s (%s, %s CPU)", workers, threads, worker_class, CPUS,
+    )
+    if workers > 1 and not SHARED_STATE:
+        server.log.warning(
+            "%s procesos sin caché, relay de eventos y límites compartidos "
+            "(DJANGO_CACHE_BACKEND, DJANGO_LIVE_RELAY, DJANGO_THROTTLE_CACHE)", workers,
+        )
+
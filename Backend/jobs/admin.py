@@ -0,0 +1,51 @@
+"""
+Configuración del Admin Panel para la cola de tareas.
+
+Incluye:
+- JobAdmin: Consulta de tareas, errores y reintento manual
+"""
+from django.contrib import admin
+from django.utils import timezone
+from django.utils.html import format_html
+
+from dental_api.admin import LargeTableAdminMixin
+from .models import Job
+
+
+STATUS_COLORS = {
+    'QUEUED': '#6b7280',
+    'RUNNING': '#3b82f6',
+    'DONE': '#28a745',
+    'FAILED': '#dc3545',
+}
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Admin de solo consulta para las tareas en segundo plano."""
+
+    list_display = ['task', 'queue', 'status_badge', 'priority', 'attempts', 'run_at', 'finished_at']
+    list_filter = ['status', 'queue']
+    search_fields = ['task']
+    date_hierarchy = 'created_at'
+    actions = ['retry_jobs']
+    readonly_fields = [field.name for field in Job._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def status_badge(self, obj):
+        return format_html(
+            '<span style="color: {}; font-weight: bold;">{}</span>',
+            STATUS_COLORS.get(obj.status, '#6b7280'), obj.get_status_display()
+        )
+    status_badge.short_description = "Estado"
+    status_badge.admin_order_field = 'status'
+
+    def retry_jobs(self, request, queryset):
+        """Vuelve a encolar las tareas fallidas seleccionadas."""
+        updated = queryset.filter(status='FAILED').update(
+            status='QUEUED', attempts=0, run_at=timezone.now(), locked_by=''
+        )
+        self.message_user(request, f"{updated} tareas reencoladas.")
+    retry_jobs.short_description = "Reintentar tareas fallidas"
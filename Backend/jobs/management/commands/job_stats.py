@@ -0,0 +1,38 @@
+"""
+Métricas de la cola de tareas por cola.
+
+Uso:
+    python manage.py job_stats
+    python manage.py job_stats --window 15
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import queue_metrics
+
+
+class Command(BaseCommand):
+    help = "Muestra pendientes, retraso y rendimiento de cada cola de tareas."
+    requires_system_checks = []  # Arranque rápido: no importa URLs, vistas ni admin
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=5,
+                            help="Minutos para calcular el rendimiento (default: 5)")
+
+    def handle(self, *args, **options):
+        metrics = queue_metrics(timedelta(minutes=options['window']))
+        if not metrics:
+            self.stdout.write("No hay tareas registradas.")
+            return
+
+        self.stdout.write(
+            f"{'cola':<16}{'en cola':>9}{'listas':>8}{'en curso':>10}{'fallidas':>10}"
+            f"{'/min':>8}{'s/tarea':>9}{'retraso s':>11}"
+        )
+        for queue, row in sorted(metrics.items()):
+            avg = f"{row['avg_seconds']:.3f}" if row['avg_seconds'] is not None else '—'
+            self.stdout.write(
+                f"{queue:<16}{row['queued']:>9}{row['ready']:>8}{row['running']:>10}{row['failed']:>10}"
+                f"{row['done_per_minute']:>8}{avg:>9}{row['lag_seconds']:>11}"
+            )
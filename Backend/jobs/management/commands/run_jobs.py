@@ -0,0 +1,47 @@
+"""
+Worker de la cola de tareas.
+
+Uso:
+    python manage.py run_jobs
+    python manage.py run_jobs --queue catalog --queue default --processes 2 --threads 4
+    python manage.py run_jobs --burst     # ejecuta lo pendiente y termina (cron)
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.worker import run_workers
+
+
+class Command(BaseCommand):
+    help = "Ejecuta las tareas en segundo plano encoladas en la base de datos."
+    requires_system_checks = []  # Arranque rápido: no importa URLs, vistas ni admin
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues',
+                            help="Cola a atender (repetible). Por defecto, todas.")
+        parser.add_argument('--processes', type=int, default=1,
+                            help="Procesos worker (default: 1)")
+        parser.add_argument('--threads', type=int, default=1,
+                            help="Hilos por proceso (default: 1)")
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help="Segundos de espera con la cola vacía (default: JOBS_POLL_INTERVAL)")
+        parser.add_argument('--burst', action='store_true',
+                            help="Terminar cuando no queden tareas listas")
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1 or options['threads'] < 1:
+            raise CommandError("--processes y --threads deben ser al menos 1.")
+
+        queues = options['queues']
+        self.stdout.write(
+            f"Worker: colas={', '.join(queues) if queues else 'todas'} "
+            f"procesos={options['processes']} hilos={options['threads']}"
+        )
+        processed = run_workers(
+            queues=queues,
+            processes=options['processes'],
+            threads=options['threads'],
+            burst=options['burst'],
+            poll_interval=options['poll_interval'],
+        )
+        if processed is not None:
+            self.stdout.write(self.style.SUCCESS(f"{processed} tareas ejecutadas"))
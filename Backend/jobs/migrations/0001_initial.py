@@ -0,0 +1,130 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "queue",
+                    models.CharField(
+                        default="default", max_length=50, verbose_name="Cola"
+                    ),
+                ),
+                (
+                    "task",
+                    models.CharField(
+                        help_text="Nombre con el que se registró la tarea (@task)",
+                        max_length=200,
+                        verbose_name="Tarea",
+                    ),
+                ),
+                (
+                    "args",
+                    models.JSONField(
+                        blank=True, default=list, verbose_name="Argumentos"
+                    ),
+                ),
+                (
+                    "kwargs",
+                    models.JSONField(
+                        blank=True, default=dict, verbose_name="Argumentos con nombre"
+                    ),
+                ),
+                (
+                    "priority",
+                    models.SmallIntegerField(
+                        default=0,
+                        help_text="Mayor se ejecuta antes",
+                        verbose_name="Prioridad",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("QUEUED", "En cola"),
+                            ("RUNNING", "En ejecución"),
+                            ("DONE", "Terminada"),
+                            ("FAILED", "Fallida"),
+                        ],
+                        default="QUEUED",
+                        max_length=10,
+                        verbose_name="Estado",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Intentos"
+                    ),
+                ),
+                (
+                    "max_attempts",
+                    models.PositiveSmallIntegerField(
+                        default=5, verbose_name="Intentos máximos"
+                    ),
+                ),
+                (
+                    "run_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="No se ejecuta antes de esta fecha (reintentos con espera)",
+                        verbose_name="Ejecutar desde",
+                    ),
+                ),
+                (
+                    "locked_by",
+                    models.CharField(blank=True, max_length=100, verbose_name="Worker"),
+                ),
+                (
+                    "last_error",
+                    models.TextField(blank=True, verbose_name="Último error"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Encolada"),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Inicio"),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Fin"),
+                ),
+            ],
+            options={
+                "verbose_name": "Tarea",
+                "verbose_name_plural": "Tareas",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "queue", "-priority", "run_at"],
+                        name="job_ready_idx",
+                    ),
+                    models.Index(
+                        fields=["status", "finished_at"], name="job_finished_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="heartbeat_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="El worker lo renueva mientras la tarea corre (JOBS_HEARTBEAT_INTERVAL)",
+                null=True,
+                verbose_name="Último latido",
+            ),
+        ),
+    ]
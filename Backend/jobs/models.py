@@ -0,0 +1,80 @@
+"""
+Modelos de la cola de tareas en segundo plano.
+
+Incluye:
+- Job: Tarea encolada en la base de datos (la BD hace de broker)
+"""
+from django.db import models
+from django.utils import timezone
+
+
+# Prioridades habituales (mayor se ejecuta antes)
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+JOB_STATUS_CHOICES = [
+    ('QUEUED', 'En cola'),
+    ('RUNNING', 'En ejecución'),
+    ('DONE', 'Terminada'),
+    ('FAILED', 'Fallida'),
+]
+
+
+class Job(models.Model):
+    """Tarea pendiente, en curso o terminada."""
+    queue = models.CharField(
+        max_length=50,
+        default='default',
+        verbose_name="Cola"
+    )
+    task = models.CharField(
+        max_length=200,
+        verbose_name="Tarea",
+        help_text="Nombre con el que se registró la tarea (@task)"
+    )
+    args = models.JSONField(default=list, blank=True, verbose_name="Argumentos")
+    kwargs = models.JSONField(default=dict, blank=True, verbose_name="Argumentos con nombre")
+    priority = models.SmallIntegerField(
+        default=PRIORITY_NORMAL,
+        verbose_name="Prioridad",
+        help_text="Mayor se ejecuta antes"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=JOB_STATUS_CHOICES,
+        default='QUEUED',
+        verbose_name="Estado"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    max_attempts = models.PositiveSmallIntegerField(default=5, verbose_name="Intentos máximos")
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Ejecutar desde",
+        help_text="No se ejecuta antes de esta fecha (reintentos con espera)"
+    )
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="Worker")
+    last_error = models.TextField(blank=True, verbose_name="Último error")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Encolada")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Inicio")
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Último latido",
+        help_text="El worker lo renueva mientras la tarea corre (JOBS_HEARTBEAT_INTERVAL)"
+    )
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+
+    class Meta:
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        ordering = ['-created_at']
+        indexes = [
+            # Búsqueda de la siguiente tarea lista de cada cola
+            models.Index(fields=['status', 'queue', '-priority', 'run_at'], name='job_ready_idx'),
+            # Métricas de rendimiento y limpieza de terminadas
+            models.Index(fields=['status', 'finished_at'], name='job_finished_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.get_status_display()})"
@@ -0,0 +1,284 @@
+"""
+Cola de tareas sobre la base de datos existente (sin servicios externos).
+
+Incluye:
+- task: Decorador que registra una función como tarea (`.enqueue()` / `.enqueue_on_commit()`)
+- enqueue / enqueue_on_commit: Encolar por nombre de tarea
+- claim_next / run_job: Tomar y ejecutar la siguiente tarea lista (lo usa el worker)
+- work_off: Ejecuta en este hilo todo lo pendiente (tests, cron, --burst)
+- heartbeat: Renueva el latido de una tarea en curso (run_job lo hace solo)
+- requeue_stale / purge_finished: Mantenimiento de la tabla
+- queue_metrics: Pendientes, retraso y rendimiento por cola
+
+Una tarea se toma con un UPDATE condicional (status QUEUED -> RUNNING): si
+dos workers eligen la misma, solo uno actualiza la fila. Funciona igual en
+SQLite y en PostgreSQL, sin SELECT ... FOR UPDATE. Mientras corre, un hilo
+renueva heartbeat_at cada JOBS_HEARTBEAT_INTERVAL; requeue_stale solo
+recupera las que dejaron de latir por JOBS_LEASE_TIMEOUT (worker muerto),
+así una tarea larga no se ejecuta dos veces a la vez.
+
+Los argumentos se guardan como JSON: pasar ids, no instancias de modelos.
+"""
+import logging
+import random
+import threading
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Job, PRIORITY_NORMAL
+
+
+logger = logging.getLogger('jobs')
+
+_registry = {}
+
+
+class UnknownTask(LookupError):
+    """El nombre guardado en Job.task no corresponde a ninguna tarea registrada."""
+
+
+# =============================================================================
+# REGISTRO Y ENCOLADO
+# =============================================================================
+
+def task(name=None, queue='default', priority=PRIORITY_NORMAL, max_attempts=None):
+    """
+    Registra una función como tarea.
+
+        @task(queue='catalog')
+        def rebuild_index(product_ids): ...
+
+        rebuild_index.enqueue([1, 2])            # ahora
+        rebuild_index.enqueue_on_commit([1, 2])  # al hacer commit (desde signals)
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        options = {'queue': queue, 'priority': priority, 'max_attempts': max_attempts}
+        _registry[task_name] = func
+        func.task_name = task_name
+        func.enqueue = partial(_enqueue_with_defaults, task_name, options)
+        func.enqueue_on_commit = partial(_enqueue_with_defaults, task_name, options, on_commit=True)
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownTask(name) from None
+
+
+def _enqueue_with_defaults(task_name, options, *args, on_commit=False, **kwargs):
+    enqueue_func = enqueue_on_commit if on_commit else enqueue
+    return enqueue_func(task_name, args=list(args), kwargs=kwargs, **options)
+
+
+def enqueue(task_name, args=None, kwargs=None, queue='default', priority=PRIORITY_NORMAL,
+            delay=None, max_attempts=None):
+    """
+    Crea el Job. Con JOBS_EAGER = True la tarea se ejecuta en el momento
+    (desarrollo sin worker) y no se guarda nada.
+    """
+    get_task(task_name)  # Falla al encolar, no al ejecutar, si el nombre no existe
+    if settings.JOBS_EAGER:
+        get_task(task_name)(*(args or []), **(kwargs or {}))
+        return None
+    return Job.objects.create(
+        queue=queue,
+        task=task_name,
+        args=args or [],
+        kwargs=kwargs or {},
+        priority=priority,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        run_at=timezone.now() + (delay or timedelta()),
+    )
+
+
+def enqueue_on_commit(task_name, **options):
+    """
+    Encola cuando la transacción actual haga commit (nada si hay rollback).
+    Es la forma de encolar desde signals: el worker no puede ver datos que
+    todavía no se confirmaron.
+    """
+    transaction.on_commit(partial(enqueue, task_name, **options))
+
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+def claim_next(queues=None, worker_id=''):
+    """Marca como RUNNING y devuelve la siguiente tarea lista, o None."""
+    now = timezone.now()
+    ready = Job.objects.filter(status='QUEUED', run_at__lte=now)
+    if queues:
+        ready = ready.filter(queue__in=queues)
+    candidates = list(ready.order_by('-priority', 'run_at', 'pk').values_list('pk', flat=True)[:10])
+
+    for pk in candidates:
+        claimed = Job.objects.filter(pk=pk, status='QUEUED').update(
+            status='RUNNING',
+            locked_by=worker_id,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def retry_delay(attempts):
+    """Espera exponencial con jitter: base * 2^(intentos-1), acotada."""
+    delay = settings.JOBS_RETRY_BASE_DELAY * 2 ** (attempts - 1)
+    delay = min(delay, settings.JOBS_RETRY_MAX_DELAY)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def heartbeat(job):
+    """Renueva heartbeat_at si la tarea sigue tomada por el mismo worker. Retorna si la encontró."""
+    return bool(
+        Job.objects.filter(pk=job.pk, status='RUNNING', locked_by=job.locked_by)
+        .update(heartbeat_at=timezone.now())
+    )
+
+
+class _Lease:
+    """Late la tarea desde un hilo aparte mientras corre el bloque `with`."""
+
+    def __init__(self, job):
+        self.job = job
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._beat, name=f'job-{job.pk}-heartbeat', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.done.set()
+        self.thread.join()
+
+    def _beat(self):
+        try:
+            while not self.done.wait(settings.JOBS_HEARTBEAT_INTERVAL):
+                try:
+                    heartbeat(self.job)
+                except DatabaseError as exc:
+                    # SQLite ocupado por la propia tarea: se reintenta en el próximo latido
+                    logger.warning("Latido de la tarea #%s falló: %s", self.job.pk, exc)
+        finally:
+            connection.close()
+
+
+def run_job(job):
+    """Ejecuta una tarea ya tomada y registra el resultado. Retorna True si terminó bien."""
+    try:
+        with _Lease(job):
+            get_task(job.task)(*job.args, **job.kwargs)
+    except Exception as exc:
+        now = timezone.now()
+        job.last_error = traceback.format_exc()[-4000:]
+        job.finished_at = now
+        if job.attempts < job.max_attempts and not isinstance(exc, UnknownTask):
+            job.status = 'QUEUED'
+            job.run_at = now + retry_delay(job.attempts)
+            logger.warning("Tarea %s #%s falló (intento %s/%s): %s",
+                           job.task, job.pk, job.attempts, job.max_attempts, exc)
+        else:
+            job.status = 'FAILED'
+            logger.error("Tarea %s #%s falló definitivamente: %s", job.task, job.pk, exc)
+        job.save(update_fields=['status', 'run_at', 'last_error', 'finished_at'])
+        return False
+
+    job.status = 'DONE'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at'])
+    return True
+
+
+def work_off(queues=None, worker_id='work_off', limit=None):
+    """Ejecuta en este hilo las tareas listas hasta vaciar la cola. Retorna cuántas corrió."""
+    done = 0
+    while limit is None or done < limit:
+        job = claim_next(queues, worker_id)
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+
+# =============================================================================
+# MANTENIMIENTO Y MÉTRICAS
+# =============================================================================
+
+def requeue_stale(timeout=None):
+    """
+    Recupera las tareas RUNNING que dejaron de latir (su worker murió a
+    mitad): vuelven a la cola o, si ya agotaron max_attempts, quedan FAILED;
+    una tarea que tumba a su worker no se reintenta para siempre. Retorna
+    cuántas recuperó.
+    """
+    now = timezone.now()
+    cutoff = now - (timeout or timedelta(seconds=settings.JOBS_LEASE_TIMEOUT))
+    stale = Job.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status='RUNNING',
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='FAILED', locked_by='', finished_at=now,
+        last_error="El worker dejó de responder durante el último intento.",
+    )
+    if failed:
+        logger.error("%s tareas colgadas agotaron sus intentos y quedan FAILED", failed)
+    return failed + stale.update(status='QUEUED', locked_by='', run_at=now)
+
+
+def purge_finished(days=None):
+    """Borra las tareas DONE más antiguas que JOBS_KEEP_DONE_DAYS."""
+    days = settings.JOBS_KEEP_DONE_DAYS if days is None else days
+    deleted, _ = Job.objects.filter(
+        status='DONE', finished_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    return deleted
+
+
+def queue_metrics(window=timedelta(minutes=5)):
+    """
+    {cola: {queued, ready, running, failed, done_per_minute, avg_seconds, lag_seconds}}
+
+    - ready: en cola y ya ejecutables (sin esperar reintento)
+    - lag_seconds: cuánto lleva esperando la tarea lista más antigua
+    - done_per_minute / avg_seconds: terminadas en la ventana y su duración media
+    """
+    now = timezone.now()
+    since = now - window
+    rows = Job.objects.order_by().values('queue').annotate(
+        queued=Count('pk', filter=Q(status='QUEUED')),
+        ready=Count('pk', filter=Q(status='QUEUED', run_at__lte=now)),
+        running=Count('pk', filter=Q(status='RUNNING')),
+        failed=Count('pk', filter=Q(status='FAILED')),
+        done_recent=Count('pk', filter=Q(status='DONE', finished_at__gte=since)),
+        oldest_ready=Min('run_at', filter=Q(status='QUEUED', run_at__lte=now)),
+        avg_duration=Avg(F('finished_at') - F('started_at'), filter=Q(status='DONE', finished_at__gte=since)),
+    )
+    metrics = {}
+    for row in rows:
+        metrics[row['queue']] = {
+            'queued': row['queued'],
+            'ready': row['ready'],
+            'running': row['running'],
+            'failed': row['failed'],
+            'done_per_minute': round(row['done_recent'] / (window.total_seconds() / 60), 2),
+            'avg_seconds': round(row['avg_duration'].total_seconds(), 3) if row['avg_duration'] else None,
+            'lag_seconds': round((now - row['oldest_ready']).total_seconds(), 1) if row['oldest_ready'] else 0,
+        }
+    return metrics
@@ -0,0 +1,193 @@
+"""
+Tests de la cola de tareas.
+
+Incluye:
+- Encolado (directo, al hacer commit y en modo eager)
+- Prioridades, reintentos con espera y fallo definitivo
+- Tareas colgadas (latido, intentos agotados), limpieza y métricas por cola
+- Worker en modo --burst y mantenimiento sin supervisor
+"""
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job, PRIORITY_HIGH, PRIORITY_LOW
+from jobs.queue import (
+    claim_next, enqueue, heartbeat, purge_finished, queue_metrics, requeue_stale, task, work_off,
+)
+from jobs.worker import Worker, run_process
+
+
+calls = []
+
+
+@task(name='jobs.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='jobs.tests.flaky', queue='slow', max_attempts=3)
+def flaky():
+    raise RuntimeError("falla siempre")
+
+
+class QueueTests(TestCase):
+    """Encolado, orden de ejecución y reintentos."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        job = record.enqueue('a')
+        self.assertEqual((job.queue, job.args, job.status), ('default', ['a'], 'QUEUED'))
+        self.assertEqual(work_off(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'DONE')
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(calls, ['a'])
+
+    def test_priority_then_age(self):
+        enqueue('jobs.tests.record', args=['normal'])
+        enqueue('jobs.tests.record', args=['low'], priority=PRIORITY_LOW)
+        enqueue('jobs.tests.record', args=['high'], priority=PRIORITY_HIGH)
+        enqueue('jobs.tests.record', args=['later'], delay=timedelta(hours=1))
+        work_off()
+        self.assertEqual(calls, ['high', 'normal', 'low'])
+
+    def test_queue_selection(self):
+        record.enqueue('default')
+        enqueue('jobs.tests.record', args=['other'], queue='other')
+        work_off(queues=['other'])
+        self.assertEqual(calls, ['other'])
+
+    def test_enqueue_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            record.enqueue_on_commit('x')
+            self.assertFalse(Job.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(Job.objects.get().args, ['x'])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_runs_inline(self):
+        self.assertIsNone(record.enqueue('now'))
+        self.assertEqual(calls, ['now'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_unknown_task_fails_on_enqueue(self):
+        with self.assertRaises(LookupError):
+            enqueue('no.existe')
+
+    def test_retries_with_backoff_then_fails(self):
+        job = flaky.enqueue()
+        with self.assertLogs('jobs', 'WARNING'):
+            self.assertEqual(work_off(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('QUEUED', 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("falla siempre", job.last_error)
+
+        # Segundo intento: la espera crece
+        first_delay = job.run_at - job.finished_at
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs', 'WARNING'):
+            work_off()
+        job.refresh_from_db()
+        self.assertGreater(job.run_at - job.finished_at, first_delay)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs', 'ERROR'):
+            work_off()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 3))
+        self.assertIsNone(claim_next())
+
+
+class MaintenanceTests(TestCase):
+    """Tareas colgadas, limpieza de terminadas y métricas."""
+
+    def test_requeue_stale_running_jobs(self):
+        job = record.enqueue('x')
+        Job.objects.filter(pk=job.pk).update(status='RUNNING', started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'QUEUED')
+
+    def test_stale_job_out_of_attempts_fails(self):
+        job = record.enqueue('x')
+        Job.objects.filter(pk=job.pk).update(
+            status='RUNNING', attempts=job.max_attempts, started_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIn('dejó de responder', job.last_error)
+        self.assertIsNone(claim_next())
+
+    def test_heartbeat_keeps_long_job_running(self):
+        record.enqueue('x')
+        job = claim_next(worker_id='w1')
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertTrue(heartbeat(job))
+        self.assertEqual(requeue_stale(), 0)
+
+        # Otro worker la recuperó: el latido del anterior ya no la renueva
+        Job.objects.filter(pk=job.pk).update(locked_by='w2')
+        self.assertFalse(heartbeat(job))
+
+    def test_purge_finished(self):
+        old, recent = record.enqueue('old'), record.enqueue('recent')
+        work_off()
+        Job.objects.filter(pk=old.pk).update(finished_at=timezone.now() - timedelta(days=30))
+        self.assertEqual(purge_finished(days=7), 1)
+        self.assertEqual(list(Job.objects.values_list('pk', flat=True)), [recent.pk])
+
+    def test_queue_metrics(self):
+        for value in range(3):
+            record.enqueue(value)
+        flaky.enqueue()
+        Job.objects.filter(queue='slow').update(run_at=timezone.now() - timedelta(seconds=90))
+        work_off(queues=['default'])
+
+        metrics = queue_metrics()
+        self.assertEqual(metrics['default']['queued'], 0)
+        self.assertEqual(metrics['default']['done_per_minute'], 0.6)
+        self.assertIsNotNone(metrics['default']['avg_seconds'])
+        self.assertEqual(metrics['slow']['ready'], 1)
+        self.assertGreaterEqual(metrics['slow']['lag_seconds'], 90)
+
+        out = StringIO()
+        call_command('job_stats', stdout=out)
+        self.assertIn('slow', out.getvalue())
+
+
+class WorkerTests(TestCase):
+    """El worker en modo burst vacía la cola y termina."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_burst_process(self):
+        for value in range(4):
+            record.enqueue(value)
+        self.assertEqual(run_process(None, threads=1, burst=True), 4)
+        self.assertEqual(calls, [0, 1, 2, 3])
+
+    def test_single_process_maintenance(self):
+        job = record.enqueue('stale')
+        Job.objects.filter(pk=job.pk).update(status='RUNNING', heartbeat_at=timezone.now() - timedelta(hours=1))
+        worker = Worker(None, threading.Event(), 'w', burst=True, maintenance=True)
+        worker.next_maintenance = 0
+        worker.run()
+        self.assertEqual(calls, ['stale'])
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'DONE')
+
+    def test_run_jobs_command(self):
+        record.enqueue('cmd')
+        out = StringIO()
+        call_command('run_jobs', burst=True, stdout=out)
+        self.assertIn('1 tareas ejecutadas', out.getvalue())
+        self.assertEqual(calls, ['cmd'])
@@ -0,0 +1,164 @@
+"""
+Workers de la cola de tareas (procesos x hilos).
+
+Incluye:
+- Worker: Bucle de un hilo: toma una tarea, la ejecuta, espera si no hay
+  (y, si se le pide, hace el mantenimiento periódico)
+- run_process: Un proceso con N hilos Worker
+- run_workers: Supervisor que lanza P procesos y los detiene con SIGINT/SIGTERM
+
+Con SQLite conviene 1 proceso y 1–2 hilos (un solo escritor a la vez); con
+PostgreSQL se puede escalar en procesos para tareas de CPU (imágenes) y en
+hilos para tareas de E/S (exportaciones, llamadas externas).
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+
+from .queue import claim_next, purge_finished, requeue_stale, run_job
+
+
+logger = logging.getLogger('jobs')
+
+
+class Worker:
+    """
+    Bucle de ejecución de un hilo. `stop` es un Event compartido del proceso.
+    Con maintenance=True además recupera tareas colgadas y borra terminadas
+    cada JOBS_LEASE_TIMEOUT (sin supervisor, lo hace uno de los hilos).
+    """
+
+    def __init__(self, queues, stop, name, burst=False, poll_interval=None, maintenance=False):
+        self.queues = queues
+        self.stop = stop
+        self.name = name
+        self.burst = burst
+        self.poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+        self.maintenance = maintenance
+        self.next_maintenance = time.monotonic() + settings.JOBS_LEASE_TIMEOUT
+        self.processed = 0
+
+    def maintain(self):
+        if time.monotonic() >= self.next_maintenance:
+            requeue_stale()
+            purge_finished()
+            self.next_maintenance = time.monotonic() + settings.JOBS_LEASE_TIMEOUT
+
+    def run(self):
+        try:
+            while not self.stop.is_set():
+                # Dentro de una transacción (tests, work_off) no se toca la conexión
+                if not connection.in_atomic_block:
+                    close_old_connections()
+                if self.maintenance:
+                    self.maintain()
+                job = claim_next(self.queues, self.name)
+                if job is None:
+                    if self.burst:
+                        break
+                    self.stop.wait(self.poll_interval)
+                    continue
+                run_job(job)
+                self.processed += 1
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connections.close_all()
+
+
+def run_process(queues, threads, burst=False, poll_interval=None, stop=None, maintenance=False):
+    """
+    Ejecuta `threads` Workers en este proceso hasta que se pida parar. Con
+    maintenance=True el primero hace el mantenimiento. Retorna las tareas corridas.
+    """
+    stop = stop or threading.Event()
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+    workers = [
+        Worker(queues, stop, f'{prefix}:{n}', burst=burst, poll_interval=poll_interval,
+               maintenance=maintenance and n == 0)
+        for n in range(threads)
+    ]
+    if threads == 1:
+        workers[0].run()
+    else:
+        pool = [threading.Thread(target=worker.run, name=worker.name, daemon=True) for worker in workers]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+    return sum(worker.processed for worker in workers)
+
+
+def _child(queues, threads, burst, poll_interval):
+    stop = threading.Event()
+    # SIGTERM del supervisor: terminar la tarea en curso y salir
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_process(queues, threads, burst=burst, poll_interval=poll_interval, stop=stop)
+
+
+def run_workers(queues=None, processes=1, threads=1, burst=False, poll_interval=None):
+    """
+    Supervisor: lanza `processes` procesos hijos con `threads` hilos cada uno,
+    relanza los que mueran y hace el mantenimiento periódico (tareas colgadas
+    y limpieza de terminadas). Con processes=1 todo corre en este proceso y
+    el mantenimiento lo hace el primer hilo.
+    """
+    requeue_stale()
+    purge_finished()
+
+    if processes == 1:
+        stop = threading.Event()
+        previous = signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        try:
+            return run_process(queues, threads, burst=burst, poll_interval=poll_interval, stop=stop,
+                               maintenance=True)
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+
+    # Las conexiones abiertas no se pueden compartir con los hijos
+    connections.close_all()
+    args = (queues, threads, burst, poll_interval)
+    children = [multiprocessing.Process(target=_child, args=args) for _ in range(processes)]
+    for child in children:
+        child.start()
+
+    stopping = False
+
+    def shutdown(*_):
+        nonlocal stopping
+        stopping = True
+        for child in children:
+            if child.is_alive():
+                child.terminate()  # SIGTERM: los hijos terminan la tarea actual
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    last_maintenance = time.monotonic()
+    while children:
+        for index, child in enumerate(children):
+            child.join(timeout=1)
+            if child.is_alive():
+                continue
+            if burst or stopping:
+                children[index] = None
+            else:
+                logger.warning("Worker %s terminó (código %s); se relanza", child.pid, child.exitcode)
+                connections.close_all()
+                children[index] = multiprocessing.Process(target=_child, args=args)
+                children[index].start()
+        children = [child for child in children if child is not None]
+
+        if time.monotonic() - last_maintenance > settings.JOBS_LEASE_TIMEOUT:
+            requeue_stale()
+            purge_finished()
+            connections.close_all()
+            last_maintenance = time.monotonic()
+    return None
@@ -0,0 +1,214 @@
+"""
+Difusión de eventos en vivo dentro del proceso (sin broker externo).
+
+Incluye:
+- Event: Evento con canal, tipo, datos y clave de agrupación
+- Subscription: Eventos pendientes de una conexión (agrupa ráfagas por clave)
+- Broadcaster: Reparte cada evento a las suscripciones de su canal
+- get_broadcaster: Broadcaster del proceso (con el relay de LIVE_EVENTS_RELAY)
+- publish / publish_on_commit: Publicar un evento
+- has_subscribers: Si vale la pena calcular un evento para un canal
+
+Una suscripción no guarda una lista sino un dict por (tipo, clave): si diez
+cambios del mismo producto llegan antes de que la conexión los envíe, sale
+uno solo con los datos combinados. Si aun así se acumulan más de
+LIVE_MAX_PENDING claves, se descartan las más viejas y el cliente recibe un
+evento `resync` para volver a pedir el estado completo.
+
+Publicar y entregar es seguro entre hilos: los eventos se publican desde el
+hilo de la petición (al hacer commit) o desde el relay, y las conexiones
+esperan en su propio hilo (WSGI) o en el event loop (ASGI).
+"""
+import asyncio
+import itertools
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+
+@dataclass
+class Event:
+    channel: str
+    type: str
+    data: dict = field(default_factory=dict)
+    key: str = ''
+    id: int = 0
+
+
+class Subscription:
+    """
+    Cola de eventos de una conexión. Se usa como context manager (al salir
+    se da de baja) y se lee con get() desde un hilo o con aget() desde asyncio.
+    """
+
+    def __init__(self, broadcaster, channels, max_pending):
+        self.broadcaster = broadcaster
+        self.channels = frozenset(channels)
+        self.max_pending = max_pending
+        self.overflowed = False
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._loop = None
+        self._async_ready = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+    def deliver(self, event):
+        """Encola `event`, combinándolo con uno pendiente de la misma clave."""
+        key = (event.type, event.key or event.id)
+        with self._lock:
+            previous = self._pending.pop(key, None)
+            if previous is not None:
+                event = replace(event, data={**previous.data, **event.data})
+            self._pending[key] = event
+            if len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self.overflowed = True
+        self._ready.set()
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._async_ready.set)
+            except RuntimeError:  # el loop ya se cerró: la conexión terminó
+                pass
+
+    def drain(self):
+        """Eventos pendientes en orden de llegada (más `resync` si se descartaron)."""
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending.clear()
+            self._ready.clear()
+            if self._async_ready is not None:
+                self._async_ready.clear()
+            if self.overflowed:
+                self.overflowed = False
+                events.insert(0, Event(events[0].channel if events else '', 'resync'))
+        return events
+
+    def get(self, timeout=None, linger=0):
+        """
+        Espera hasta `timeout` segundos; retorna [] si no llegó nada. Con
+        `linger`, tras el primer evento espera esos segundos más para que
+        una ráfaga salga combinada.
+        """
+        if self._ready.wait(timeout) and linger:
+            time.sleep(linger)
+        return self.drain()
+
+    async def aget(self, timeout=None, linger=0):
+        if self._loop is None:
+            self._async_ready = asyncio.Event()
+            if self._ready.is_set():
+                self._async_ready.set()
+            self._loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(self._async_ready.wait(), timeout)
+        except asyncio.TimeoutError:  # En Python 3.10 no es el TimeoutError builtin
+            return self.drain()
+        if linger:
+            await asyncio.sleep(linger)
+        return self.drain()
+
+
+class Broadcaster:
+    """
+    Suscripciones por canal del proceso. Guarda referencias débiles: una
+    conexión que nunca empezó a leer (o se cortó sin cerrar) no queda
+    recibiendo eventos para siempre.
+    """
+
+    def __init__(self, max_pending=None, relay=None):
+        self.max_pending = max_pending or settings.LIVE_MAX_PENDING
+        self.relay = relay
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels, self.max_pending)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, weakref.WeakSet()).add(subscription)
+        if self.relay is not None:
+            self.relay.ensure_running()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return len({id(sub) for subscribers in self._channels.values() for sub in subscribers})
+
+    def publish(self, event):
+        """Entrega `event` a las suscripciones de este proceso."""
+        with self._lock:
+            event.id = next(self._ids)
+            subscribers = list(self._channels.get(event.channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return len(subscribers)
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    """Broadcaster del proceso; con LIVE_EVENTS_RELAY = "database", con su relay."""
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                broadcaster = Broadcaster()
+                if settings.LIVE_EVENTS_RELAY == 'database':
+                    from .relay import DatabaseRelay
+
+                    broadcaster.relay = DatabaseRelay(broadcaster)
+                _broadcaster = broadcaster
+    return _broadcaster
+
+
+def has_subscribers(channel):
+    """
+    False si ninguna conexión puede recibir eventos de `channel`. Con relay
+    las conexiones pueden estar en otro proceso: siempre True.
+    """
+    broadcaster = get_broadcaster()
+    return broadcaster.relay is not None or broadcaster.subscriber_count(channel) > 0
+
+
+def publish(channel, type, data, key=''):
+    """Publica ya: a este proceso o, con relay, a todos los procesos."""
+    broadcaster = get_broadcaster()
+    event = Event(channel, type, data, key)
+    if broadcaster.relay is not None:
+        broadcaster.relay.send(event)
+    else:
+        broadcaster.publish(event)
+
+
+def publish_on_commit(channel, type, data, key=''):
+    """Publica cuando la transacción actual hace commit (nada si hace rollback)."""
+    transaction.on_commit(partial(publish, channel, type, data, key))
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="LiveEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("channel", models.CharField(max_length=100, verbose_name="Canal")),
+                ("type", models.CharField(max_length=50, verbose_name="Tipo")),
+                (
+                    "key",
+                    models.CharField(
+                        blank=True,
+                        help_text="Eventos con la misma clave se combinan si la conexión aún no los envió",
+                        max_length=100,
+                        verbose_name="Clave",
+                    ),
+                ),
+                ("data", models.JSONField(default=dict, verbose_name="Datos")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, db_index=True, verbose_name="Publicado"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Evento en vivo",
+                "verbose_name_plural": "Eventos en vivo",
+                "ordering": ["id"],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+"""
+Modelos de los eventos en vivo.
+
+Incluye:
+- LiveEvent: Evento publicado con LIVE_EVENTS_RELAY = "database" (la BD hace
+  de canal entre los workers, ver live/relay.py)
+"""
+from django.db import models
+
+
+class LiveEvent(models.Model):
+    """Evento pendiente de repartir a las conexiones de todos los procesos."""
+    channel = models.CharField(max_length=100, verbose_name="Canal")
+    type = models.CharField(max_length=50, verbose_name="Tipo")
+    key = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name="Clave",
+        help_text="Eventos con la misma clave se combinan si la conexión aún no los envió"
+    )
+    data = models.JSONField(default=dict, verbose_name="Datos")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Publicado")
+
+    class Meta:
+        verbose_name = "Evento en vivo"
+        verbose_name_plural = "Eventos en vivo"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.channel} {self.type} #{self.pk}"
@@ -0,0 +1,103 @@
+"""
+Relay de eventos entre procesos sobre la base de datos existente.
+
+Incluye:
+- DatabaseRelay: Publica con un INSERT en LiveEvent y reparte lo nuevo en este proceso
+
+Con varios workers (gunicorn) una venta registrada en un proceso debe llegar
+a las conexiones abiertas en los demás. Cada publicación es un INSERT y un
+solo hilo por proceso lee las filas nuevas cada LIVE_POLL_INTERVAL segundos:
+una consulta por proceso e intervalo, sin importar cuántas conexiones haya.
+El hilo solo corre mientras el proceso tenga suscripciones.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from django.utils import timezone
+
+from .broadcast import Event
+from .models import LiveEvent
+
+
+logger = logging.getLogger('live')
+
+# Cada cuántas lecturas se borran los eventos más viejos que LIVE_EVENTS_RETENTION
+PRUNE_EVERY = 60
+BATCH_SIZE = 500
+
+
+class DatabaseRelay:
+
+    def __init__(self, broadcaster, interval=None, retention=None):
+        self.broadcaster = broadcaster
+        self.interval = interval if interval is not None else settings.LIVE_POLL_INTERVAL
+        self.retention = retention if retention is not None else settings.LIVE_EVENTS_RETENTION
+        self.last_id = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def send(self, event):
+        LiveEvent.objects.create(channel=event.channel, type=event.type, key=event.key, data=event.data)
+
+    def poll(self):
+        """Reparte los eventos publicados desde la última lectura. Retorna cuántos."""
+        if self.last_id is None:
+            self.last_id = self.latest_id()
+            return 0
+        rows = list(
+            LiveEvent.objects.filter(pk__gt=self.last_id)
+            .order_by('pk')
+            .values_list('pk', 'channel', 'type', 'key', 'data')[:BATCH_SIZE]
+        )
+        for pk, channel, type, key, data in rows:
+            self.broadcaster.publish(Event(channel, type, data, key))
+            self.last_id = pk
+        return len(rows)
+
+    @staticmethod
+    def latest_id():
+        return LiveEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    def prune(self):
+        cutoff = timezone.now() - timedelta(seconds=self.retention)
+        return LiveEvent.objects.filter(created_at__lt=cutoff).delete()[0]
+
+    def ensure_running(self):
+        with self._lock:
+            if self._thread is None:
+                # Desde antes de que la conexión calcule su estado inicial:
+                # lo publicado a partir de aquí le llega como evento
+                self.last_id = self.latest_id()
+                self._thread = threading.Thread(target=self._run, name='live-relay', daemon=True)
+                self._thread.start()
+
+    def _should_stop(self):
+        # Bajo el mismo lock que ensure_running: una suscripción que llega
+        # justo ahora o ve el hilo vivo o arranca uno nuevo
+        with self._lock:
+            if self.broadcaster.subscriber_count():
+                return False
+            self._thread = None
+            self.last_id = None
+            return True
+
+    def _run(self):
+        polls = 0
+        try:
+            while not self._should_stop():
+                try:
+                    close_old_connections()
+                    if not self.poll():
+                        time.sleep(self.interval)
+                    polls += 1
+                    if polls % PRUNE_EVERY == 0:
+                        self.prune()
+                except DatabaseError:
+                    logger.exception("Error leyendo eventos en vivo")
+                    time.sleep(self.interval)
+        finally:
+            connection.close()
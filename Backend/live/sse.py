@@ -0,0 +1,153 @@
+"""
+Respuestas Server-Sent Events (text/event-stream) sobre una Subscription.
+
+Incluye:
+- format_event: Event -> bloque SSE ("event: ...\\ndata: {...}\\n\\n")
+- busy_response: 503 cuando el proceso ya tiene el máximo de conexiones WSGI
+- stream_response: StreamingHttpResponse con eventos iniciales y los de la suscripción
+
+Con ASGI (gunicorn con GUNICORN_WORKER_CLASS=uvicorn) cada conexión espera
+en el event loop: miles de conexiones ociosas no ocupan hilos. Con WSGI
+(runserver, gthread) funciona igual pero cada conexión retiene un hilo del
+worker mientras está abierta: sirve para desarrollo y pocos clientes. Por
+eso con WSGI se admiten LIVE_WSGI_MAX_STREAMS conexiones por proceso; las
+demás reciben 503 con Retry-After (y `retry:`) sin ocupar un hilo.
+
+Cada LIVE_HEARTBEAT segundos sin eventos se envía un comentario para que
+proxies y navegadores no corten la conexión, y a los LIVE_STREAM_MAX_AGE
+segundos se cierra: EventSource reconecta solo y recibe el estado completo.
+"""
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+
+
+PING = ': ping\n\n'
+
+
+def format_event(event):
+    data = json.dumps(event.data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    # Los eventos iniciales (estado completo) no pasan por el broadcaster: sin id
+    head = f'id: {event.id}\n' if event.id else ''
+    return f'{head}event: {event.type}\ndata: {data}\n\n'
+
+
+def _head(initial):
+    # retry: milisegundos que espera EventSource antes de reconectar
+    return f'retry: {settings.LIVE_RETRY_MS}\n\n' + ''.join(map(format_event, initial))
+
+
+def _sync_stream(subscription, initial, linger):
+    with subscription:
+        yield _head(initial)
+        deadline = time.monotonic() + settings.LIVE_STREAM_MAX_AGE
+        while time.monotonic() < deadline:
+            events = subscription.get(timeout=settings.LIVE_HEARTBEAT, linger=linger)
+            yield ''.join(map(format_event, events)) if events else PING
+
+
+async def _async_stream(subscription, initial, linger):
+    with subscription:
+        yield _head(initial)
+        deadline = time.monotonic() + settings.LIVE_STREAM_MAX_AGE
+        while time.monotonic() < deadline:
+            events = await subscription.aget(timeout=settings.LIVE_HEARTBEAT, linger=linger)
+            yield ''.join(map(format_event, events)) if events else PING
+
+
+class _Slots:
+    """Conexiones WSGI abiertas en este proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+
+    def acquire(self):
+        limit = settings.LIVE_WSGI_MAX_STREAMS
+        with self._lock:
+            if limit and self.active >= limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+_wsgi_slots = _Slots()
+
+
+class _Stream:
+    """
+    Contenido de la respuesta. StreamingHttpResponse llama a close() del
+    contenido al cerrarse: la suscripción se da de baja aunque el stream
+    nunca se haya empezado a leer (cerrar un generador sin iniciar no
+    ejecuta su `with`).
+    """
+
+    def __init__(self, events, subscription):
+        self.events = events
+        self.subscription = subscription
+
+    def close(self):
+        self.subscription.close()
+
+
+class _SyncStream(_Stream):
+    """Además libera su lugar en _wsgi_slots (una vez, también si nadie la cierra)."""
+
+    def __init__(self, events, subscription):
+        super().__init__(events, subscription)
+        self._slot = True
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def close(self):
+        super().close()
+        if self._slot:
+            self._slot = False
+            _wsgi_slots.release()
+
+    __del__ = close
+
+
+class _AsyncStream(_Stream):
+    def __aiter__(self):
+        return aiter(self.events)
+
+
+def busy_response():
+    """503: este proceso ya tiene LIVE_WSGI_MAX_STREAMS conexiones abiertas."""
+    response = HttpResponse(
+        f'retry: {settings.LIVE_BUSY_RETRY * 1000}\n\n', status=503, content_type='text/event-stream',
+    )
+    response['Retry-After'] = str(settings.LIVE_BUSY_RETRY)
+    return response
+
+
+def stream_response(request, subscription, initial=(), linger=0):
+    """
+    Respuesta SSE: primero `initial` (ej. el estado completo) y después los
+    eventos de `subscription`, que debe crearse antes de calcular `initial`
+    para no perder lo que se publique entre medio. `linger`: segundos que se
+    esperan tras un evento para enviar una ráfaga como un solo cambio por clave.
+    """
+    if isinstance(request, ASGIRequest):
+        content = _AsyncStream(_async_stream(subscription, list(initial), linger), subscription)
+    elif _wsgi_slots.acquire():
+        content = _SyncStream(_sync_stream(subscription, list(initial), linger), subscription)
+    else:
+        subscription.close()
+        return busy_response()
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx / proxies: enviar cada evento al llegar, sin acumular
+    response['X-Accel-Buffering'] = 'no'
+    return response
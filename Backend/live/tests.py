@@ -0,0 +1,109 @@
+"""
+Tests de los eventos en vivo.
+
+Incluye:
+- Broadcaster: reparto por canal, combinación por clave y resync
+- Entrega desde otro hilo a una conexión que espera con asyncio
+- Respuesta SSE que se cierra sin haberse leído
+- Relay por base de datos entre procesos
+"""
+import asyncio
+import gc
+import threading
+from datetime import timedelta
+
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+
+from live.broadcast import Broadcaster, Event
+from live.models import LiveEvent
+from live.relay import DatabaseRelay
+from live.sse import format_event, stream_response
+
+
+class BroadcasterTests(SimpleTestCase):
+    """Suscripciones en memoria del proceso."""
+
+    def setUp(self):
+        self.broadcaster = Broadcaster(max_pending=3)
+
+    def test_delivers_by_channel(self):
+        with self.broadcaster.subscribe(['a']) as first, self.broadcaster.subscribe(['a', 'b']) as second:
+            self.assertEqual(self.broadcaster.publish(Event('a', 'x', {'n': 1})), 2)
+            self.assertEqual(self.broadcaster.publish(Event('b', 'x', {'n': 2})), 1)
+            self.assertEqual([e.data for e in first.get(0)], [{'n': 1}])
+            self.assertEqual([e.data for e in second.get(0)], [{'n': 1}, {'n': 2}])
+            self.assertEqual(first.get(0), [])
+        self.assertEqual(self.broadcaster.subscriber_count(), 0)
+
+    def test_same_key_is_combined(self):
+        with self.broadcaster.subscribe(['stock']) as subscription:
+            self.broadcaster.publish(Event('stock', 'stock', {'stock_count': 5, 'in_stock': True}, key='1'))
+            self.broadcaster.publish(Event('stock', 'stock', {'stock_count': 4}, key='2'))
+            self.broadcaster.publish(Event('stock', 'stock', {'stock_count': 0, 'in_stock': False}, key='1'))
+            events = subscription.get(0)
+        # Una entrada por producto, en el orden del último cambio
+        self.assertEqual([(e.key, e.data) for e in events], [
+            ('2', {'stock_count': 4}),
+            ('1', {'stock_count': 0, 'in_stock': False}),
+        ])
+
+    def test_overflow_asks_for_resync(self):
+        with self.broadcaster.subscribe(['a']) as subscription:
+            for n in range(5):
+                self.broadcaster.publish(Event('a', 'x', {'n': n}))
+            events = subscription.get(0)
+        self.assertEqual(events[0].type, 'resync')
+        self.assertEqual([e.data['n'] for e in events[1:]], [2, 3, 4])
+
+    def test_abandoned_subscription_is_dropped(self):
+        self.broadcaster.subscribe(['a'])
+        gc.collect()
+        self.assertEqual(self.broadcaster.subscriber_count('a'), 0)
+
+    def test_async_wait_woken_from_another_thread(self):
+        async def wait():
+            with self.broadcaster.subscribe(['a']) as subscription:
+                publisher = threading.Timer(0.05, self.broadcaster.publish, [Event('a', 'x', {'n': 1})])
+                publisher.start()
+                events = await subscription.aget(timeout=5)
+                publisher.join()
+                return events, await subscription.aget(timeout=0.01)
+
+        events, idle = asyncio.run(wait())
+        self.assertEqual([e.data for e in events], [{'n': 1}])
+        self.assertEqual(idle, [])
+
+    def test_unread_response_closes_subscription(self):
+        subscription = self.broadcaster.subscribe(['a'])
+        response = stream_response(RequestFactory().get('/'), subscription)
+        self.assertEqual(self.broadcaster.subscriber_count('a'), 1)
+        response.close()
+        self.assertEqual(self.broadcaster.subscriber_count('a'), 0)
+
+    def test_format_event(self):
+        event = Event('a', 'metrics', {'total': '1.50'}, id=7)
+        self.assertEqual(format_event(event), 'id: 7\nevent: metrics\ndata: {"total":"1.50"}\n\n')
+
+
+class DatabaseRelayTests(TestCase):
+    """Eventos publicados por otro proceso llegan vía LiveEvent."""
+
+    def test_poll_delivers_new_events_only(self):
+        LiveEvent.objects.create(channel='a', type='x', data={'old': True})
+        broadcaster = Broadcaster()
+        relay = DatabaseRelay(broadcaster)
+        with broadcaster.subscribe(['a']) as subscription:
+            self.assertEqual(relay.poll(), 0)  # primera lectura: solo fija el punto de partida
+            relay.send(Event('a', 'x', {'n': 1}, key='k'))
+            relay.send(Event('b', 'x', {'n': 2}))
+            self.assertEqual(relay.poll(), 2)
+            self.assertEqual(relay.poll(), 0)
+            self.assertEqual([(e.key, e.data) for e in subscription.get(0)], [('k', {'n': 1})])
+
+    def test_prune_old_events(self):
+        LiveEvent.objects.create(channel='a', type='x')
+        LiveEvent.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        LiveEvent.objects.create(channel='a', type='x')
+        self.assertEqual(DatabaseRelay(Broadcaster(), retention=60).prune(), 1)
+        self.assertEqual(LiveEvent.objects.count(), 1)
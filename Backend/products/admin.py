@@ -5,10 +5,58 @@ Incluye:
 - CategoryAdmin: Gestión de categorías
 - ProductAdmin: Gestión de productos con thumbnails, filtros y galería inline
 - ProductImageInline: Subida de múltiples imágenes
+- AudienceBadgeMixin: Badge de audiencia (etiquetas precalculadas)
+
+Los conteos de cada fila se anotan con subconsultas correlacionadas: solo se
+evalúan para la página mostrada y el COUNT(*) de la paginación no necesita
+JOIN ni GROUP BY.
 """
 from django.contrib import admin
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
-from .models import Category, Product, ProductImage, Brand
+
+from dental_api.admin import LargeTableAdminMixin
+from .models import AUDIENCE_CHOICES, Category, Product, ProductImage, Brand
+
+
+# (color, icono, etiqueta) por audiencia, calculado una sola vez
+AUDIENCE_BADGES = {
+    value: (color, icon, dict(AUDIENCE_CHOICES)[value])
+    for value, color, icon in [
+        ('STUDENT', '#3b82f6', '🎓'),       # Azul - Estudiantes
+        ('PROFESSIONAL', '#8b5cf6', '👨‍⚕️'),  # Violeta - Profesionales
+        ('GENERAL', '#6b7280', '👥'),        # Gris - Todos
+    ]
+}
+DEFAULT_AUDIENCE_BADGE = ('#6b7280', '👥', 'General')
+
+
+def count_subquery(model, field):
+    """COUNT correlacionado de `model` por `field` = pk de la fila (0 si no hay)."""
+    counts = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class AudienceBadgeMixin:
+    """Columna `audience_badge` para modelos con target_audience."""
+
+    def audience_badge(self, obj):
+        """Muestra badge visual para la audiencia objetivo."""
+        color, icon, label = AUDIENCE_BADGES.get(obj.target_audience, DEFAULT_AUDIENCE_BADGE)
+        return format_html(
+            '<span style="background: {}; color: white; padding: 3px 8px; '
+            'border-radius: 12px; font-size: 11px; font-weight: 500;">{} {}</span>',
+            color, icon, label
+        )
+    audience_badge.short_description = "Audiencia"
+    audience_badge.admin_order_field = 'target_audience'
 
 
 class ProductImageInline(admin.TabularInline):
@@ -33,7 +81,7 @@ class ProductImageInline(admin.TabularInline):
 
 
 @admin.register(Brand)
-class BrandAdmin(admin.ModelAdmin):
+class BrandAdmin(AudienceBadgeMixin, admin.ModelAdmin):
     """Admin para gestionar marcas de productos."""
     list_display = ['logo_preview', 'name', 'slug', 'audience_badge', 'product_count', 'created_at']
     list_display_links = ['logo_preview', 'name']
@@ -56,22 +104,6 @@ class BrandAdmin(admin.ModelAdmin):
         }),
     )
     
-    def audience_badge(self, obj):
-        """Muestra badge visual para la audiencia objetivo."""
-        colors = {
-            'STUDENT': ('#3b82f6', '🎓'),
-            'PROFESSIONAL': ('#8b5cf6', '👨‍⚕️'),
-            'GENERAL': ('#6b7280', '👥'),
-        }
-        color, icon = colors.get(obj.target_audience, ('#6b7280', '👥'))
-        label = dict(obj._meta.get_field('target_audience').choices).get(obj.target_audience, 'General')
-        return format_html(
-            '<span style="background: {}; color: white; padding: 3px 8px; '
-            'border-radius: 12px; font-size: 11px; font-weight: 500;">{} {}</span>',
-            color, icon, label
-        )
-    audience_badge.short_description = "Audiencia"
-    
     def logo_preview(self, obj):
         if obj.image:
             return format_html(
@@ -97,13 +129,20 @@ class BrandAdmin(admin.ModelAdmin):
         return "Sin logo"
     logo_preview_large.short_description = "Vista previa"
     
+    def get_queryset(self, request):
+        # Conteo anotado: una subconsulta por fila de la página, sin GROUP BY
+        return super().get_queryset(request).annotate(
+            product_count=count_subquery(Product, 'brand')
+        )
+    
     def product_count(self, obj):
-        return obj.products.count()
+        return obj.product_count
     product_count.short_description = "Productos"
+    product_count.admin_order_field = 'product_count'
 
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(AudienceBadgeMixin, admin.ModelAdmin):
     """Admin para gestionar categorías de productos."""
     list_display = ['name', 'slug', 'audience_badge', 'product_count', 'created_at']
     list_filter = ['target_audience']
@@ -125,30 +164,20 @@ class CategoryAdmin(admin.ModelAdmin):
         }),
     )
     
-    def audience_badge(self, obj):
-        """Muestra badge visual para la audiencia objetivo."""
-        colors = {
-            'STUDENT': ('#3b82f6', '🎓'),
-            'PROFESSIONAL': ('#8b5cf6', '👨‍⚕️'),
-            'GENERAL': ('#6b7280', '👥'),
-        }
-        color, icon = colors.get(obj.target_audience, ('#6b7280', '👥'))
-        label = dict(obj._meta.get_field('target_audience').choices).get(obj.target_audience, 'General')
-        return format_html(
-            '<span style="background: {}; color: white; padding: 3px 8px; '
-            'border-radius: 12px; font-size: 11px; font-weight: 500;">{} {}</span>',
-            color, icon, label
+    def get_queryset(self, request):
+        # Conteo anotado: una subconsulta por fila de la página, sin GROUP BY
+        return super().get_queryset(request).annotate(
+            product_count=count_subquery(Product, 'category')
         )
-    audience_badge.short_description = "Audiencia"
     
     def product_count(self, obj):
-        count = obj.products.count()
-        return count
+        return obj.product_count
     product_count.short_description = "Productos"
+    product_count.admin_order_field = 'product_count'
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(LargeTableAdminMixin, AudienceBadgeMixin, admin.ModelAdmin):
     """
     Admin personalizado para gestión de productos.
     Incluye galería de imágenes mediante inline.
@@ -172,6 +201,8 @@ class ProductAdmin(admin.ModelAdmin):
         'created_at',
     ]
     list_display_links = ['thumbnail_preview', 'name']
+    # brand es nullable: el select_related automático del admin no la incluye
+    list_select_related = ['category', 'brand']
     list_filter = ['target_audience', 'category', 'brand', 'in_stock', 'created_at']
     search_fields = ['name', 'description']
     list_per_page = 20
@@ -271,9 +302,15 @@ class ProductAdmin(admin.ModelAdmin):
     stock_status_icon.short_description = "Estado"
     stock_status_icon.admin_order_field = 'stock_count'
     
+    def get_queryset(self, request):
+        # Conteo de galería anotado para evitar un COUNT por fila
+        return super().get_queryset(request).annotate(
+            image_total=count_subquery(ProductImage, 'product')
+        )
+    
     def image_count(self, obj):
         """Muestra el número de imágenes adicionales."""
-        count = obj.images.count()
+        count = obj.image_total
         if count > 0:
             return format_html(
                 '<span style="background: #17a2b8; color: white; '
@@ -282,22 +319,7 @@ class ProductAdmin(admin.ModelAdmin):
             )
         return format_html('<span style="color: #999;">{}</span>', '0')
     image_count.short_description = "Fotos extra"
-    
-    def audience_badge(self, obj):
-        """Muestra badge visual para la audiencia objetivo."""
-        colors = {
-            'STUDENT': ('#3b82f6', '🎓'),      # Azul - Estudiantes
-            'PROFESSIONAL': ('#8b5cf6', '👨‍⚕️'),  # Violeta - Profesionales
-            'GENERAL': ('#6b7280', '👥'),       # Gris - Todos
-        }
-        color, icon = colors.get(obj.target_audience, ('#6b7280', '👥'))
-        label = dict(obj._meta.get_field('target_audience').choices).get(obj.target_audience, 'General')
-        return format_html(
-            '<span style="background: {}; color: white; padding: 3px 8px; '
-            'border-radius: 12px; font-size: 11px; font-weight: 500;">{} {}</span>',
-            color, icon, label
-        )
-    audience_badge.short_description = "Audiencia"
+    image_count.admin_order_field = 'image_total'
     
     def image_preview(self, obj):
         if obj.image:
@@ -0,0 +1,123 @@
+"""
+Caché de respuestas del catálogo con ETag.
+
+Incluye:
+- get_version / bump_version: Versión de un conjunto de datos cacheados
+- get_catalog_version / bump_catalog_version: Versión global del catálogo
+- CatalogCacheMixin: Caché de list/retrieve (y acciones) + ETag / 304
+- BYPASS_CACHE_META: Marca de la petición que se responde sin la caché
+
+Cualquier cambio en Category, Brand, Product o ProductImage incrementa la
+versión (ver products/signals.py), así que las entradas viejas dejan de
+usarse sin tener que borrarlas una por una. El ETag se deriva de la versión
+y de la URL: un `If-None-Match` válido se responde con 304 sin tocar la BD.
+
+Con varios workers la caché debe ser compartida (ver CACHES en settings.py);
+CATALOG_CACHE_TIMEOUT acota lo que puede durar una entrada obsoleta.
+"""
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+# Clave del environ WSGI (no es una cabecera: un cliente HTTP no puede
+# ponerla) con la que los snapshots piden respuestas recién calculadas
+BYPASS_CACHE_META = 'catalog.bypass_cache'
+
+
+def get_version(key) -> int:
+    """Versión guardada en `key`; los datos cacheados con otra versión quedan obsoletos."""
+    version = cache.get(key)
+    if version is None:
+        # Si la caché perdió la clave, arrancar desde el reloj para no
+        # reutilizar una versión que ya tenga entradas guardadas
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _incr_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_version(key):
+    """
+    Incrementa la versión ya (para la propia transacción) y otra vez al hacer
+    commit, para que una petición concurrente no deje cacheados datos previos
+    al commit bajo la versión nueva.
+    """
+    _incr_version(key)
+    transaction.on_commit(partial(_incr_version, key))
+
+
+def get_catalog_version() -> int:
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalida todas las respuestas cacheadas del catálogo."""
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Comparación débil: CompressionMiddleware convierte el ETag en W/"..."
+    return any(
+        tag == '*' or tag.removeprefix('W/') == etag
+        for tag in parse_etags(header)
+    )
+
+
+class CatalogCacheMixin:
+    """
+    Cachea los datos serializados de list/retrieve según la versión del catálogo.
+
+    Se cachea `response.data` (no los bytes), así que la negociación de
+    renderer y la compresión siguen funcionando igual. Las acciones propias
+    pueden usar `self.cached_response(request, build)`. Con BYPASS_CACHE_META
+    en request.META se responde desde la BD sin leer ni guardar la caché.
+    """
+
+    def cached_response(self, request, build):
+        if request.META.get(BYPASS_CACHE_META):
+            return build()
+
+        # Import local: signals.py importa este módulo en ready() y
+        # rest_framework.response arrastra todos los serializers de DRF
+        from rest_framework.response import Response
+
+        version = get_catalog_version()
+        digest = hashlib.md5(
+            f'{version}:{request.build_absolute_uri()}'.encode(), usedforsecurity=False
+        ).hexdigest()
+        etag = f'"{digest}"'
+
+        if _etag_matches(request.META.get('HTTP_IF_NONE_MATCH', ''), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        key = f'catalog:response:{digest}'
+        data = cache.get(key)
+        if data is None:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data, settings.CATALOG_CACHE_TIMEOUT)
+
+        return Response(data, headers={'ETag': etag})
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CatalogCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CatalogCacheMixin, self).retrieve(request, *args, **kwargs))
@@ -0,0 +1,89 @@
+"""
+Secuencia de cambios del catálogo para clientes offline y el POS.
+
+Incluye:
+- record_changes: Registra cambios (o bajas) de objetos del catálogo
+- changes_since: Cambios posteriores a un token, por lotes
+
+Las señales (products/signals.py) registran cada alta, cambio o baja de
+productos, categorías, marcas e imágenes en la misma transacción que el
+cambio. CatalogChange guarda solo el último cambio de cada objeto, con un id
+nuevo en cada cambio: el token es ese id y `?since=` es un rango sobre la
+clave primaria. Las operaciones masivas (queryset.update, bulk_create) no
+emiten señales: quien las use debe llamar a record_changes().
+
+En PostgreSQL el cambio es un upsert que le da a la fila un id nuevo de la
+secuencia: dos ventas simultáneas del mismo producto no chocan con la
+restricción única (con borrar e insertar, la segunda fallaba). SQLite
+serializa las escrituras, así que ahí se borra e inserta.
+
+En PostgreSQL dos transacciones pueden confirmar en otro orden que el de sus
+ids. El token no avanza sobre cambios de los últimos
+CATALOG_CHANGES_SETTLE_SECONDS: el cliente los recibe y los vuelve a recibir
+en la siguiente consulta, pero no puede saltarse uno que todavía no se veía.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import CatalogChange
+
+
+BATCH_SIZE = 500
+
+
+def _upsert_changes(kind, ids, deleted):
+    """INSERT ... ON CONFLICT DO UPDATE SET id = nextval(...) (PostgreSQL)."""
+    table = CatalogChange._meta.db_table
+    quote = connection.ops.quote_name
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = ids[start:start + BATCH_SIZE]
+            cursor.execute(
+                f"INSERT INTO {quote(table)} (kind, object_id, deleted, changed_at) "
+                f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(batch))} "
+                f"ON CONFLICT (kind, object_id) DO UPDATE SET "
+                f"id = nextval(pg_get_serial_sequence(%s, 'id')), "
+                f"deleted = EXCLUDED.deleted, changed_at = EXCLUDED.changed_at",
+                [value for pk in batch for value in (kind, pk, deleted, now)] + [table],
+            )
+
+
+def record_changes(kind, ids, deleted=False):
+    """Da a cada objeto de `ids` un lugar nuevo (el último) en la secuencia."""
+    # Sin repetidos y en orden: dos upserts solapados bloquean filas en el mismo orden
+    ids = sorted(set(ids))
+    if connection.vendor == 'postgresql':
+        _upsert_changes(kind, ids, deleted)
+        return
+    for start in range(0, len(ids), BATCH_SIZE):  # renombrar una categoría toca todos sus productos
+        CatalogChange.objects.filter(kind=kind, object_id__in=ids[start:start + BATCH_SIZE]).delete()
+    CatalogChange.objects.bulk_create(
+        [CatalogChange(kind=kind, object_id=pk, deleted=deleted) for pk in ids],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def changes_since(since, limit=None):
+    """
+    Cambios con id mayor que `since`, en orden y hasta `limit`.
+
+    Retorna (cambios, token, has_more). El token es el id del último cambio
+    ya asentado; has_more indica que conviene pedir el siguiente lote ya.
+    """
+    limit = limit or settings.CATALOG_CHANGES_PAGE_SIZE
+    changes = list(CatalogChange.objects.filter(pk__gt=since).order_by('pk')[:limit + 1])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    settled = timezone.now() - timedelta(seconds=settings.CATALOG_CHANGES_SETTLE_SECONDS)
+    token = since
+    for change in changes:
+        if change.changed_at > settled:
+            has_more = False
+            break
+        token = change.pk
+    return changes, token, has_more
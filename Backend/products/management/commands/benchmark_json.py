@@ -0,0 +1,108 @@
+"""
+Benchmark del renderizado JSON y la compresión de respuestas de la API.
+
+Compara, para cada endpoint, el CPU por petición completa, el CPU de solo
+renderizar el JSON y los bytes enviados con:
+- JSONRenderer de DRF sin compresión (configuración original)
+- ORJSONRenderer sin compresión
+- ORJSONRenderer + gzip / brotli (CompressionMiddleware)
+
+Uso:
+    python manage.py benchmark_json
+    python manage.py benchmark_json --seed 200 --iterations 100
+    python manage.py benchmark_json --path /api/products/?page=2
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import APIView
+
+from dental_api.middleware import brotli
+from dental_api.renderers import ORJSONRenderer, orjson
+
+
+DEFAULT_PATHS = [
+    '/api/products/',
+    '/api/categories/',
+    '/api/brands/',
+    '/api/finance/dashboard/',
+    '/api/finance/sales/',
+]
+
+
+class _Rollback(Exception):
+    """Descarta el catálogo sembrado con --seed."""
+
+
+class Command(BaseCommand):
+    help = "Mide CPU por petición y bytes en la red con distintos renderers y compresión."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths',
+                            help="Endpoint a medir (repetible). Por defecto, los principales.")
+        parser.add_argument('--iterations', type=int, default=50,
+                            help="Peticiones por configuración (default: 50)")
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Crear N productos de prueba (se descartan al terminar)")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson no está instalado: ORJSONRenderer usará json."))
+
+        configs = [
+            ('json', JSONRenderer, 'identity'),
+            ('orjson', ORJSONRenderer, 'identity'),
+            ('orjson+gzip', ORJSONRenderer, 'gzip'),
+        ]
+        if brotli is not None:
+            configs.append(('orjson+br', ORJSONRenderer, 'br'))
+
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    from dental_api.testing import build_catalog
+                    build_catalog(products=options['seed'], sales=options['seed'])
+                self._run(options['paths'] or DEFAULT_PATHS, configs, options['iterations'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, paths, configs, iterations):
+        client = Client()
+        original_renderers = APIView.renderer_classes
+        width = max(32, max(len(path) for path in paths) + 2)
+
+        self.stdout.write(
+            f"{'endpoint':<{width}}{'config':<14}{'ms CPU/req':>12}{'ms render':>11}{'bytes':>10}"
+        )
+        try:
+            for path in paths:
+                baseline = None
+                for label, renderer, encoding in configs:
+                    APIView.renderer_classes = [renderer]
+                    response = client.get(path, HTTP_ACCEPT_ENCODING=encoding)
+
+                    started = time.process_time()
+                    for _ in range(iterations):
+                        client.get(path, HTTP_ACCEPT_ENCODING=encoding)
+                    cpu_ms = (time.process_time() - started) * 1000 / iterations
+
+                    started = time.process_time()
+                    for _ in range(iterations):
+                        renderer().render(response.data)
+                    render_ms = (time.process_time() - started) * 1000 / iterations
+
+                    size = len(response.content)
+                    if baseline is None:
+                        baseline = response.content
+                    elif encoding == 'identity' and response.content != baseline:
+                        self.stdout.write(self.style.ERROR(f"  ¡Salida distinta con {label} en {path}!"))
+
+                    self.stdout.write(
+                        f"{path:<{width}}{label:<14}{cpu_ms:>12.3f}{render_ms:>11.3f}{size:>10}"
+                    )
+        finally:
+            APIView.renderer_classes = original_renderers
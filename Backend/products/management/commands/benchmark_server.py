@@ -0,0 +1,244 @@
+"""
+Compara configuraciones de gunicorn (gunicorn.conf.py) con carga real sobre la API.
+
+Para cada configuración levanta gunicorn en un puerto local, espera el
+primer 200 (tiempo de arranque), calienta y lanza --concurrency clientes con
+keep-alive durante --duration segundos contra los endpoints de esta app.
+Informa req/s, latencias p50/p95/p99, errores y memoria PSS de todos los
+procesos (PSS reparte las páginas compartidas: refleja el ahorro de preload).
+
+Uso:
+    python manage.py benchmark_server
+    python manage.py benchmark_server --config sync --config gthread --workers 3 --duration 20
+    python manage.py benchmark_server --no-cache --concurrency 32 --path /api/products/?search=resina
+
+El generador de carga corre en esta misma máquina: sirve para comparar
+configuraciones entre sí, no como medida absoluta de capacidad.
+"""
+import http.client
+import os
+import runpy
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from importlib.util import find_spec
+from itertools import cycle
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.models import Category, Product
+
+
+# Variables de entorno de gunicorn.conf.py por configuración
+CONFIGS = {
+    'sync': {'GUNICORN_WORKER_CLASS': 'sync'},
+    'gthread': {'GUNICORN_WORKER_CLASS': 'gthread'},
+    'gthread-no-preload': {'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_PRELOAD': 'False'},
+    'uvicorn': {'GUNICORN_WORKER_CLASS': 'uvicorn'},
+}
+
+DEFAULT_PATHS = [
+    '/api/products/',
+    '/api/products/?category={category}',
+    '/api/products/?search=resina',
+    '/api/products/suggest/?q=re',
+    '/api/products/{product}/',
+    '/api/products/{product}/related/',
+    '/api/categories/',
+    '/api/brands/',
+    '/api/finance/dashboard/',
+]
+
+
+def _server_shape(env):
+    """(workers, threads, worker_class) que resultan de gunicorn.conf.py con `env`."""
+    saved = dict(os.environ)
+    os.environ.update(env)
+    try:
+        conf = runpy.run_path(str(Path(settings.BASE_DIR) / 'gunicorn.conf.py'))
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+    return conf['workers'], conf['threads'], conf['worker_class']
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _pss_mb(pid):
+    """PSS (MB) del proceso y sus hijos, o None fuera de Linux."""
+    total, pending = 0, [pid]
+    try:
+        while pending:
+            current = pending.pop()
+            with open(f'/proc/{current}/smaps_rollup') as handle:
+                total += next(int(line.split()[1]) for line in handle if line.startswith('Pss:'))
+            with open(f'/proc/{current}/task/{current}/children') as handle:
+                pending += [int(child) for child in handle.read().split()]
+    except (OSError, StopIteration):
+        return None
+    return total / 1024
+
+
+class _Client(threading.Thread):
+    """Cliente con una conexión keep-alive que recorre las rutas hasta `deadline`."""
+
+    def __init__(self, port, paths, deadline, offset):
+        super().__init__(daemon=True)
+        self.port = port
+        self.paths = cycle(paths[offset % len(paths):] + paths[:offset % len(paths)])
+        self.deadline = deadline
+        self.latencies = []
+        self.errors = 0
+
+    def get(self, connection, path):
+        connection.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+        response = connection.getresponse()
+        response.read()
+        return response.status
+
+    def run(self):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        while time.monotonic() < self.deadline:
+            path = next(self.paths)
+            started = time.perf_counter()
+            try:
+                try:
+                    status = self.get(connection, path)
+                except (ConnectionError, http.client.RemoteDisconnected):
+                    # Conexión keep-alive cerrada por el servidor (ej. worker
+                    # reciclado por max_requests): como un navegador, reintentar
+                    connection.close()
+                    status = self.get(connection, path)
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                connection.close()
+                continue
+            if status == 200:
+                self.latencies.append(time.perf_counter() - started)
+            else:
+                self.errors += 1
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Compara configuraciones de gunicorn (sync, gthread, uvicorn) con carga sobre la API."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config', action='append', dest='configs', choices=list(CONFIGS),
+                            help="Configuración a medir (repetible). Por defecto, todas las disponibles.")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Procesos de gunicorn (default: el de gunicorn.conf.py)")
+        parser.add_argument('--threads', type=int, default=None,
+                            help="Hilos por proceso con gthread (default: el de gunicorn.conf.py)")
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help="Clientes simultáneos (default: 16)")
+        parser.add_argument('--duration', type=float, default=10,
+                            help="Segundos de carga por configuración (default: 10)")
+        parser.add_argument('--path', action='append', dest='paths',
+                            help="Ruta a pedir (repetible). Por defecto, los endpoints principales.")
+        parser.add_argument('--no-cache', action='store_true',
+                            help="Servidor sin caché de respuestas (DummyCache)")
+
+    def handle(self, *args, **options):
+        configs = options['configs'] or [
+            name for name in CONFIGS if name != 'uvicorn' or find_spec('uvicorn')
+        ]
+        if 'uvicorn' in configs and not find_spec('uvicorn'):
+            raise CommandError("uvicorn no está instalado (pip install uvicorn-worker).")
+
+        paths = self._paths(options['paths'] or DEFAULT_PATHS)
+        self.stdout.write(
+            f"{len(paths)} rutas · {options['concurrency']} clientes · {options['duration']:.0f} s por configuración"
+        )
+        self.stdout.write(
+            f"{'config':<20}{'procesos':>10}{'arranque s':>12}{'req/s':>9}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errores':>9}{'PSS MB':>9}"
+        )
+        for name in configs:
+            env = {**os.environ, **CONFIGS[name], 'GUNICORN_ACCESS_LOG': '', 'GUNICORN_LOG_LEVEL': 'warning'}
+            if options['workers']:
+                env['GUNICORN_WORKERS'] = str(options['workers'])
+            if options['threads']:
+                env['GUNICORN_THREADS'] = str(options['threads'])
+            if options['no_cache']:
+                env['DJANGO_CACHE_BACKEND'] = 'django.core.cache.backends.dummy.DummyCache'
+            self._benchmark(name, env, paths, options['concurrency'], options['duration'])
+
+    def _paths(self, paths):
+        product = Product.objects.values_list('pk', flat=True).first()
+        category = Category.objects.values_list('slug', flat=True).first()
+        if product is None or category is None:
+            raise CommandError("La base de datos no tiene productos: cargue el catálogo antes de medir.")
+        return [path.format(product=product, category=category) for path in paths]
+
+    def _benchmark(self, name, env, paths, concurrency, duration):
+        port = _free_port()
+        env['GUNICORN_BIND'] = f'127.0.0.1:{port}'
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', str(Path(settings.BASE_DIR) / 'gunicorn.conf.py')],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        try:
+            boot = self._wait_ready(server, port, paths[0]) - started
+            self._load(port, paths, min(concurrency, 4), 1)  # calentamiento: cachés e imports
+            clients = self._load(port, paths, concurrency, duration)
+            memory = _pss_mb(server.pid)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+        latencies = sorted(latency for client in clients for latency in client.latencies)
+        errors = sum(client.errors for client in clients)
+        workers, threads, _ = _server_shape(env)
+        processes = f'{workers}x{threads}'
+        if not latencies:
+            self.stdout.write(self.style.ERROR(f"{name:<20}sin respuestas 200 ({errors} errores)"))
+            return
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{name:<20}{processes:>10}{boot:>12.2f}{len(latencies) / duration:>9.0f}"
+            f"{statistics.median(latencies) * 1000:>9.1f}{quantiles[94] * 1000:>9.1f}"
+            f"{quantiles[98] * 1000:>9.1f}{errors:>9}"
+            f"{memory if memory is not None else float('nan'):>9.1f}"
+        )
+
+    def _wait_ready(self, server, port, path, timeout=60):
+        """Espera el primer 200 y retorna ese instante (perf_counter)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"gunicorn terminó al arrancar:\n{server.stderr.read()[-2000:]}")
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+                connection.request('GET', path)
+                if connection.getresponse().status == 200:
+                    return time.perf_counter()
+            except OSError:
+                pass
+            finally:
+                connection.close()
+            time.sleep(0.05)
+        raise CommandError(f"gunicorn no respondió en {timeout} s")
+
+    def _load(self, port, paths, concurrency, duration):
+        deadline = time.monotonic() + duration
+        clients = [_Client(port, paths, deadline, offset) for offset in range(concurrency)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        return clients
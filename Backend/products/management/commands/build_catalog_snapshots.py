@@ -0,0 +1,47 @@
+"""
+Genera el snapshot estático del catálogo (JSON para un CDN o el frontend).
+
+Sin opciones genera todo y borra lo que ya no existe; los archivos que no
+cambiaron no se reescriben. Con ids regenera solo lo afectado por esos cambios.
+
+Uso:
+    python manage.py build_catalog_snapshots
+    python manage.py build_catalog_snapshots --dir /srv/catalog --url https://api.ejemplo.com
+    python manage.py build_catalog_snapshots --products 3 7 --brands 2
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.snapshots import CatalogSnapshot, SnapshotError
+
+
+class Command(BaseCommand):
+    help = "Genera los archivos JSON estáticos del catálogo (todos o solo los afectados)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', dest='root', default=None,
+                            help="Directorio de salida (default: CATALOG_SNAPSHOT_DIR)")
+        parser.add_argument('--url', dest='base_url', default=None,
+                            help="URL base de imágenes y enlaces (default: CATALOG_SNAPSHOT_BASE_URL)")
+        parser.add_argument('--products', nargs='+', type=int, default=[],
+                            help="Solo lo afectado por estos productos")
+        parser.add_argument('--categories', nargs='+', type=int, default=[],
+                            help="Solo lo afectado por estas categorías")
+        parser.add_argument('--brands', nargs='+', type=int, default=[],
+                            help="Solo lo afectado por estas marcas")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        changes = {name: options[name] for name in ('products', 'categories', 'brands')}
+        try:
+            with CatalogSnapshot(options['root'], options['base_url']) as snapshot:
+                stats = snapshot.update(**changes) if any(changes.values()) else snapshot.build()
+        except SnapshotError as exc:
+            raise CommandError(f"No se pudo generar el snapshot: {exc}")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot en {snapshot.root}: {stats['written']} escritos, "
+            f"{stats['unchanged']} sin cambios, {stats['deleted']} borrados en {elapsed:.2f} s"
+        ))
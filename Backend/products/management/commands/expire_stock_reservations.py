@@ -0,0 +1,24 @@
+"""
+Borra las reservas de stock de carrito vencidas.
+
+Las reservas vencidas ya no cuentan para el disponible; esto solo limpia la
+tabla. Las reservas nuevas encolan la limpieza solas (cola "catalog"); el
+comando sirve para cron cuando no hay worker:
+    python manage.py expire_stock_reservations
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.reservations import expire_reservations
+
+
+class Command(BaseCommand):
+    help = "Borra las reservas de stock de carrito vencidas."
+    requires_system_checks = []  # Arranque rápido: no importa URLs, vistas ni admin
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        deleted = expire_reservations()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"{deleted} reservas vencidas borradas en {elapsed:.2f} s"))
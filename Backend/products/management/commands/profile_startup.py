@@ -0,0 +1,79 @@
+"""
+Perfil del arranque de Django: tiempo por fase, ready() por app e imports.
+
+Cada medición arranca un intérprete nuevo (ver dental_api/startup.py) y se
+informa la más rápida de --repeat (las primeras suelen pagar la lectura de
+disco).
+
+Uso:
+    python manage.py profile_startup
+    python manage.py profile_startup --target worker --path /api/products/
+    python manage.py profile_startup --target command --repeat 5 --top 30
+"""
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dental_api.startup import TARGETS, profile_startup
+
+
+class Command(BaseCommand):
+    help = "Mide el arranque de Django (comando de manage.py y worker WSGI) y sus imports más lentos."
+    requires_system_checks = []  # Se miden en un proceso aparte
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=[*TARGETS, 'all'], default='all',
+                            help="Qué arranque medir (default: all)")
+        parser.add_argument('--path', default='/api/categories/',
+                            help="Primera petición del worker (default: /api/categories/)")
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Mediciones por objetivo; se informa la mejor (default: 3)")
+        parser.add_argument('--top', type=int, default=20,
+                            help="Módulos más lentos a listar (default: 20)")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat debe ser al menos 1.")
+        targets = TARGETS if options['target'] == 'all' else [options['target']]
+        self.project_packages = {'dental_api'} | {
+            config.name.split('.')[0] for config in apps.get_app_configs()
+            if Path(config.path).is_relative_to(settings.BASE_DIR)
+        }
+
+        for target in targets:
+            try:
+                runs = [profile_startup(target, options['path']) for _ in range(options['repeat'])]
+            except RuntimeError as exc:
+                raise CommandError(f"El arranque de '{target}' falló: {exc}")
+            best = min(runs, key=lambda run: run['total'])
+            self.report(target, best, runs, options['top'])
+
+    def report(self, target, result, runs, top):
+        totals = ', '.join(f"{run['total'] * 1000:.0f}" for run in runs)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{target}: {result['total'] * 1000:.0f} ms (mediciones: {totals} ms)"
+        ))
+
+        self.stdout.write("Fases:")
+        for name, seconds in result['phases']:
+            self.stdout.write(f"  {name:<30}{seconds * 1000:8.1f} ms")
+
+        self.stdout.write("ready() por app:")
+        for label, seconds in sorted(result['ready'].items(), key=lambda item: -item[1]):
+            if seconds >= 0.0005:
+                self.stdout.write(f"  {label:<30}{seconds * 1000:8.1f} ms")
+
+        self.stdout.write("Import por paquete (tiempo propio):")
+        for package, seconds in sorted(result['packages'].items(), key=lambda item: -item[1])[:10]:
+            self.stdout.write(f"  {package:<30}{seconds * 1000:8.1f} ms")
+
+        by_cumulative = sorted(result['imports'], key=lambda row: -row.cumulative_us)
+        self.stdout.write(f"Módulos más lentos (acumulado, {len(result['imports'])} importados):")
+        for row in by_cumulative[:top]:
+            self.stdout.write(f"  {row.module:<50}{row.cumulative_us / 1000:8.1f} ms")
+
+        self.stdout.write("Módulos del proyecto (acumulado, incluye lo que importan):")
+        for row in [row for row in by_cumulative if row.package in self.project_packages][:top]:
+            self.stdout.write(f"  {row.module:<50}{row.cumulative_us / 1000:8.1f} ms")
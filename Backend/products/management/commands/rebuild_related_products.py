@@ -0,0 +1,27 @@
+"""
+Recalcula la tabla de productos relacionados.
+
+Pensado para ejecutarse periódicamente (cron) o tras importar el catálogo:
+    python manage.py rebuild_related_products
+    python manage.py rebuild_related_products --limit 12
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.related import rebuild_related_products
+
+
+class Command(BaseCommand):
+    help = "Recalcula los productos relacionados de todo el catálogo."
+    requires_system_checks = []  # Arranque rápido: no importa URLs, vistas ni admin
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Vecinos por producto (default: RELATED_PRODUCTS_LIMIT)")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = rebuild_related_products(options['limit'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"{rows} relaciones guardadas en {elapsed:.2f} s"))
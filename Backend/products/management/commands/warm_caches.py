@@ -0,0 +1,89 @@
+"""
+Precalienta el catálogo después de un deploy.
+
+Repite en paralelo las consultas más comunes del catálogo (home, cada
+categoría x audiencia, primeras páginas de cada marca) o las más pedidas de
+un access log, deja las respuestas en la caché, precarga las imágenes que
+devuelven y, con SQLite, lee el archivo de la base para el page cache.
+
+Uso:
+    python manage.py warm_caches
+    python manage.py warm_caches --from-log /var/log/gunicorn/access.log --top 300
+    python manage.py warm_caches --url https://dental-gest.onrender.com --workers 8
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from products.warmup import catalog_paths, paths_from_access_log, preload_file, warm_paths
+
+
+class Command(BaseCommand):
+    help = "Precalienta caché, base de datos e imágenes del catálogo (tras un deploy)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-log', dest='log_file',
+                            help="Tomar las rutas más pedidas de este access log")
+        parser.add_argument('--top', type=int, default=200,
+                            help="Rutas a tomar del access log (default: 200)")
+        parser.add_argument('--brand-pages', type=int, default=None,
+                            help="Páginas por marca (default: WARMUP_BRAND_PAGES)")
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Peticiones en paralelo (default: 4)")
+        parser.add_argument('--url', dest='base_url',
+                            help="Pedir las rutas por HTTP a este servidor en vez de en este proceso")
+        parser.add_argument('--host', default=None,
+                            help="Host de las peticiones locales (default: WARMUP_HOST)")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("--workers debe ser al menos 1.")
+        started = time.perf_counter()
+
+        if options['log_file']:
+            try:
+                with open(options['log_file'], encoding='utf-8', errors='replace') as log:
+                    paths = paths_from_access_log(log, options['top'])
+            except OSError as exc:
+                raise CommandError(f"No se pudo leer el log: {exc}")
+        else:
+            paths = catalog_paths(options['brand_pages'])
+
+        if not options['base_url']:
+            if connection.vendor == 'sqlite':
+                size = preload_file(connection.settings_dict['NAME'])
+                self.stdout.write(f"Base de datos: {size / 1024 / 1024:.1f} MB leídos")
+            if 'LocMemCache' in settings.CACHES['default']['BACKEND']:
+                self.stdout.write(self.style.WARNING(
+                    "La caché es LocMemCache (local a este proceso): las respuestas no "
+                    "quedarán en el servidor. Usar --url o una caché compartida."
+                ))
+
+        result = warm_paths(
+            paths,
+            workers=options['workers'],
+            host=options['host'],
+            base_url=options['base_url'],
+        )
+
+        requests = result['requests']
+        failed = [(path, status) for path, status, _ in requests if status != 200]
+        for path, status in failed:
+            self.stdout.write(self.style.WARNING(f"  {status} {path}"))
+
+        durations = sorted(seconds for _, _, seconds in requests)
+        if durations:
+            self.stdout.write(
+                f"Peticiones: {len(requests)} ({len(failed)} con error) · "
+                f"mediana {statistics.median(durations) * 1000:.0f} ms · "
+                f"máx {durations[-1] * 1000:.0f} ms"
+            )
+            for path, _, seconds in sorted(requests, key=lambda row: -row[2])[:5]:
+                self.stdout.write(f"  {seconds * 1000:7.0f} ms  {path}")
+        self.stdout.write(f"Imágenes: {result['images']} ({result['image_bytes'] / 1024 / 1024:.1f} MB)")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Precalentamiento completo en {elapsed:.2f} s"))
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:03
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0008_product_cost_price"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="current_price",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.comparison.Coalesce(
+                    "discount_price",
+                    "price",
+                    output_field=models.DecimalField(decimal_places=2, max_digits=10),
+                ),
+                output_field=models.DecimalField(decimal_places=2, max_digits=10),
+                verbose_name="Precio actual ($)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="discount_percentage",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(
+                        discount_price__isnull=False,
+                        price__gt=0,
+                        then=models.ExpressionWrapper(
+                            django.db.models.expressions.CombinedExpression(
+                                django.db.models.expressions.CombinedExpression(
+                                    django.db.models.expressions.CombinedExpression(
+                                        django.db.models.functions.comparison.Cast(
+                                            django.db.models.functions.math.Round(
+                                                django.db.models.expressions.CombinedExpression(
+                                                    models.F("price"),
+                                                    "*",
+                                                    models.Value(100),
+                                                )
+                                            ),
+                                            models.IntegerField(),
+                                        ),
+                                        "-",
+                                        django.db.models.functions.comparison.Cast(
+                                            django.db.models.functions.math.Round(
+                                                django.db.models.expressions.CombinedExpression(
+                                                    models.F("discount_price"),
+                                                    "*",
+                                                    models.Value(100),
+                                                )
+                                            ),
+                                            models.IntegerField(),
+                                        ),
+                                    ),
+                                    "*",
+                                    models.Value(100),
+                                ),
+                                "/",
+                                django.db.models.functions.comparison.Cast(
+                                    django.db.models.functions.math.Round(
+                                        django.db.models.expressions.CombinedExpression(
+                                            models.F("price"), "*", models.Value(100)
+                                        )
+                                    ),
+                                    models.IntegerField(),
+                                ),
+                            ),
+                            output_field=models.IntegerField(),
+                        ),
+                    ),
+                    default=models.Value(0),
+                    output_field=models.IntegerField(),
+                ),
+                output_field=models.IntegerField(),
+                verbose_name="Descuento (%)",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["current_price"], name="product_current_price_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["discount_percentage"], name="product_discount_pct_idx"
+            ),
+        ),
+    ]
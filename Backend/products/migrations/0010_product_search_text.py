@@ -0,0 +1,104 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from products.text import normalize_text, trigrams
+
+
+def populate_search_text(apps, schema_editor):
+    """Calcula search_text y, sin pg_trgm, los trigramas de los productos existentes."""
+    Product = apps.get_model("products", "Product")
+    ProductTrigram = apps.get_model("products", "ProductTrigram")
+    db = schema_editor.connection.alias
+    use_table = schema_editor.connection.vendor != "postgresql"
+
+    products = list(Product.objects.using(db).select_related("category", "brand"))
+    for product in products:
+        parts = [product.name, product.category.name]
+        if product.brand_id:
+            parts.append(product.brand.name)
+        product.search_text = normalize_text(" ".join(parts))[:500]
+    Product.objects.using(db).bulk_update(products, ["search_text"], batch_size=500)
+
+    if use_table:
+        ProductTrigram.objects.using(db).bulk_create(
+            [
+                ProductTrigram(product_id=product.pk, trigram=trigram)
+                for product in products
+                for trigram in trigrams(product.search_text)
+            ],
+            batch_size=1000,
+        )
+
+
+def create_trigram_index(apps, schema_editor):
+    """En PostgreSQL: extensión pg_trgm e índice GIN sobre search_text."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS product_search_trgm_idx "
+        "ON products_product USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS product_search_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0009_product_current_price_discount_percentage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_text",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=500,
+                verbose_name="Texto de búsqueda",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ProductTrigram",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("trigram", models.CharField(max_length=3, verbose_name="Trigrama")),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trigrams",
+                        to="products.product",
+                        verbose_name="Producto",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Trigrama de producto",
+                "verbose_name_plural": "Trigramas de producto",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("trigram", "product"), name="product_trigram_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
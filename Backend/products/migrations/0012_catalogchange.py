@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:05
+
+from django.db import migrations, models
+
+
+def record_existing_catalog(apps, schema_editor):
+    """Una fila por objeto existente: la primera sincronización (since=0) trae todo."""
+    CatalogChange = apps.get_model("products", "CatalogChange")
+    db = schema_editor.connection.alias
+    for kind, model in (
+        ("category", "Category"),
+        ("brand", "Brand"),
+        ("product", "Product"),
+        ("image", "ProductImage"),
+    ):
+        ids = (
+            apps.get_model("products", model)
+            .objects.using(db)
+            .values_list("pk", flat=True)
+        )
+        CatalogChange.objects.using(db).bulk_create(
+            [CatalogChange(kind=kind, object_id=pk) for pk in ids.order_by("pk")],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0011_relatedproduct"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("product", "Producto"),
+                            ("category", "Categoría"),
+                            ("brand", "Marca"),
+                            ("image", "Imagen"),
+                        ],
+                        max_length=10,
+                        verbose_name="Tipo",
+                    ),
+                ),
+                (
+                    "object_id",
+                    models.PositiveIntegerField(verbose_name="Id del objeto"),
+                ),
+                (
+                    "deleted",
+                    models.BooleanField(default=False, verbose_name="Eliminado"),
+                ),
+                (
+                    "changed_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha del cambio"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Cambio del catálogo",
+                "verbose_name_plural": "Cambios del catálogo",
+                "ordering": ["id"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "object_id"),
+                        name="catalog_change_object_unique",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(record_existing_catalog, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0012_catalogchange"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockReservationLock",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="reservation_lock",
+                        serialize=False,
+                        to="products.product",
+                        verbose_name="Producto",
+                    ),
+                ),
+                (
+                    "version",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Versión"),
+                ),
+            ],
+            options={
+                "verbose_name": "Bloqueo de reservas",
+                "verbose_name_plural": "Bloqueos de reservas",
+            },
+        ),
+        migrations.CreateModel(
+            name="StockReservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cart_id", models.CharField(max_length=64, verbose_name="Carrito")),
+                ("quantity", models.PositiveIntegerField(verbose_name="Cantidad")),
+                ("expires_at", models.DateTimeField(verbose_name="Vence")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha de creación"
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="products.product",
+                        verbose_name="Producto",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Reserva de stock",
+                "verbose_name_plural": "Reservas de stock",
+                "indexes": [
+                    models.Index(
+                        fields=["product", "expires_at", "quantity"],
+                        name="stock_reservation_active_idx",
+                    ),
+                    models.Index(
+                        fields=["expires_at"], name="stock_reservation_expiry_idx"
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("cart_id", "product"),
+                        name="stock_reservation_cart_product_unique",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:32
+
+from django.db import migrations, models
+
+from products.text import normalize_text, trigrams
+
+
+def index_descriptions(apps, schema_editor):
+    """Recalcula search_text con la descripción y, sin pg_trgm, sus trigramas."""
+    Product = apps.get_model("products", "Product")
+    ProductTrigram = apps.get_model("products", "ProductTrigram")
+    db = schema_editor.connection.alias
+    use_table = schema_editor.connection.vendor != "postgresql"
+
+    products = list(Product.objects.using(db).select_related("category", "brand"))
+    for product in products:
+        parts = [product.name, product.category.name]
+        if product.brand_id:
+            parts.append(product.brand.name)
+        parts.append(product.description)
+        product.search_text = normalize_text(" ".join(parts))[:2000]
+    Product.objects.using(db).bulk_update(products, ["search_text"], batch_size=500)
+
+    if use_table:
+        ProductTrigram.objects.using(db).all().delete()
+        ProductTrigram.objects.using(db).bulk_create(
+            [
+                ProductTrigram(product_id=product.pk, trigram=trigram)
+                for product in products
+                for trigram in trigrams(product.search_text)
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0013_stockreservation"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="product",
+            name="search_text",
+            field=models.TextField(
+                blank=True, editable=False, verbose_name="Texto de búsqueda"
+            ),
+        ),
+        migrations.RunPython(index_descriptions, migrations.RunPython.noop),
+    ]
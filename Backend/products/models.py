@@ -5,14 +5,22 @@ Incluye:
 - Category: Categorías de productos
 - Product: Productos con lógica de stock y precios de oferta
 - ProductImage: Imágenes adicionales para galería
+- ProductTrigram: Trigramas del texto de búsqueda (búsqueda difusa sin pg_trgm)
+- RelatedProduct: Vecinos precalculados de cada producto ("También te podría interesar")
+- CatalogChange: Último cambio de cada objeto del catálogo (sincronización incremental)
+- StockReservation / StockReservationLock: Stock apartado por carritos, con vencimiento
 """
 import os
 from uuid import uuid4
 from decimal import Decimal
 from django.db import models
+from django.db.models import Case, ExpressionWrapper, F, IntegerField, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
 from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 
+from .text import normalize_text
+
 
 def path_and_rename(instance, filename):
     """
@@ -149,6 +157,47 @@ class Brand(models.Model):
         super().save(*args, **kwargs)
 
 
+# =============================================================================
+# EXPRESIONES SQL DE PRECIO Y STOCK
+# =============================================================================
+# CURRENT_PRICE_SQL y DISCOUNT_PERCENTAGE_SQL definen las columnas generadas
+# Product.current_price / Product.discount_percentage. STOCK_STATUS_SQL es el
+# equivalente de Product.stock_status para los listados sin serializador.
+
+CURRENT_PRICE_SQL = Coalesce(
+    'discount_price', 'price',
+    output_field=models.DecimalField(max_digits=10, decimal_places=2),
+)
+
+# Se calcula en centavos enteros: con REAL (SQLite) la división en coma
+# flotante puede quedar en 29.999... y truncar distinto que Decimal en Python.
+_PRICE_CENTS = Cast(Round(F('price') * 100), IntegerField())
+_DISCOUNT_CENTS = Cast(Round(F('discount_price') * 100), IntegerField())
+
+DISCOUNT_PERCENTAGE_SQL = Case(
+    When(
+        discount_price__isnull=False,
+        price__gt=0,
+        then=ExpressionWrapper(
+            (_PRICE_CENTS - _DISCOUNT_CENTS) * 100 / _PRICE_CENTS,
+            output_field=IntegerField(),
+        ),
+    ),
+    default=Value(0),
+    output_field=IntegerField(),
+)
+
+STOCK_STATUS_SQL = Case(
+    When(stock_count=0, then=Value("Agotado")),
+    When(stock_count__lt=5, then=Value("Poco Stock")),
+    default=Value("En Stock"),
+    output_field=models.CharField(),
+)
+
+# Caracteres de Product.search_text: acota los trigramas de una descripción larga
+SEARCH_TEXT_MAX_LENGTH = 2000
+
+
 class Product(models.Model):
     """Producto del catálogo de suministros odontológicos."""
     name = models.CharField(
@@ -210,6 +259,28 @@ class Product(models.Model):
         verbose_name="Cantidad en stock",
         help_text="Número de unidades disponibles"
     )
+    # Precio efectivo y % de descuento calculados por la base de datos
+    # (columnas generadas): también se mantienen con update() y bulk_create(),
+    # y se pueden indexar para filtrar y ordenar por el precio real.
+    current_price = models.GeneratedField(
+        expression=CURRENT_PRICE_SQL,
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+        verbose_name="Precio actual ($)",
+    )
+    discount_percentage = models.GeneratedField(
+        expression=DISCOUNT_PERCENTAGE_SQL,
+        output_field=models.IntegerField(),
+        db_persist=True,
+        verbose_name="Descuento (%)",
+    )
+    # Nombre, categoría, marca y descripción normalizados (sin tildes ni
+    # mayúsculas) para la búsqueda difusa de ?search= (ver products/search.py)
+    search_text = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name="Texto de búsqueda",
+    )
     in_stock = models.BooleanField(
         default=False,
         editable=False,
@@ -237,6 +308,10 @@ class Product(models.Model):
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['current_price'], name='product_current_price_idx'),
+            models.Index(fields=['discount_percentage'], name='product_discount_pct_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -247,28 +322,32 @@ class Product(models.Model):
                 'discount_price': 'El precio de oferta debe ser menor que el precio regular.'
             })
 
+    def build_search_text(self) -> str:
+        parts = [self.name, self.category.name if self.category_id else '']
+        if self.brand_id:
+            parts.append(self.brand.name)
+        # La descripción va al final: si hay que recortar, se recorta ella
+        parts.append(self.description)
+        return normalize_text(' '.join(parts))[:SEARCH_TEXT_MAX_LENGTH]
+
     def save(self, *args, **kwargs):
         self.in_stock = self.stock_count > 0
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'name', 'brand', 'category', 'description'} & set(update_fields):
+            self.search_text = self.build_search_text()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_text'}
         self.full_clean()
         super().save(*args, **kwargs)
-
-    @property
-    def current_price(self) -> Decimal:
-        if self.discount_price is not None:
-            return self.discount_price
-        return self.price
+        # La BD recalcula las columnas generadas: se descartan los valores en
+        # memoria para que el próximo acceso las vuelva a leer
+        for field in ('current_price', 'discount_percentage'):
+            self.__dict__.pop(field, None)
 
     @property
     def has_discount(self) -> bool:
         return self.discount_price is not None
 
-    @property
-    def discount_percentage(self) -> int:
-        if self.discount_price is not None and self.price > 0:
-            discount = ((self.price - self.discount_price) / self.price) * 100
-            return int(discount)
-        return 0
-
     @property
     def stock_status(self) -> str:
         if self.stock_count == 0:
@@ -277,19 +356,29 @@ class Product(models.Model):
             return "Poco Stock"
         return "En Stock"
 
+    @property
+    def effective_price(self) -> Decimal:
+        """
+        current_price también sin guardar: la columna generada solo se puede
+        leer de una fila guardada (p. ej. el formulario de alta del admin).
+        """
+        if self._state.adding:
+            return self.price if self.discount_price is None else self.discount_price
+        return self.current_price
+
     @property
     def profit_margin(self) -> Decimal:
         """Ganancia unitaria en dólares (precio de venta - costo)."""
         if self.cost_price is None:
             return Decimal('0')
-        return self.current_price - self.cost_price
+        return self.effective_price - self.cost_price
 
     @property
     def profit_margin_percentage(self) -> int:
         """Porcentaje de ganancia sobre el costo."""
         if self.cost_price is None or self.cost_price == 0:
             return 0
-        return int(((self.current_price - self.cost_price) / self.cost_price) * 100)
+        return int(((self.effective_price - self.cost_price) / self.cost_price) * 100)
 
 
 class ProductImage(models.Model):
@@ -325,3 +414,157 @@ class ProductImage(models.Model):
 
     def __str__(self):
         return f"Imagen de {self.product.name}"
+
+
+class ProductTrigram(models.Model):
+    """
+    Trigramas de Product.search_text, uno por fila.
+
+    Solo se usan en bases de datos sin pg_trgm (SQLite): la búsqueda difusa
+    cuenta cuántos trigramas de la consulta tiene cada producto usando el
+    índice por trigrama, sin recorrer la tabla de productos.
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='trigrams',
+        verbose_name="Producto"
+    )
+    trigram = models.CharField(max_length=3, verbose_name="Trigrama")
+
+    class Meta:
+        verbose_name = "Trigrama de producto"
+        verbose_name_plural = "Trigramas de producto"
+        constraints = [
+            models.UniqueConstraint(fields=['trigram', 'product'], name='product_trigram_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.trigram!r} ({self.product_id})"
+
+
+class RelatedProduct(models.Model):
+    """
+    Productos relacionados precalculados (ver products/related.py).
+
+    La tabla la reconstruye el comando rebuild_related_products; el endpoint
+    /api/products/{id}/related/ solo lee las filas de un producto por rank.
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='neighbours',
+        verbose_name="Producto"
+    )
+    related = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='neighbour_of',
+        verbose_name="Producto relacionado"
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name="Posición")
+    score = models.FloatField(verbose_name="Puntuación")
+
+    class Meta:
+        verbose_name = "Producto relacionado"
+        verbose_name_plural = "Productos relacionados"
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='related_product_rank_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} (#{self.rank})"
+
+
+# Tipos de objeto de CatalogChange
+CHANGE_KIND_CHOICES = [
+    ('product', 'Producto'),
+    ('category', 'Categoría'),
+    ('brand', 'Marca'),
+    ('image', 'Imagen'),
+]
+
+
+class CatalogChange(models.Model):
+    """
+    Último cambio de cada objeto del catálogo (ver products/changes.py).
+
+    Cada cambio borra la fila anterior del objeto e inserta una nueva: el id
+    autoincremental es la secuencia de cambios y la tabla guarda una fila por
+    objeto (las bajas quedan como `deleted`). /api/products/changes/?since=
+    lee por el índice de la clave primaria, sin recorrer el catálogo.
+    """
+    kind = models.CharField(max_length=10, choices=CHANGE_KIND_CHOICES, verbose_name="Tipo")
+    object_id = models.PositiveIntegerField(verbose_name="Id del objeto")
+    deleted = models.BooleanField(default=False, verbose_name="Eliminado")
+    changed_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha del cambio")
+
+    class Meta:
+        verbose_name = "Cambio del catálogo"
+        verbose_name_plural = "Cambios del catálogo"
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='catalog_change_object_unique'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} {self.object_id}{' (eliminado)' if self.deleted else ''}"
+
+
+class StockReservation(models.Model):
+    """
+    Unidades de un producto apartadas por un carrito hasta `expires_at` (ver
+    products/reservations.py). El stock disponible es stock_count menos la
+    suma de las reservas vigentes: el índice (product, expires_at, quantity)
+    cubre esa suma sin leer la tabla. Las vencidas dejan de contar en el
+    momento; borrarlas es solo limpieza (en segundo plano).
+    """
+    cart_id = models.CharField(max_length=64, verbose_name="Carrito")
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='reservations',
+        verbose_name="Producto"
+    )
+    quantity = models.PositiveIntegerField(verbose_name="Cantidad")
+    expires_at = models.DateTimeField(verbose_name="Vence")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+
+    class Meta:
+        verbose_name = "Reserva de stock"
+        verbose_name_plural = "Reservas de stock"
+        constraints = [
+            models.UniqueConstraint(fields=['cart_id', 'product'], name='stock_reservation_cart_product_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'expires_at', 'quantity'], name='stock_reservation_active_idx'),
+            models.Index(fields=['expires_at'], name='stock_reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.cart_id}: {self.quantity} x {self.product_id}"
+
+
+class StockReservationLock(models.Model):
+    """
+    Punto de serialización de las reservas de un producto. Reservar hace
+    primero un UPDATE de esta fila: dos carritos que piden las últimas
+    unidades a la vez esperan uno al otro aquí, sin bloquear la fila de
+    Product (ventas y admin siguen sin esperar).
+    """
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='reservation_lock',
+        verbose_name="Producto"
+    )
+    version = models.PositiveBigIntegerField(default=0, verbose_name="Versión")
+
+    class Meta:
+        verbose_name = "Bloqueo de reservas"
+        verbose_name_plural = "Bloqueos de reservas"
+
+    def __str__(self):
+        return f"{self.product_id} (v{self.version})"
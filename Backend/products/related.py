@@ -0,0 +1,157 @@
+"""
+Cálculo de productos relacionados (tabla RelatedProduct).
+
+Incluye:
+- compute_neighbours: Vecinos puntuados de cada producto, en memoria
+- rebuild_related_products: Reemplaza la tabla RelatedProduct completa
+
+La puntuación suma:
+- misma categoría / misma marca
+- audiencia compatible (igual, o alguna de las dos GENERAL)
+- cercanía de precio (relativa al mayor de los dos precios)
+- compras conjuntas: productos vendidos al mismo cliente en Sale
+- un pequeño extra si el vecino está en stock
+
+Para no comparar todos contra todos, los candidatos de cada producto son
+los más cercanos en precio dentro de su categoría y de su marca, más los
+que comparten clientes.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import combinations
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import bump_catalog_version
+from .models import Product, RelatedProduct
+
+
+WEIGHT_CATEGORY = 3.0
+WEIGHT_BRAND = 2.0
+WEIGHT_AUDIENCE = 1.0
+WEIGHT_PRICE = 1.0
+WEIGHT_CO_PURCHASE = 4.0
+WEIGHT_IN_STOCK = 0.5
+
+# Candidatos por categoría y por marca (los más cercanos en precio)
+CANDIDATES_PER_GROUP = 40
+
+# Clientes con más productos distintos se ignoran para compras conjuntas
+# (ej. "Consumidor final"): no aportan señal y el costo es cuadrático
+CO_PURCHASE_MAX_BASKET = 30
+
+
+def _co_purchases():
+    """{producto: {otro_producto: veces que los compró el mismo cliente}}."""
+    from finance.models import Sale
+
+    baskets = defaultdict(set)
+    rows = (
+        Sale.objects.exclude(customer_name='')
+        .order_by()
+        .values_list('customer_name', 'product_id')
+        .distinct()
+    )
+    for customer, product_id in rows:
+        baskets[customer.strip().lower()].add(product_id)
+
+    counts = defaultdict(lambda: defaultdict(int))
+    for basket in baskets.values():
+        if len(basket) > CO_PURCHASE_MAX_BASKET:
+            continue
+        for a, b in combinations(basket, 2):
+            counts[a][b] += 1
+            counts[b][a] += 1
+    return counts
+
+
+def _nearest_by_price(group, price, size):
+    """Los `size` elementos de `group` (ordenado por precio) más cercanos a `price`."""
+    position = bisect_left(group, (price,))
+    half = size // 2
+    start = max(0, min(position - half, len(group) - size))
+    return group[start:start + size]
+
+
+def _audience_compatible(a, b):
+    return a == b or 'GENERAL' in (a, b)
+
+
+def compute_neighbours(limit=None):
+    """
+    Devuelve {product_id: [(related_id, score), ...]} con como mucho `limit`
+    vecinos por producto, de mayor a menor puntuación.
+    """
+    limit = limit or settings.RELATED_PRODUCTS_LIMIT
+    products = {
+        pk: (category_id, brand_id, audience, float(price), in_stock)
+        for pk, category_id, brand_id, audience, price, in_stock in Product.objects.order_by().values_list(
+            'pk', 'category_id', 'brand_id', 'target_audience', 'current_price', 'in_stock',
+        )
+    }
+
+    by_category = defaultdict(list)
+    by_brand = defaultdict(list)
+    for pk, (category_id, brand_id, _, price, _) in products.items():
+        by_category[category_id].append((price, pk))
+        if brand_id:
+            by_brand[brand_id].append((price, pk))
+    for group in (*by_category.values(), *by_brand.values()):
+        group.sort()
+
+    co_purchases = _co_purchases()
+    max_co_purchase = max(
+        (count for partners in co_purchases.values() for count in partners.values()), default=0
+    )
+
+    neighbours = {}
+    for pk, (category_id, brand_id, audience, price, _) in products.items():
+        candidates = {other for _, other in _nearest_by_price(by_category[category_id], price, CANDIDATES_PER_GROUP)}
+        if brand_id:
+            candidates.update(other for _, other in _nearest_by_price(by_brand[brand_id], price, CANDIDATES_PER_GROUP))
+        partners = co_purchases.get(pk, {})
+        candidates.update(other for other in partners if other in products)
+        candidates.discard(pk)
+
+        scored = []
+        for other in candidates:
+            other_category, other_brand, other_audience, other_price, other_in_stock = products[other]
+            score = 0.0
+            if other_category == category_id:
+                score += WEIGHT_CATEGORY
+            if brand_id and other_brand == brand_id:
+                score += WEIGHT_BRAND
+            if _audience_compatible(audience, other_audience):
+                score += WEIGHT_AUDIENCE
+            highest = max(price, other_price)
+            if highest > 0:
+                score += WEIGHT_PRICE * (1 - abs(price - other_price) / highest)
+            if other in partners:
+                score += WEIGHT_CO_PURCHASE * partners[other] / max_co_purchase
+            if other_in_stock:
+                score += WEIGHT_IN_STOCK
+            scored.append((-score, other))
+
+        scored.sort()
+        neighbours[pk] = [(other, -negative) for negative, other in scored[:limit]]
+    return neighbours
+
+
+def rebuild_related_products(limit=None):
+    """
+    Recalcula y reemplaza la tabla RelatedProduct en una transacción.
+    Retorna el número de filas escritas.
+    """
+    neighbours = compute_neighbours(limit)
+    rows = [
+        RelatedProduct(product_id=pk, related_id=other, rank=rank, score=round(score, 4))
+        for pk, items in neighbours.items()
+        for rank, (other, score) in enumerate(items)
+    ]
+    with transaction.atomic():
+        RelatedProduct.objects.all().delete()
+        RelatedProduct.objects.bulk_create(rows, batch_size=1000)
+        # La tabla no emite señales: invalidar a mano las respuestas cacheadas
+        bump_catalog_version()
+    return len(rows)
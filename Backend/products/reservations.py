@@ -0,0 +1,176 @@
+"""
+Reservas de stock por carrito con vencimiento.
+
+Incluye:
+- InsufficientStock: No hay unidades libres para la cantidad pedida
+- valid_cart_id: Formato del id de carrito que genera el frontend
+- reservation_status: Cantidad apartada, vencimiento y disponible por producto
+- reserve: Fija cuántas unidades aparta un carrito de un producto (0 = liberar)
+- release: Libera las reservas de un carrito (todas o de algunos productos)
+- expire_reservations: Borra en lote las reservas vencidas
+- schedule_expiry: Encola la limpieza como máximo una vez por intervalo
+
+El disponible se calcula, no se guarda: stock_count menos la suma de las
+reservas vigentes (índice cubriente de StockReservation). Una reserva vence
+sola al pasar expires_at; la limpieza en segundo plano solo borra filas.
+
+Reservar toma primero la fila de StockReservationLock del producto con un
+UPDATE (como claim_next en jobs/queue.py): las reservas del mismo producto se
+serializan ahí y la fila de Product nunca se bloquea. El stock se lee sin
+bloquear: una venta simultánea puede dejar una reserva sin respaldo hasta
+que venza; la venta sigue siendo la que valida el stock real.
+"""
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DateTimeField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, StockReservation, StockReservationLock
+
+
+CART_ID = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+SWEEP_KEY = 'reservations:sweep'
+SWEEP_BATCH = 1000
+
+
+class InsufficientStock(Exception):
+    """La cantidad pedida supera lo que el carrito puede apartar (`status['available']`)."""
+
+    def __init__(self, status):
+        super().__init__(f"Solo hay {status['available']} unidades disponibles.")
+        self.status = status
+
+
+def valid_cart_id(cart_id):
+    return bool(CART_ID.match(cart_id))
+
+
+def _reserved_by_others(cart_id, now):
+    """Unidades del producto (OuterRef) apartadas por reservas vigentes de otros carritos."""
+    total = (
+        StockReservation.objects
+        .filter(product=OuterRef('pk'), expires_at__gt=now)
+        .exclude(cart_id=cart_id)
+        .values('product')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+
+def _status_queryset(cart_id, now):
+    own = StockReservation.objects.filter(product=OuterRef('pk'), cart_id=cart_id, expires_at__gt=now)
+    return Product.objects.annotate(
+        others=_reserved_by_others(cart_id, now),
+        held=Coalesce(Subquery(own.values('quantity')[:1], output_field=IntegerField()), Value(0)),
+        held_until=Subquery(own.values('expires_at')[:1], output_field=DateTimeField()),
+    ).values_list('pk', 'stock_count', 'others', 'held', 'held_until')
+
+
+def _status(row):
+    pk, stock_count, others, held, held_until = row
+    return {
+        'product': pk,
+        'quantity': held,
+        'expires_at': held_until,
+        # Lo máximo que este carrito puede tener apartado (incluye lo suyo)
+        'available': max(stock_count - others, 0),
+    }
+
+
+def reservation_status(cart_id, product_ids=None):
+    """
+    Estado de los productos indicados, o de los que el carrito tiene
+    apartados, en una consulta: [{product, quantity, expires_at, available}].
+    """
+    now = timezone.now()
+    products = _status_queryset(cart_id, now)
+    if product_ids is None:
+        products = products.filter(reservations__cart_id=cart_id, reservations__expires_at__gt=now)
+    else:
+        products = products.filter(pk__in=product_ids)
+    return [_status(row) for row in products.order_by('pk')]
+
+
+def _lock(product_id):
+    """UPDATE de la fila de bloqueo del producto (la crea la primera vez)."""
+    locks = StockReservationLock.objects.filter(product_id=product_id)
+    if not locks.update(version=F('version') + 1):
+        if not Product.objects.filter(pk=product_id).exists():
+            raise Product.DoesNotExist(product_id)
+        StockReservationLock.objects.bulk_create(
+            [StockReservationLock(product_id=product_id)], ignore_conflicts=True,
+        )
+        locks.update(version=F('version') + 1)
+
+
+def reserve(cart_id, product_id, quantity):
+    """
+    Aparta `quantity` unidades (reemplaza la cantidad anterior y renueva el
+    vencimiento). Retorna el estado del producto; InsufficientStock si no
+    alcanzan y Product.DoesNotExist si el producto no existe.
+    """
+    if quantity == 0:
+        release(cart_id, [product_id])
+        rows = reservation_status(cart_id, [product_id])
+        if not rows:
+            raise Product.DoesNotExist(product_id)
+        return rows[0]
+
+    now = timezone.now()
+    with transaction.atomic():
+        _lock(product_id)
+        row = _status_queryset(cart_id, now).filter(pk=product_id).first()
+        if row is None:
+            raise Product.DoesNotExist(product_id)
+        status = _status(row)
+        if quantity > status['available']:
+            raise InsufficientStock(status)
+
+        expires_at = now + timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+        reservations = StockReservation.objects.filter(cart_id=cart_id, product_id=product_id)
+        if not reservations.update(quantity=quantity, expires_at=expires_at):
+            StockReservation.objects.create(
+                cart_id=cart_id, product_id=product_id, quantity=quantity, expires_at=expires_at,
+            )
+        transaction.on_commit(schedule_expiry)
+    return {**status, 'quantity': quantity, 'expires_at': expires_at}
+
+
+def release(cart_id, product_ids=None):
+    """Borra las reservas del carrito (de `product_ids` o todas). Retorna cuántas."""
+    reservations = StockReservation.objects.filter(cart_id=cart_id)
+    if product_ids is not None:
+        reservations = reservations.filter(product_id__in=product_ids)
+    deleted, _ = reservations.delete()
+    return deleted
+
+
+def expire_reservations(now=None, batch_size=SWEEP_BATCH):
+    """Borra las reservas vencidas de a `batch_size` filas. Retorna cuántas borró."""
+    now = now or timezone.now()
+    expired = StockReservation.objects.filter(expires_at__lte=now)
+    total = 0
+    while True:
+        pks = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return total
+        # expires_at otra vez: una reserva renovada entre medio no se borra
+        deleted, _ = expired.filter(pk__in=pks).delete()
+        total += deleted
+        if len(pks) < batch_size:
+            return total
+
+
+def schedule_expiry():
+    """Encola la limpieza como máximo una vez cada STOCK_RESERVATION_SWEEP_INTERVAL."""
+    if cache.add(SWEEP_KEY, 1, timeout=settings.STOCK_RESERVATION_SWEEP_INTERVAL):
+        # Import local: tasks.py importa este módulo
+        from .tasks import expire_stock_reservations
+
+        expire_stock_reservations.enqueue()
@@ -0,0 +1,89 @@
+"""
+Búsqueda difusa de productos (?search=) por similitud de trigramas.
+
+Incluye:
+- FuzzySearchFilter: Filtra y puntúa por trigramas sobre Product.search_text
+- RankedOrderingFilter: Sin ?ordering= explícito, ordena por relevancia
+
+El mantenimiento de search_text y ProductTrigram está en search_index.py.
+
+search_text guarda nombre, categoría, marca y descripción ya normalizados
+(sin tildes ni mayúsculas), así que "RESÍNA" encuentra "Resina" y "Hu Friedi"
+encuentra "Hu-Friedy" sin aplicar unaccent/lower a cada fila al consultar.
+La descripción pasa por el mismo índice de trigramas que el resto.
+
+- PostgreSQL: operador `%>` de pg_trgm sobre un índice GIN (gin_trgm_ops) y
+  TrigramWordSimilarity para ordenar (migración 0010).
+- Otras bases (SQLite): tabla ProductTrigram indexada por trigrama; se
+  cuentan los trigramas de la consulta presentes en cada producto.
+
+En ambos casos la búsqueda usa un índice: no recorre toda la tabla.
+"""
+import math
+
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from rest_framework import filters
+
+from .models import ProductTrigram
+from .search_index import uses_pg_trgm
+from .text import normalize_text, trigrams
+
+
+# =============================================================================
+# FILTROS DE DRF
+# =============================================================================
+
+class FuzzySearchFilter(filters.SearchFilter):
+    """
+    ?search= tolerante a tildes y errores de tipeo.
+
+    Anota `search_rank` (mayor es mejor). Con FUZZY_SEARCH_ENABLED = False
+    se comporta como SearchFilter (icontains sobre search_fields).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not settings.FUZZY_SEARCH_ENABLED:
+            return super().filter_queryset(request, queryset, view)
+
+        query = normalize_text(' '.join(self.get_search_terms(request)))
+        if not query:
+            return queryset
+        if uses_pg_trgm(queryset.db):
+            return self.pg_trgm_filter(queryset, query)
+        return self.trigram_table_filter(queryset, query)
+
+    def pg_trgm_filter(self, queryset, query):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        # `%>` usa pg_trgm.word_similarity_threshold del servidor y el índice GIN
+        return queryset.filter(search_text__trigram_word_similar=query).annotate(
+            search_rank=TrigramWordSimilarity(query, 'search_text')
+        )
+
+    def trigram_table_filter(self, queryset, query):
+        wanted = trigrams(query)
+        min_hits = max(1, math.ceil(len(wanted) * settings.FUZZY_SEARCH_THRESHOLD))
+        hits = (
+            ProductTrigram.objects.filter(trigram__in=wanted)
+            .values('product')
+            .annotate(hits=Count('pk'))
+            .filter(hits__gte=min_hits)
+        )
+        return queryset.filter(pk__in=hits.values('product')).annotate(
+            search_rank=Subquery(
+                hits.filter(product=OuterRef('pk')).values('hits'),
+                output_field=IntegerField(),
+            )
+        )
+
+
+class RankedOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter que, sin ?ordering=, pone primero lo más relevante de ?search=."""
+
+    def get_ordering(self, request, queryset, view):
+        explicit = request.query_params.get(self.ordering_param)
+        ordering = super().get_ordering(request, queryset, view)
+        if not explicit and 'search_rank' in queryset.query.annotations:
+            return ['-search_rank', *(ordering or [])]
+        return ordering
@@ -0,0 +1,48 @@
+"""
+Mantenimiento del índice de búsqueda difusa (ver products/search.py).
+
+Incluye:
+- uses_pg_trgm: Si la base usa pg_trgm en vez de la tabla ProductTrigram
+- index_trigrams: Regenera las filas de ProductTrigram de unos productos
+- refresh_search_text: Recalcula search_text tras renombrar una marca o categoría
+
+Está separado de los filtros de DRF porque lo importan signals.py y tasks.py
+durante django.setup(): así el arranque no carga rest_framework.
+"""
+from django.db import connections
+
+from .cache import bump_catalog_version
+from .models import Product, ProductTrigram
+from .text import trigrams
+
+
+def uses_pg_trgm(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def index_trigrams(products, using='default'):
+    """Regenera las filas de ProductTrigram de los productos indicados."""
+    if uses_pg_trgm(using):
+        return  # pg_trgm indexa search_text directamente
+    products = list(products)
+    ProductTrigram.objects.using(using).filter(product__in=products).delete()
+    ProductTrigram.objects.using(using).bulk_create([
+        ProductTrigram(product=product, trigram=trigram)
+        for product in products
+        for trigram in trigrams(product.search_text)
+    ])
+
+
+def refresh_search_text(queryset):
+    """
+    Recalcula search_text (y sus trigramas) de los productos del queryset.
+    Se usa cuando cambia el nombre de una marca o categoría (Product.save()
+    ya lo recalcula al cambiar nombre o descripción).
+    """
+    products = list(queryset.select_related('category', 'brand'))
+    for product in products:
+        product.search_text = product.build_search_text()
+    Product.objects.bulk_update(products, ['search_text'])
+    index_trigrams(products)
+    # bulk_update no emite señales: los resultados de ?search= cacheados cambian
+    bump_catalog_version()
@@ -1,7 +1,48 @@
 from rest_framework import serializers
 from .models import Category, Product, ProductImage, Brand
 
-class CategorySerializer(serializers.ModelSerializer):
+
+def first_gallery_image(product):
+    """
+    Primera imagen de la galería de un producto.
+
+    Usa `images.all()` para aprovechar el prefetch_related('images') de la
+    vista; `.first()` lanzaría una consulta por producto.
+    """
+    images = product.images.all()
+    return images[0] if images else None
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Campos dinámicos para los serializadores del catálogo.
+
+    - `fields` (kwarg o context['fields']): lista de campos a devolver
+    - context['expand']: campos a sustituir por su representación anidada,
+      según `expandable_fields` = {campo: (Serializador, kwargs)}
+
+    Los campos expandidos siempre se incluyen. La vista es quien valida los
+    parámetros ?fields= / ?expand= y los pasa por el contexto.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        context = kwargs.get('context') or {}
+
+        expand = [name for name in context.get('expand') or () if name in self.expandable_fields]
+        for name in expand:
+            serializer_class, options = self.expandable_fields[name]
+            self.fields[name] = serializer_class(read_only=True, **options)
+
+        if fields is None:
+            fields = context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - set(expand):
+                self.fields.pop(name)
+
+
+class CategorySerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     product_count = serializers.SerializerMethodField()
     
     class Meta:
@@ -9,10 +50,13 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'description', 'product_count']
     
     def get_product_count(self, obj):
+        # Usa la anotación de la vista si existe (evita un COUNT por fila)
+        if hasattr(obj, 'product_count'):
+            return obj.product_count
         return obj.products.count()
 
 
-class BrandSerializer(serializers.ModelSerializer):
+class BrandSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializador de marcas."""
     product_count = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
@@ -22,6 +66,9 @@ class BrandSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'image', 'product_count']
     
     def get_product_count(self, obj):
+        # Usa la anotación de la vista si existe (evita un COUNT por fila)
+        if hasattr(obj, 'product_count'):
+            return obj.product_count
         return obj.products.count()
     
     def get_image(self, obj):
@@ -47,7 +94,7 @@ class ProductImageSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializador de DETALLE"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     category_slug = serializers.CharField(source='category.slug', read_only=True)
@@ -61,6 +108,12 @@ class ProductSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
     images = ProductImageSerializer(many=True, read_only=True)
     
+    # ?expand=category / ?expand=brand: objeto anidado en lugar del id
+    expandable_fields = {
+        'category': (CategorySerializer, {'fields': ['id', 'name', 'slug']}),
+        'brand': (BrandSerializer, {'fields': ['id', 'name', 'slug', 'image']}),
+    }
+    
     class Meta:
         model = Product
         fields = [
@@ -81,7 +134,7 @@ class ProductSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.image.url)
             return obj.image.url
         # 2. Fallback: Intentar primera imagen de galería
-        first_gallery = obj.images.first()
+        first_gallery = first_gallery_image(obj)
         if first_gallery and first_gallery.image:
             if request:
                 return request.build_absolute_uri(first_gallery.image.url)
@@ -124,7 +177,7 @@ class ProductListSerializer(serializers.ModelSerializer):
             return obj.image.url
         
         # 2. Si no, busca la primera de la galería automáticamente.
-        first_gallery = obj.images.first()
+        first_gallery = first_gallery_image(obj)
         if first_gallery and first_gallery.image:
             if request:
                 return request.build_absolute_uri(first_gallery.image.url)
@@ -134,4 +187,4 @@ class ProductListSerializer(serializers.ModelSerializer):
         return None
     
     def get_image_count(self, obj):
-        return obj.images.count()
+        return len(obj.images.all())
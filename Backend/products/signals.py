@@ -0,0 +1,195 @@
+"""
+Django Signals del catálogo de productos.
+
+Implementa:
+- Invalidación de la caché de respuestas al cambiar el catálogo
+- Actualización incremental del índice de sugerencias
+- Texto y trigramas de búsqueda difusa (search_text / ProductTrigram); los
+  cambios de marca o categoría se reindexan en segundo plano (products/tasks.py)
+- Eventos de stock en vivo para las páginas de producto (products/stock.py)
+- Actualización del snapshot estático del catálogo (products/snapshots.py)
+- Secuencia de cambios para la sincronización incremental (products/changes.py)
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .changes import record_changes
+from .models import Brand, Category, Product, ProductImage
+from .search_index import index_trigrams
+from .stock import publish_stock_change
+from .tasks import refresh_products_search_text, update_catalog_snapshots
+from .suggest import KIND_BRAND, KIND_CATEGORY, KIND_PRODUCT, suggest_index
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_catalog_cache(sender, **kwargs):
+    """
+    Cualquier alta, cambio o baja del catálogo invalida las respuestas cacheadas.
+
+    Incluye el descuento de stock de finance.signals (hace product.save()).
+    Las operaciones masivas (queryset.update, bulk_create) no emiten señales:
+    quien las use debe llamar a bump_catalog_version().
+    """
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Product)
+def refresh_suggest_index(sender, instance, **kwargs):
+    """
+    Actualiza en el índice de sugerencias solo las entradas afectadas.
+
+    Un producto también cambia el indicador "en stock" de su marca y su
+    categoría. Se aplica tras el commit para no indexar datos que se
+    deshagan con un rollback.
+    """
+    if sender is Product:
+        changes = [(KIND_PRODUCT, instance.pk), (KIND_CATEGORY, instance.category_id)]
+        if instance.brand_id:
+            changes.append((KIND_BRAND, instance.brand_id))
+    else:
+        changes = [(KIND_BRAND if sender is Brand else KIND_CATEGORY, instance.pk)]
+
+    def apply():
+        for kind, pk in changes:
+            suggest_index.refresh(kind, [pk])
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=Product)
+def sync_product_trigrams(sender, instance, update_fields=None, **kwargs):
+    """Reindexa los trigramas cuando Product.save() recalculó search_text."""
+    if update_fields is None or 'search_text' in update_fields:
+        index_trigrams([instance])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Brand)
+def refresh_related_search_text(sender, instance, created=False, **kwargs):
+    """
+    El nombre de la marca o categoría forma parte del search_text de sus
+    productos. Puede tocar miles de filas: se hace en segundo plano y solo
+    si el guardado cambió el nombre (ver remember_embedded_change).
+    """
+    if not created and getattr(instance, '_embedded_changed', False):
+        key = 'brand_id' if sender is Brand else 'category_id'
+        refresh_products_search_text.enqueue_on_commit(**{key: instance.pk})
+
+
+@receiver(pre_delete, sender=Brand)
+def remember_brand_products(sender, instance, **kwargs):
+    # SET_NULL se aplica con update(): guardar antes qué productos cambian
+    instance._search_product_ids = list(instance.products.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Brand)
+def refresh_search_text_without_brand(sender, instance, **kwargs):
+    product_ids = getattr(instance, '_search_product_ids', [])
+    if product_ids:
+        refresh_products_search_text.enqueue_on_commit(product_ids=product_ids)
+
+
+@receiver(post_save, sender=Product)
+def publish_stock(sender, instance, update_fields=None, **kwargs):
+    """Las ventas guardan solo stock_count/in_stock; el admin guarda todo."""
+    if update_fields is None or {'stock_count', 'in_stock'} & set(update_fields):
+        publish_stock_change(instance)
+
+
+# Campos de Product que cambian sin mover el producto de página
+IN_PLACE_FIELDS = {'stock_count', 'in_stock', 'search_text'}
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductImage)
+def schedule_catalog_snapshot(sender, instance, update_fields=None, **kwargs):
+    """Con CATALOG_SNAPSHOT_AUTO, reescribe en segundo plano los archivos afectados."""
+    if not settings.CATALOG_SNAPSHOT_AUTO:
+        return
+    if sender is Product:
+        fields = set(update_fields or ())
+        if fields and fields <= {'search_text'}:
+            return  # search_text no forma parte de la API
+        if fields and fields <= IN_PLACE_FIELDS:
+            changes = {'in_place': [instance.pk]}
+        else:
+            changes = {'products': [instance.pk]}
+    elif sender is ProductImage:
+        changes = {'in_place': [instance.product_id]}
+    else:
+        changes = {'brands' if sender is Brand else 'categories': [instance.pk]}
+    update_catalog_snapshots.enqueue_on_commit(**changes)
+
+
+# Campos de la marca o categoría que cada producto repite en la API
+EMBEDDED_FIELDS = ('name', 'slug')
+
+
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Brand)
+def remember_embedded_change(sender, instance, update_fields=None, **kwargs):
+    """Marca si el guardado cambia el nombre o el slug (una consulta por guardado)."""
+    if instance._state.adding or (update_fields is not None and not set(update_fields) & set(EMBEDDED_FIELDS)):
+        instance._embedded_changed = False
+        return
+    before = sender.objects.filter(pk=instance.pk).values_list(*EMBEDDED_FIELDS).first()
+    instance._embedded_changed = before != tuple(getattr(instance, name) for name in EMBEDDED_FIELDS)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductImage)
+def record_catalog_change(sender, instance, signal, created=False, update_fields=None, **kwargs):
+    """
+    Registra el cambio para /api/products/changes/. Los productos incluyen
+    el nombre y el slug de su categoría y marca y sus imágenes: esos cambios
+    también registran los productos afectados (de una marca o categoría,
+    solo si cambió EMBEDDED_FIELDS).
+    """
+    deleted = signal is post_delete
+    if sender is Product:
+        if update_fields is not None and set(update_fields) <= {'search_text'}:
+            return  # search_text no forma parte de la API
+        record_changes('product', [instance.pk], deleted)
+    elif sender is ProductImage:
+        record_changes('image', [instance.pk], deleted)
+        record_changes('product', [instance.product_id])
+    elif sender is Category:
+        record_changes('category', [instance.pk], deleted)
+        if not deleted and getattr(instance, '_embedded_changed', not created):
+            record_changes('product', instance.products.values_list('pk', flat=True))
+    else:
+        record_changes('brand', [instance.pk], deleted)
+        if deleted:
+            product_ids = getattr(instance, '_search_product_ids', [])
+        elif getattr(instance, '_embedded_changed', not created):
+            product_ids = instance.products.values_list('pk', flat=True)
+        else:
+            product_ids = []
+        record_changes('product', product_ids)
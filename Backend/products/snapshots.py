@@ -0,0 +1,324 @@
+"""
+Snapshots estáticos del catálogo en JSON (CDN / generación estática del frontend).
+
+Incluye:
+- CatalogSnapshot: Escribe y actualiza los archivos del snapshot
+- SnapshotError: Una ruta de la API no respondió 200 al renderizarla
+
+Estructura de CATALOG_SNAPSHOT_DIR (audiencia: all, student, professional, general):
+
+    categories/{audiencia}/{n}.json         /api/categories/?audience=...&page=n
+    brands/{audiencia}/{n}.json             /api/brands/?audience=...&page=n
+    category/{slug}/{audiencia}/{n}.json    /api/products/?category=...&audience=...&page=n
+    brand/{slug}/{n}.json                   /api/products/?brand=...&page=n
+    product/{id}.json                       /api/products/{id}/
+    manifest.json                           ruta de la API, hash y productos de cada archivo
+
+Cada archivo se genera pidiendo la ruta a las vistas de este proceso (como
+warm_caches), así que es idéntico a la respuesta de la API. Las peticiones
+llevan BYPASS_CACHE_META y no pasan por la caché de respuestas: con la caché
+por proceso, un cambio hecho en otro proceso (un worker web) no invalidó lo
+cacheado aquí, y tampoco hace falta invalidar la caché de todos. Se escribe
+en un temporal y se renombra: quien sirve el directorio nunca ve un archivo a
+medias. Un archivo cuyo contenido no cambió no se reescribe.
+
+El manifest guarda qué productos contiene cada página: al cambiar un producto
+se regeneran solo su detalle, las páginas de su categoría y marca (las de
+antes y las de ahora) y los listados; si solo cambió su stock o sus
+imágenes, solo las páginas que ya lo contenían.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.db.models import Q
+from django.test import Client
+from django.utils import timezone
+
+from .cache import BYPASS_CACHE_META
+from .models import AUDIENCE_CHOICES, Brand, Category, Product
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo el bloqueo entre hilos
+    fcntl = None
+
+
+AUDIENCES = ['all'] + [code.lower() for code, _ in AUDIENCE_CHOICES]
+MANIFEST = 'manifest.json'
+LISTS_GROUP = 'lists'
+
+_lock = threading.Lock()
+
+
+class SnapshotError(RuntimeError):
+    """Una ruta de la API no respondió 200 al generar el snapshot."""
+
+
+def _add_param(url, name, value):
+    return f"{url}{'&' if '?' in url else '?'}{name}={value}"
+
+
+def _with_audience(url, audience):
+    return url if audience == 'all' else _add_param(url, 'audience', audience.upper())
+
+
+def _product_ids(data):
+    """Ids de producto de una respuesta (detalle o página de listado)."""
+    if 'results' in data:
+        return [item['id'] for item in data['results']]
+    return [data['id']]
+
+
+def _write_atomic(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(handle, 'wb') as tmp:
+            tmp.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class CatalogSnapshot:
+    """
+    Snapshot del catálogo en `root`. Usar como context manager: toma el
+    bloqueo del directorio y guarda el manifest al salir.
+
+        with CatalogSnapshot() as snapshot:
+            snapshot.build()                      # todo el catálogo
+            snapshot.update(products=[3, 7])      # solo lo afectado
+    """
+
+    def __init__(self, root=None, base_url=None):
+        self.root = Path(root or settings.CATALOG_SNAPSHOT_DIR)
+        url = urlparse(base_url or settings.CATALOG_SNAPSHOT_BASE_URL)
+        self.client = Client(HTTP_HOST=url.netloc, **{BYPASS_CACHE_META: True})
+        self.secure = url.scheme == 'https'
+        self.files = {}
+        self.stats = {'written': 0, 'unchanged': 0, 'deleted': 0}
+        self._lock_file = None
+
+    def __enter__(self):
+        _lock.acquire()
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            if fcntl is not None:
+                # Otro proceso (otro worker) puede estar actualizando el manifest
+                self._lock_file = open(self.root / '.lock', 'w')
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self.files = self._load_manifest()
+        except BaseException:
+            self._release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        try:
+            self._save_manifest()
+        finally:
+            self._release()
+
+    def _release(self):
+        if self._lock_file is not None:
+            self._lock_file.close()  # libera el flock
+            self._lock_file = None
+        _lock.release()
+
+    def _load_manifest(self):
+        try:
+            with open(self.root / MANIFEST, encoding='utf-8') as manifest:
+                return json.load(manifest)['files']
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def _save_manifest(self):
+        manifest = {'generated_at': timezone.now().isoformat(), 'files': self.files}
+        _write_atomic(self.root / MANIFEST, json.dumps(manifest, indent=1, sort_keys=True).encode())
+
+    # -------------------------------------------------------------------------
+    # Archivos
+    # -------------------------------------------------------------------------
+
+    def _render(self, name, url, group):
+        """Escribe `name` con la respuesta de `url`; retorna los datos decodificados."""
+        response = self.client.get(url, secure=self.secure)
+        if response.status_code != 200:
+            raise SnapshotError(f'{url}: HTTP {response.status_code}')
+        content = response.content
+        data = json.loads(content)
+        digest = hashlib.sha256(content).hexdigest()
+
+        path = self.root / name
+        previous = self.files.get(name)
+        if previous is None or previous['sha256'] != digest or not path.exists():
+            _write_atomic(path, content)
+            self.stats['written'] += 1
+        else:
+            self.stats['unchanged'] += 1
+        products = [] if group == LISTS_GROUP else _product_ids(data)
+        self.files[name] = {'url': url, 'group': group, 'sha256': digest, 'products': products}
+        return data
+
+    def _delete(self, name):
+        self.files.pop(name, None)
+        path = self.root / name
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+        self.stats['deleted'] += 1
+        for parent in path.parents:  # carpetas que quedaron vacías
+            if parent == self.root:
+                break
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+
+    def _render_pages(self, prefix, url, group):
+        """Todas las páginas de un listado; retorna los archivos escritos."""
+        names, page = [], 1
+        while True:
+            name = f'{prefix}/{page}.json'
+            page_url = url if page == 1 else _add_param(url, 'page', page)
+            names.append(name)
+            if not self._render(name, page_url, group).get('next'):
+                return names
+            page += 1
+
+    def _replace_group(self, group, names):
+        """Borra los archivos de `group` que esta vez no se generaron (páginas sobrantes, slug viejo)."""
+        for name, entry in list(self.files.items()):
+            if entry['group'] == group and name not in names:
+                self._delete(name)
+
+    # -------------------------------------------------------------------------
+    # Grupos
+    # -------------------------------------------------------------------------
+
+    def render_lists(self):
+        names = set()
+        for audience in AUDIENCES:
+            for kind in ('categories', 'brands'):
+                url = _with_audience(f'/api/{kind}/', audience)
+                names.update(self._render_pages(f'{kind}/{audience}', url, LISTS_GROUP))
+        self._replace_group(LISTS_GROUP, names)
+
+    def render_category(self, category):
+        group, names = f'category:{category.pk}', set()
+        for audience in AUDIENCES:
+            url = _with_audience(f'/api/products/?category={category.slug}', audience)
+            names.update(self._render_pages(f'category/{category.slug}/{audience}', url, group))
+        self._replace_group(group, names)
+
+    def render_brand(self, brand):
+        group = f'brand:{brand.pk}'
+        names = self._render_pages(f'brand/{brand.slug}', f'/api/products/?brand={brand.slug}', group)
+        self._replace_group(group, set(names))
+
+    def render_product(self, product_id):
+        self._render(f'product/{product_id}.json', f'/api/products/{product_id}/', f'product:{product_id}')
+
+    def _delete_group(self, group):
+        self._replace_group(group, set())
+
+    # -------------------------------------------------------------------------
+    # Generación
+    # -------------------------------------------------------------------------
+
+    def build(self):
+        """Todo el catálogo; borra los archivos de lo que ya no existe."""
+        before = set(self.files)
+        self.render_lists()
+        for category in Category.objects.order_by('pk'):
+            self.render_category(category)
+        for brand in Brand.objects.order_by('pk'):
+            self.render_brand(brand)
+        product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+        for product_id in product_ids:
+            self.render_product(product_id)
+
+        current = {f'product:{pk}' for pk in product_ids}
+        current.update(f'category:{pk}' for pk in Category.objects.values_list('pk', flat=True))
+        current.update(f'brand:{pk}' for pk in Brand.objects.values_list('pk', flat=True))
+        current.add(LISTS_GROUP)
+        for name in before:
+            entry = self.files.get(name)
+            if entry is not None and entry['group'] not in current:
+                self._delete(name)
+        return self.stats
+
+    def update(self, products=(), categories=(), brands=(), in_place=()):
+        """
+        Regenera solo lo afectado por un cambio.
+
+        - products: altas, bajas o cambios que pueden mover el producto de
+          página (categoría, marca, audiencia, nombre, precio)
+        - categories / brands: altas, bajas o cambios de categorías y marcas
+        - in_place: productos que cambiaron sin moverse (stock, imágenes)
+        """
+        products, in_place = set(products), set(in_place) - set(products)
+        category_ids, brand_ids = set(categories), set(brands)
+
+        rows = Product.objects.filter(pk__in=products).values_list('pk', 'category_id', 'brand_id')
+        for _, category_id, brand_id in rows:
+            category_ids.add(category_id)
+            if brand_id:
+                brand_ids.add(brand_id)
+        # Las páginas que lo contenían: categoría o marca anterior, o borrado
+        for entry in self.files.values():
+            if products.intersection(entry['products']):
+                kind, _, pk = entry['group'].partition(':')
+                if kind == 'category':
+                    category_ids.add(int(pk))
+                elif kind == 'brand':
+                    brand_ids.add(int(pk))
+
+        # El nombre de la categoría o marca aparece en el detalle de sus productos
+        details = products | in_place
+        if categories or brands:
+            details.update(Product.objects.filter(
+                Q(category_id__in=categories) | Q(brand_id__in=brands)
+            ).values_list('pk', flat=True))
+
+        for category_id in category_ids:
+            category = Category.objects.filter(pk=category_id).first()
+            if category is None:
+                self._delete_group(f'category:{category_id}')
+            else:
+                self.render_category(category)
+        for brand_id in brand_ids:
+            brand = Brand.objects.filter(pk=brand_id).first()
+            if brand is None:
+                self._delete_group(f'brand:{brand_id}')
+            else:
+                self.render_brand(brand)
+
+        existing = set(Product.objects.filter(pk__in=details).values_list('pk', flat=True))
+        for product_id in details:
+            if product_id in existing:
+                self.render_product(product_id)
+            else:
+                self._delete_group(f'product:{product_id}')
+
+        if in_place:
+            # El stock no cambia el orden: basta reescribir las páginas donde ya estaba
+            regenerated = {f'category:{pk}' for pk in category_ids} | {f'brand:{pk}' for pk in brand_ids}
+            for name, entry in list(self.files.items()):
+                is_page = entry['group'].startswith(('category:', 'brand:'))
+                if is_page and entry['group'] not in regenerated and in_place.intersection(entry['products']):
+                    self._render(name, entry['url'], entry['group'])
+
+        if products or categories or brands:
+            self.render_lists()
+        return self.stats
+
@@ -0,0 +1,45 @@
+"""
+Stock de productos en vivo para las páginas de producto y el carrito.
+
+Incluye:
+- stock_channel: Canal de eventos del stock de un producto
+- stock_payload: {id, stock_count, in_stock, stock_status} de un producto
+- publish_stock_change: Publica el stock de un producto al hacer commit
+- parse_product_ids: ?ids=1,2,3 -> lista de ids (ValueError si no es válido)
+
+Cada venta (y cualquier cambio de stock en el admin) publica un evento en el
+canal del producto; solo lo reciben las conexiones que siguen ese producto.
+Miles de conexiones ociosas cuestan memoria, no consultas: ninguna vuelve a
+leer la BD después de su estado inicial.
+"""
+from django.conf import settings
+
+from live.broadcast import has_subscribers, publish_on_commit
+
+
+def stock_channel(product_id):
+    return f'products.stock.{product_id}'
+
+
+def stock_payload(product):
+    return {
+        'id': product.pk,
+        'stock_count': product.stock_count,
+        'in_stock': product.in_stock,
+        'stock_status': product.stock_status,
+    }
+
+
+def publish_stock_change(product):
+    """Sin conexiones que sigan el producto (y sin relay) no publica nada."""
+    channel = stock_channel(product.pk)
+    if has_subscribers(channel):
+        publish_on_commit(channel, 'stock', stock_payload(product), key=str(product.pk))
+
+
+def parse_product_ids(raw):
+    """Ids únicos en el orden pedido; ValueError si alguno no es un entero o son demasiados."""
+    ids = list(dict.fromkeys(int(value) for value in raw.split(',') if value.strip()))
+    if not ids or len(ids) > settings.LIVE_STOCK_MAX_PRODUCTS:
+        raise ValueError(raw)
+    return ids
@@ -0,0 +1,208 @@
+"""
+Índice en memoria para sugerencias de búsqueda mientras se escribe.
+
+Incluye:
+- SuggestIndex: Arreglo ordenado de claves de prefijo sobre productos, marcas y categorías
+- suggest_index: Instancia del proceso usada por /api/products/suggest/
+
+Cada nombre se indexa a partir de cada una de sus primeras palabras
+("resina filtek z350", "filtek z350", "z350"), así que "filt" encuentra el
+producto. Buscar un prefijo es una búsqueda binaria más un recorrido corto:
+no depende del tamaño del catálogo ni toca la base de datos.
+
+El índice se construye en la primera consulta. Los cambios hechos en este
+proceso se aplican incrementalmente desde products/signals.py; si otro
+proceso cambió el catálogo (versión de products/cache.py distinta) se
+reconstruye entero en la siguiente consulta.
+"""
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import CharField, Exists, OuterRef, Value
+
+from .cache import get_catalog_version
+from .models import Brand, Category, Product
+from .text import normalize_text
+
+
+KIND_CATEGORY = 'category'
+KIND_BRAND = 'brand'
+KIND_PRODUCT = 'product'
+
+# Orden en la respuesta a igualdad de coincidencia
+KIND_ORDER = {KIND_CATEGORY: 0, KIND_BRAND: 1, KIND_PRODUCT: 2}
+
+
+class SuggestIndex:
+    """
+    Índice de prefijos sobre arreglos ordenados (bisect).
+
+    `_keys` y `_refs` son listas paralelas ordenadas por clave; cada ref
+    apunta a una entrada `(kind, id, name, slug, audience, in_stock)`. La
+    memoria está acotada por SUGGEST_MAX_WORDS claves por nombre, de como
+    mucho SUGGEST_MAX_KEY_LENGTH caracteres cada una.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = []
+        self._refs = []
+        self._entries = {}
+        self._version = None
+
+    # -------------------------------------------------------------------------
+    # Consulta
+    # -------------------------------------------------------------------------
+
+    def search(self, query, limit=8, audience=None):
+        """
+        Hasta `limit` sugerencias para `query`. Primero las entradas cuyo
+        nombre empieza por el texto, luego las que lo contienen como palabra;
+        a igualdad, categorías, marcas y productos, y después por nombre.
+        """
+        prefix = normalize_text(query)[:settings.SUGGEST_MAX_KEY_LENGTH]
+        if not prefix:
+            return []
+        self._ensure_current()
+
+        audiences = None
+        if audience in ('STUDENT', 'PROFESSIONAL'):
+            audiences = {audience, 'GENERAL'}
+        elif audience == 'GENERAL':
+            audiences = {'GENERAL'}
+
+        # Las claves están en orden alfabético: se recorren solo las primeras
+        # coincidencias (acotado) y se reordenan por relevancia
+        candidates = {}
+        with self._lock:
+            keys, refs, entries = self._keys, self._refs, self._entries
+            position = bisect_left(keys, prefix)
+            while position < len(keys) and len(candidates) < limit * 4:
+                key = keys[position]
+                if not key.startswith(prefix):
+                    break
+                ref = refs[position]
+                entry = entries[ref]
+                if audiences is None or entry[4] in audiences:
+                    starts_name = key == entry[6]
+                    candidates[ref] = candidates.get(ref, False) or starts_name
+                position += 1
+            ranked = sorted(
+                candidates.items(),
+                key=lambda item: (not item[1], KIND_ORDER[item[0][0]], entries[item[0]][2].lower()),
+            )
+            return [self._as_dict(entries[ref]) for ref, _ in ranked[:limit]]
+
+    @staticmethod
+    def _as_dict(entry):
+        kind, pk, name, slug, audience, in_stock, _ = entry
+        return {
+            'type': kind,
+            'id': pk,
+            'name': name,
+            'slug': slug,
+            'audience': audience,
+            'in_stock': in_stock,
+        }
+
+    # -------------------------------------------------------------------------
+    # Construcción y actualización
+    # -------------------------------------------------------------------------
+
+    def _ensure_current(self):
+        version = get_catalog_version()
+        if version != self._version:
+            self.rebuild(version)
+
+    def rebuild(self, version=None):
+        """Reconstruye el índice completo (tres consultas con values_list)."""
+        if version is None:
+            version = get_catalog_version()
+        entries = {}
+        for kind, queryset in self._sources():
+            for pk, name, slug, audience, in_stock in queryset:
+                entries[(kind, pk)] = self._entry(kind, pk, name, slug, audience, in_stock)
+
+        pairs = sorted(
+            (key, ref) for ref, entry in entries.items() for key in self._entry_keys(entry)
+        )
+        with self._lock:
+            self._entries = entries
+            self._keys = [key for key, _ in pairs]
+            self._refs = [ref for _, ref in pairs]
+            self._version = version
+
+    def refresh(self, kind, pks):
+        """
+        Vuelve a leer las entradas indicadas (o las quita si ya no existen)
+        sin reconstruir el resto. Lo llaman las señales tras el commit.
+        """
+        if self._version is None:
+            return  # Aún no construido: se construirá en la primera consulta
+        sources = dict(self._sources())
+        rows = {row[0]: row for row in sources[kind].filter(pk__in=pks)}
+        with self._lock:
+            for pk in pks:
+                self._remove((kind, pk))
+                if pk in rows:
+                    self._insert(self._entry(kind, *rows[pk]))
+            # Se asume que la versión actual ya refleja este cambio
+            self._version = get_catalog_version()
+
+    def _insert(self, entry):
+        ref = (entry[0], entry[1])
+        self._entries[ref] = entry
+        for key in self._entry_keys(entry):
+            position = bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._refs.insert(position, ref)
+
+    def _remove(self, ref):
+        entry = self._entries.pop(ref, None)
+        if entry is None:
+            return
+        for key in self._entry_keys(entry):
+            position = bisect_left(self._keys, key)
+            while position < len(self._keys) and self._keys[position] == key:
+                if self._refs[position] == ref:
+                    del self._keys[position]
+                    del self._refs[position]
+                    break
+                position += 1
+
+    @staticmethod
+    def _entry(kind, pk, name, slug, audience, in_stock):
+        normalized = normalize_text(name)[:settings.SUGGEST_MAX_KEY_LENGTH]
+        return (kind, pk, name, slug, audience, in_stock, normalized)
+
+    @staticmethod
+    def _entry_keys(entry):
+        """Claves de la entrada: el nombre desde cada una de sus primeras palabras."""
+        normalized = entry[6]
+        words = normalized.split(' ')
+        keys = set()
+        start = 0
+        for word in words[:settings.SUGGEST_MAX_WORDS]:
+            if word:
+                keys.add(normalized[start:])
+            start += len(word) + 1
+        return keys
+
+    @staticmethod
+    def _sources():
+        in_stock = Product.objects.filter(in_stock=True)
+        return [
+            (KIND_PRODUCT, Product.objects.order_by().annotate(
+                no_slug=Value(None, output_field=CharField())
+            ).values_list('pk', 'name', 'no_slug', 'target_audience', 'in_stock')),
+            (KIND_BRAND, Brand.objects.order_by().annotate(
+                has_stock=Exists(in_stock.filter(brand=OuterRef('pk')))
+            ).values_list('pk', 'name', 'slug', 'target_audience', 'has_stock')),
+            (KIND_CATEGORY, Category.objects.order_by().annotate(
+                has_stock=Exists(in_stock.filter(category=OuterRef('pk')))
+            ).values_list('pk', 'name', 'slug', 'target_audience', 'has_stock')),
+        ]
+
+
+suggest_index = SuggestIndex()
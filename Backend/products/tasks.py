@@ -0,0 +1,50 @@
+"""
+Tareas en segundo plano del catálogo (ver jobs/queue.py).
+
+Incluye:
+- refresh_products_search_text: search_text y trigramas tras renombrar una marca o categoría
+- rebuild_related_products_task: Recalcula la tabla de productos relacionados
+- update_catalog_snapshots: Reescribe los archivos del snapshot estático afectados por un cambio
+- expire_stock_reservations: Borra las reservas de carrito vencidas
+"""
+from jobs.models import PRIORITY_LOW
+from jobs.queue import task
+
+from .models import Product
+from .related import rebuild_related_products
+from .reservations import expire_reservations
+from .search_index import refresh_search_text
+
+
+@task(queue='catalog')
+def refresh_products_search_text(product_ids=None, brand_id=None, category_id=None):
+    """Recalcula search_text de los productos indicados, o de los de una marca/categoría."""
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    elif brand_id is not None:
+        products = products.filter(brand_id=brand_id)
+    elif category_id is not None:
+        products = products.filter(category_id=category_id)
+    else:
+        return
+    refresh_search_text(products)
+
+
+@task(queue='catalog', priority=PRIORITY_LOW)
+def rebuild_related_products_task(limit=None):
+    rebuild_related_products(limit)
+
+
+@task(queue='catalog', priority=PRIORITY_LOW)
+def update_catalog_snapshots(products=(), categories=(), brands=(), in_place=()):
+    # Import local: snapshots importa django.test, innecesario al arrancar
+    from .snapshots import CatalogSnapshot
+
+    with CatalogSnapshot() as snapshot:
+        snapshot.update(products, categories, brands, in_place)
+
+
+@task(queue='catalog', priority=PRIORITY_LOW)
+def expire_stock_reservations():
+    expire_reservations()
@@ -1,3 +1,1256 @@
-from django.test import TestCase
+"""
+Tests del catálogo de productos.
+
+Incluye:
+- Presupuestos de consultas por endpoint de products.urls
+- Presupuesto de los listados del admin (productos, marcas, categorías)
+- Tests del detector de N+1
+- Renderer orjson y compresión de respuestas JSON
+- Sparse fieldsets (?fields=) y expansión (?expand=)
+- Listado rápido sin serializador (?fast=true)
+- Búsqueda por lote (/api/products/batch/) y caché con ETag
+- Precio efectivo almacenado (current_price / discount_percentage)
+- Sugerencias de búsqueda desde el índice en memoria
+- Búsqueda difusa (?search=) sin tildes y tolerante a errores
+- Productos relacionados precalculados
+- Precalentamiento del catálogo tras un deploy (warm_caches)
+- Arranque sin DRF ni admin hasta que se necesitan (profile_startup)
+- Configuración de gunicorn derivada del entorno (gunicorn.conf.py)
+- Límites por cliente del catálogo (token bucket, 429 con Retry-After)
+- Stock en vivo por SSE (/api/products/stock/stream/)
+- Snapshots estáticos del catálogo (build_catalog_snapshots) e incrementales
+- Sincronización incremental con token (/api/products/changes/)
+- Datos iniciales de la tienda en una respuesta (/api/storefront/bootstrap/)
+- Reservas de stock del carrito con vencimiento (/api/cart/<id>/reservations/)
+"""
+import gzip
+import json
+import os
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from dental_api.middleware import brotli
+from dental_api.queries import QueryInspector, sql_shape
+from dental_api.renderers import ORJSONRenderer
+from dental_api.startup import parse_importtime
+from dental_api.throttling import LocalBuckets, get_buckets, parse_rate
+from dental_api.testing import QueryBudgetMixin, build_catalog, parse_events, route_names
+from products import urls as product_urls
+from products.cache import bump_catalog_version, get_catalog_version
+from finance.models import Sale
+from jobs.queue import work_off
+from products.models import Brand, Category, Product, ProductImage, ProductTrigram, RelatedProduct, StockReservation
+from products.related import rebuild_related_products
+from products.reservations import SWEEP_KEY
+from products.snapshots import CatalogSnapshot
+from products.text import normalize_text
+from products.warmup import catalog_paths, paths_from_access_log
+
+
+# Presupuesto de consultas por ruta de products.urls. Toda ruta nueva debe
+# declarar aquí su presupuesto (test_every_route_has_budget).
+QUERY_BUDGETS = {
+    'api-root': 0,
+    'category-list': 2,     # COUNT de paginación + página con conteo anotado
+    'category-detail': 1,
+    'brand-list': 2,
+    'brand-detail': 1,
+    'product-list': 3,      # COUNT + página (select_related) + prefetch de imágenes
+    'product-detail': 2,    # producto (select_related) + prefetch de imágenes
+    'product-batch': 2,     # productos por id + prefetch de imágenes
+    'product-suggest': 3,   # construcción del índice (productos, marcas, categorías)
+    'product-related': 2,   # vecinos por rank (un JOIN indexado) + prefetch de imágenes
+    'product-stock-stream': 1,  # stock inicial; después ninguna (eventos en memoria)
+    'product-changes': 6,   # cambios + productos (con imágenes) + categorías + marcas + imágenes
+    'storefront-bootstrap': 7,  # categorías, marcas, COUNT, página, destacados, descuentos, imágenes
+    'cart-reservations': 1,     # reservas del carrito con disponible (subconsultas en una consulta)
+    'cart-reservation': 1,
+}
+
+# Presupuesto de los listados del admin (incluye sesión y usuario)
+ADMIN_QUERY_BUDGETS = {
+    'admin:products_product_changelist': 6,
+    'admin:products_brand_changelist': 5,
+    'admin:products_category_changelist': 5,
+}
+
+
+class ProductQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Cada endpoint del catálogo respeta su presupuesto con datos realistas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = build_catalog()
+        rebuild_related_products()
+
+    def _url(self, name):
+        if name == 'api-root':
+            return '/api/'
+        kwargs = {
+            'category-detail': {'slug': self.catalog['categories'][0].slug},
+            'brand-detail': {'slug': self.catalog['brands'][0].slug},
+            'product-detail': {'pk': self.catalog['products'][0].pk},
+            'product-related': {'pk': self.catalog['products'][0].pk},
+            'cart-reservations': {'cart_id': 'budget-cart'},
+            'cart-reservation': {'cart_id': 'budget-cart', 'product_id': self.catalog['products'][0].pk},
+        }.get(name, {})
+        if name == 'product-suggest':
+            return f"{reverse(name)}?q=prod"
+        if name in ('product-batch', 'product-stock-stream'):
+            ids = ','.join(str(product.pk) for product in self.catalog['products'][:20])
+            return f"{reverse(name)}?ids={ids}"
+        return reverse(name, kwargs=kwargs)
+
+    def test_every_route_has_budget(self):
+        self.assertEqual(route_names(product_urls.urlpatterns), set(QUERY_BUDGETS))
+
+    def test_routes_within_budget(self):
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(route=name):
+                with self.assertQueryBudget(budget, label=name):
+                    response = self.client.get(self._url(name))
+                response.close()  # libera la suscripción de las rutas SSE
+                self.assertEqual(response.status_code, 200)
+
+    def test_filtered_product_list_within_budget(self):
+        category = self.catalog['categories'][0]
+        with self.assertQueryBudget(QUERY_BUDGETS['product-list'], label='product-list filtrado'):
+            response = self.client.get(
+                '/api/products/',
+                {'category': category.slug, 'audience': 'student', 'search': 'Producto'},
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_gallery_fallback_uses_prefetch(self):
+        product = self.catalog['products'][0]  # sin imagen principal, solo galería
+        response = self.client.get(reverse('product-detail', kwargs={'pk': product.pk}))
+        self.assertIn('/media/products/gallery/', response.data['image'])
+
+
+class ProductAdminQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Los listados del admin no crecen en consultas con el número de filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        build_catalog(sales=0, expenses=0)
+        cls.admin_user = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'admin123'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def test_changelists_within_budget(self):
+        for name, budget in ADMIN_QUERY_BUDGETS.items():
+            with self.subTest(changelist=name):
+                with self.assertQueryBudget(budget, label=name):
+                    response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+
+
+class QueryInspectorTests(TestCase):
+    """El detector agrupa consultas por forma y marca las repeticiones."""
+
+    def test_sql_shape_collapses_in_clause(self):
+        self.assertEqual(
+            sql_shape('SELECT * FROM t\n  WHERE id IN (%s, %s, %s)'),
+            sql_shape('SELECT * FROM t WHERE id IN (%s)'),
+        )
+
+    def test_detects_repeated_queries(self):
+        build_catalog(products=8, sales=0, expenses=0)
+        with QueryInspector() as inspector:
+            for product in Product.objects.all():
+                product.images.count()
+        self.assertEqual(inspector.count, 9)
+        self.assertEqual(list(inspector.repeated().values()), [8])
+
+
+class ORJSONRendererTests(TestCase):
+    """ORJSONRenderer produce exactamente los mismos bytes que JSONRenderer."""
+
+    def assertSameOutput(self, data):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_native_types(self):
+        self.assertSameOutput({
+            'price': Decimal('12.50'),
+            'created_at': datetime(2026, 1, 30, 13, 1, 5, 123456, tzinfo=dt_timezone.utc),
+            'date': datetime(2026, 1, 30).date(),
+            1: 'clave numérica',
+            'text': 'Resina ñandú \u2028 línea',
+            'nested': [None, True, 1.5, {'a': []}],
+        })
+
+    def test_product_list_payload(self):
+        build_catalog(products=15, sales=0, expenses=0)
+        response = self.client.get('/api/products/')
+        self.assertSameOutput(response.data)
+
+    def test_indent_falls_back_to_json(self):
+        data = {'a': 1}
+        self.assertEqual(
+            ORJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(TestCase):
+    """Las respuestas JSON grandes se comprimen según Accept-Encoding."""
+
+    @classmethod
+    def setUpTestData(cls):
+        build_catalog(products=15, sales=0, expenses=0)
+
+    def test_gzip(self):
+        plain = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='identity')
+        response = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+
+    @skipIf(brotli is None, "brotli no instalado")
+    def test_brotli_preferred(self):
+        plain = self.client.get('/api/products/')
+        response = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+
+    def test_quality_values_respected(self):
+        response = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_small_responses_not_compressed(self):
+        response = self.client.get('/api/brands/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertLess(len(response.content), 1024)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class SparseFieldsetTests(QueryBudgetMixin, TestCase):
+    """?fields= recorta la respuesta y también las columnas/joins del SQL."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = build_catalog(products=15, sales=0, expenses=0)
+
+    def test_product_fields_drive_sql(self):
+        with self.assertQueryBudget(2, label='product-list ?fields') as inspector:
+            response = self.client.get('/api/products/', {'fields': 'id,name,current_price'})
+        item = response.data['results'][0]
+        self.assertEqual(set(item), {'id', 'name', 'current_price'})
+        page_sql = inspector.queries[-1]
+        self.assertNotIn('"description"', page_sql)
+        self.assertNotIn('JOIN', page_sql)
+
+    def test_card_fields_keep_image_fallback(self):
+        product = self.catalog['products'][0]  # sin imagen principal
+        with self.assertQueryBudget(2, label='product-detail ?fields=image'):
+            response = self.client.get(
+                reverse('product-detail', kwargs={'pk': product.pk}),
+                {'fields': 'name,image,brand_name'},
+            )
+        self.assertEqual(set(response.data), {'name', 'image', 'brand_name'})
+        self.assertIn('/media/products/gallery/', response.data['image'])
+
+    def test_expand_category_and_brand(self):
+        product = self.catalog['products'][1]
+        response = self.client.get(
+            reverse('product-detail', kwargs={'pk': product.pk}),
+            {'fields': 'id,name', 'expand': 'category,brand'},
+        )
+        self.assertEqual(set(response.data), {'id', 'name', 'category', 'brand'})
+        self.assertEqual(response.data['category']['slug'], product.category.slug)
+        self.assertEqual(response.data['brand']['name'], product.brand.name)
+
+    def test_default_output_unchanged(self):
+        response = self.client.get('/api/products/', {'expand': 'unknown'})
+        self.assertIn('description', response.data['results'][0])
+        self.assertIsInstance(response.data['results'][0]['category'], int)
+
+    def test_category_without_count_skips_join(self):
+        with QueryInspector() as inspector:
+            response = self.client.get('/api/categories/', {'fields': 'id,slug'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'slug'})
+        self.assertNotIn('JOIN', inspector.queries[-1])
+        self.assertEqual(
+            [item['slug'] for item in response.data['results']],
+            sorted(item['slug'] for item in response.data['results']),
+        )
+
+
+def _without_fast_param(content):
+    """Los enlaces next/previous conservan ?fast=true; el resto debe ser idéntico."""
+    return content.replace(b'fast=true&', b'').replace(b'&fast=true', b'')
+
+
+class FastListTests(QueryBudgetMixin, TestCase):
+    """?fast=true devuelve exactamente los mismos bytes que el serializador."""
+
+    @classmethod
+    def setUpTestData(cls):
+        catalog = build_catalog(products=40, sales=0, expenses=0)
+        # Casos límite: descuento cuyo porcentaje es entero exacto (10.10 -> 7.07 = 30%),
+        # sin marca, sin stock, nombres de archivo con espacios y acentos
+        edge = Product.objects.create(
+            name="Resina ñ", description="Borde", price='10.10', discount_price='7.07',
+            category=catalog['categories'][0], stock_count=0,
+            image="products/foto con espacio ñ.jpg",
+        )
+        ProductImage.objects.create(product=edge, image="products/gallery/galería 1.png", order=1)
+
+    def assertSameAsSerializer(self, params):
+        expected = self.client.get('/api/products/', params)
+        with self.assertQueryBudget(3, label='product-list ?fast'):
+            fast = self.client.get('/api/products/', {**params, 'fast': 'true'})
+        self.assertEqual(_without_fast_param(fast.content), expected.content)
+
+    def test_large_page(self):
+        self.assertSameAsSerializer({'page_size': 100})
+
+    def test_filters_and_ordering(self):
+        self.assertSameAsSerializer({'page_size': 10, 'page': 2, 'ordering': '-price', 'in_stock': 'true'})
+        self.assertSameAsSerializer({'search': 'Resina', 'audience': 'general'})
+
+    def test_page_size_is_capped(self):
+        response = self.client.get('/api/products/', {'page_size': 10000, 'fast': 'true'})
+        self.assertEqual(len(response.data['results']), 41)
+        self.assertEqual(response.data['count'], 41)
+
+
+class ProductBatchTests(QueryBudgetMixin, TestCase):
+    """/api/products/batch/ devuelve varios productos en el orden pedido."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = build_catalog(products=15, sales=0, expenses=0)['products']
+
+    def test_preserves_order_and_skips_missing(self):
+        wanted = [self.products[5].pk, self.products[1].pk, 999999, self.products[5].pk, self.products[9].pk]
+        with self.assertQueryBudget(2, label='product-batch'):
+            response = self.client.get('/api/products/batch/', {'ids': ','.join(map(str, wanted))})
+        self.assertEqual(
+            [item['id'] for item in response.data],
+            [self.products[5].pk, self.products[1].pk, self.products[9].pk],
+        )
+        detail = self.client.get(reverse('product-detail', kwargs={'pk': self.products[1].pk}))
+        self.assertEqual(response.data[1], detail.data)
+
+    def test_supports_sparse_fields(self):
+        response = self.client.get('/api/products/batch/', {'ids': self.products[2].pk, 'fields': 'id,name'})
+        self.assertEqual(response.data, [{'id': self.products[2].pk, 'name': self.products[2].name}])
+
+    def test_hard_cap_and_validation(self):
+        too_many = ','.join(str(n) for n in range(1, 52))
+        self.assertEqual(self.client.get('/api/products/batch/', {'ids': too_many}).status_code, 400)
+        self.assertEqual(self.client.get('/api/products/batch/', {'ids': '1,a'}).status_code, 400)
+
+
+class CatalogCacheTests(QueryBudgetMixin, TestCase):
+    """Las respuestas del catálogo se cachean por versión y llevan ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = build_catalog(products=15, sales=0, expenses=0)['products']
+
+    def test_cached_until_catalog_changes(self):
+        first = self.client.get('/api/products/')
+        with self.assertQueryBudget(0, label='product-list cacheado'):
+            second = self.client.get('/api/products/')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+        product = self.products[-1]  # el más reciente: primera página
+        product.name = "Nombre nuevo"
+        product.save()
+        third = self.client.get('/api/products/')
+        self.assertNotEqual(first['ETag'], third['ETag'])
+        self.assertIn(b'Nombre nuevo', third.content)
+
+    def test_if_none_match_returns_304_without_queries(self):
+        url = f"/api/products/batch/?ids={self.products[0].pk},{self.products[1].pk}"
+        etag = self.client.get(url)['ETag']
+        with self.assertQueryBudget(0, label='product-batch 304'):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(self.client.get('/api/products/999999/').status_code, 404)
+        self.assertFalse(self.client.get('/api/products/999999/').has_header('ETag'))
+
+
+class EffectivePriceTests(QueryBudgetMixin, TestCase):
+    """Filtros y orden por el precio con descuento (columna generada)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        catalog = build_catalog(products=3, images_per_product=0, sales=0, expenses=0)
+        cls.cheap, cls.discounted, cls.regular = catalog['products']
+        # 30.00 con oferta a 12.00 (60 %): precio real por debajo de 15
+        Product.objects.filter(pk=cls.discounted.pk).update(
+            price=Decimal('30.00'), discount_price=Decimal('12.00')
+        )
+        Product.objects.filter(pk=cls.regular.pk).update(price=Decimal('20.00'), discount_price=None)
+        Product.objects.filter(pk=cls.cheap.pk).update(price=Decimal('10.00'), discount_price=None)
+
+    def ids(self, params):
+        response = self.client.get('/api/products/', params)
+        return [item['id'] for item in response.data['results']]
+
+    def test_bulk_update_keeps_columns(self):
+        product = Product.objects.get(pk=self.discounted.pk)
+        self.assertEqual(product.current_price, Decimal('12.00'))
+        self.assertEqual(product.discount_percentage, 60)
+
+    def test_price_range_uses_current_price(self):
+        self.assertEqual(
+            set(self.ids({'min_price': 11, 'max_price': 15})), {self.discounted.pk}
+        )
+        self.assertNotIn(self.discounted.pk, self.ids({'min_price': 25}))
+        self.assertEqual(self.ids({'min_discount': 50}), [self.discounted.pk])
+
+    def test_ordering_by_current_price(self):
+        self.assertEqual(
+            self.ids({'ordering': 'current_price'}),
+            [self.cheap.pk, self.discounted.pk, self.regular.pk],
+        )
+
+    def test_save_refreshes_generated_columns(self):
+        product = Product.objects.get(pk=self.discounted.pk)
+        product.discount_price = None
+        product.save()
+        self.assertEqual(product.current_price, Decimal('30.00'))
+        self.assertEqual(product.discount_percentage, 0)
+
+    def test_margin_of_unsaved_product(self):
+        # Formulario de alta del admin con errores: todavía no hay fila
+        product = Product(
+            name="Nuevo", price=Decimal('30.00'), discount_price=Decimal('25.00'),
+            cost_price=Decimal('20.00'),
+        )
+        self.assertEqual(product.profit_margin, Decimal('5.00'))
+        self.assertEqual(product.profit_margin_percentage, 25)
+        product.discount_price = None
+        self.assertEqual(product.profit_margin, Decimal('10.00'))
+
+
+class SuggestTests(QueryBudgetMixin, TestCase):
+    """/api/products/suggest/ responde desde el índice en memoria."""
+
+    @classmethod
+    def setUpTestData(cls):
+        catalog = build_catalog(products=12, images_per_product=0, sales=0, expenses=0)
+        cls.brand = catalog['brands'][1]
+        cls.resin = Product.objects.create(
+            name="Resina Filtek Z350 XT", description="-", price=Decimal('45.00'),
+            category=catalog['categories'][0], brand=cls.brand,
+            target_audience='PROFESSIONAL', stock_count=0,
+        )
+
+    def suggest(self, q, **params):
+        return self.client.get('/api/products/suggest/', {'q': q, **params}).data
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text("  RESÍNA  3M-ESPE! "), "resina 3m espe")
+
+    def test_accent_case_and_word_prefix(self):
+        for q in ("resína", "RES", "filt", "z350 x"):
+            with self.subTest(q=q):
+                self.assertEqual(
+                    self.suggest(q),
+                    [{
+                        'type': 'product', 'id': self.resin.pk, 'name': self.resin.name,
+                        'slug': None, 'audience': 'PROFESSIONAL', 'in_stock': False,
+                    }],
+                )
+        self.assertEqual(self.suggest("esina"), [])
+
+    def test_ranking_limit_and_audience(self):
+        results = self.suggest("marca", limit=3)
+        self.assertEqual([item['type'] for item in results], ['brand'] * 3)
+        self.assertEqual(results[0]['name'], "Marca 0")
+        self.assertTrue(all(
+            item['audience'] in ('STUDENT', 'GENERAL')
+            for item in self.suggest("producto", audience='student', limit=20)
+        ))
+
+    def test_warm_index_needs_no_queries(self):
+        self.suggest("prod")
+        with self.assertQueryBudget(0, label='product-suggest en caliente'):
+            self.suggest("producto 1")
+
+    def test_incremental_refresh_after_commit(self):
+        self.suggest("res")
+        old_name = self.brand.name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.name = "Hu-Friedy"
+            self.brand.save()
+        # La señal ya actualizó el índice: no hace falta reconstruirlo
+        with self.assertQueryBudget(0, label='product-suggest tras cambio'):
+            results = self.suggest("hu fried")
+        self.assertEqual([item['id'] for item in results], [self.brand.pk])
+        self.assertEqual(self.suggest(old_name), [])
+
+    def test_other_process_changes_trigger_rebuild(self):
+        self.suggest("res")
+        Brand.objects.filter(pk=self.brand.pk).update(name="Ivoclar")
+        bump_catalog_version()
+        self.assertEqual([item['id'] for item in self.suggest("ivo")], [self.brand.pk])
+
+
+class FuzzySearchTests(QueryBudgetMixin, TestCase):
+    """?search= encuentra productos con tildes, mayúsculas y errores de tipeo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        catalog = build_catalog(products=20, images_per_product=0, sales=0, expenses=0)
+        category = catalog['categories'][0]
+        cls.brand = Brand.objects.create(name="Hu-Friedy")
+        cls.resin = Product.objects.create(
+            name="Resina Fluida A2", description="-", price=Decimal('20.00'),
+            category=category, stock_count=5,
+        )
+        cls.kit = Product.objects.create(
+            name="Kit de curetas", description="Instrumental", price=Decimal('80.00'),
+            category=category, brand=cls.brand, stock_count=5,
+        )
+
+    def ids(self, search, **params):
+        response = self.client.get('/api/products/', {'search': search, **params})
+        return [item['id'] for item in response.data['results']]
+
+    def test_accents_case_and_typos(self):
+        for search in ("resina", "RESÍNA", "resinna fluida"):
+            with self.subTest(search=search):
+                self.assertEqual(self.ids(search), [self.resin.pk])
+        self.assertEqual(self.ids("Hu Friedi"), [self.kit.pk])
+        self.assertEqual(self.ids("zzzz"), [])
+
+    def test_description_is_searched(self):
+        self.assertEqual(self.ids("instrumentl"), [self.kit.pk])
+        self.kit.description = "Acero quirúrgico"
+        self.kit.save(update_fields=['description'])
+        self.assertEqual(self.ids("quirurgico"), [self.kit.pk])
+        self.assertEqual(self.ids("instrumental"), [])
+
+    def test_ranked_by_similarity_unless_ordering_given(self):
+        self.assertEqual(self.ids("producto 11")[0], Product.objects.get(name="Producto 11").pk)
+        by_price = self.client.get('/api/products/', {'search': 'producto', 'ordering': '-current_price'})
+        prices = [Decimal(item['current_price']) for item in by_price.data['results']]
+        self.assertEqual(prices, sorted(prices, reverse=True))
+
+    def test_renaming_brand_reindexes_products(self):
+        # El reindexado se encola al hacer commit y lo ejecuta el worker
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.name = "Ivoclar"
+            self.brand.save()
+        self.assertEqual(self.ids("ivoclar"), [])
+        self.assertEqual(work_off(), 1)
+        self.assertEqual(self.ids("ivoclar"), [self.kit.pk])
+        self.assertEqual(self.ids("friedy"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.delete()
+        work_off()
+        self.assertFalse(ProductTrigram.objects.filter(product=self.kit, trigram='ivo').exists())
+
+    def test_brand_edit_without_rename_skips_reindex(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.target_audience = "STUDENT"
+            self.brand.save()
+        self.assertEqual(work_off(), 0)
+
+    def test_search_stays_within_list_budget(self):
+        with self.assertQueryBudget(QUERY_BUDGETS['product-list'], label='product-list ?search'):
+            self.client.get('/api/products/', {'search': 'resina'})
+
+    @override_settings(FUZZY_SEARCH_ENABLED=False)
+    def test_plain_search_when_disabled(self):
+        self.assertEqual(self.ids("Instrumental"), [self.kit.pk])
+        self.assertEqual(self.ids("resinna"), [])
+
+
+class RelatedProductsTests(QueryBudgetMixin, TestCase):
+    """/api/products/{id}/related/ lee la tabla precalculada de vecinos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        catalog = build_catalog(products=30, images_per_product=1, sales=0, expenses=0)
+        cls.categories, cls.brands = catalog['categories'], catalog['brands']
+
+        def product(name, category, brand=None, price='20.00', audience='GENERAL'):
+            return Product.objects.create(
+                name=name, description="-", price=Decimal(price), category=category,
+                brand=brand, target_audience=audience, stock_count=50,
+            )
+
+        cls.resin = product("Resina A2", cls.categories[0], cls.brands[0])
+        cls.sibling = product("Resina A3", cls.categories[0], cls.brands[0], price='21.00')
+        cls.far = product("Resina importada", cls.categories[0], price='400.00', audience='STUDENT')
+        cls.bonding = product("Adhesivo", cls.categories[5], price='35.00')
+        now = timezone.now()
+        for customer in ("Clínica Norte", "Dra. Pérez"):
+            for item in (cls.resin, cls.bonding):
+                Sale.objects.create(product=item, quantity=1, unit_price=item.price,
+                                    sale_date=now, customer_name=customer)
+        rebuild_related_products()
+
+    def related_ids(self, product, **params):
+        response = self.client.get(f'/api/products/{product.pk}/related/', params)
+        return [item['id'] for item in response.data]
+
+    def test_ranked_by_shared_attributes_and_co_purchases(self):
+        ids = self.related_ids(self.resin, limit=8)
+        self.assertEqual(ids[0], self.sibling.pk)      # categoría + marca + precio
+        self.assertIn(self.bonding.pk, ids[:3])        # comprados juntos
+        self.assertNotIn(self.resin.pk, ids)
+        if self.far.pk in ids:  # misma categoría, pero otro precio y audiencia
+            self.assertGreater(ids.index(self.far.pk), ids.index(self.sibling.pk))
+        scores = list(RelatedProduct.objects.filter(product=self.resin).values_list('score', flat=True))
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_limit_is_capped(self):
+        self.assertEqual(len(self.related_ids(self.resin)), 4)
+        self.assertEqual(len(self.related_ids(self.resin, limit=100)), 8)
+
+    def test_fallback_before_rebuild(self):
+        newcomer = Product.objects.create(
+            name="Nuevo", description="-", price=Decimal('10.00'),
+            category=self.categories[0], stock_count=3,
+        )
+        ids = self.related_ids(newcomer)
+        self.assertTrue(ids)
+        self.assertTrue(all(Product.objects.get(pk=pk).category_id == self.categories[0].pk for pk in ids))
+        self.assertEqual(self.client.get('/api/products/999999/related/').status_code, 404)
+        self.assertEqual(self.client.get('/api/products/abc/related/').status_code, 404)
+
+
+class WarmCachesTests(QueryBudgetMixin, TestCase):
+    """warm_caches deja en caché las rutas más comunes del catálogo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        catalog = build_catalog(products=40, images_per_product=1, sales=0, expenses=0)
+        cls.category, cls.brand = catalog['categories'][0], catalog['brands'][1]
+
+    def test_paths_follow_frontend_urls(self):
+        paths = catalog_paths(brand_pages=3)
+        self.assertIn('/api/products/', paths)
+        self.assertIn(f'/api/products/?category={self.category.slug}&audience=STUDENT', paths)
+        self.assertIn('/api/brands/?audience=PROFESSIONAL', paths)
+        # 40 productos, 3 de cada 4 con marca en 5 marcas: una sola página por marca
+        self.assertIn(f'/api/products/?brand={self.brand.slug}', paths)
+        self.assertNotIn(f'/api/products/?brand={self.brand.slug}&page=2', paths)
+        self.assertEqual(len(paths), len(set(paths)))
+
+    def test_paths_from_access_log(self):
+        log = [
+            '1.2.3.4 - - [01/Oct/2026:10:00:00 +0000] "GET /api/products/?category=resinas HTTP/1.1" 200 512 "-" "-"',
+            '1.2.3.4 - - [01/Oct/2026:10:00:01 +0000] "GET /api/products/ HTTP/1.1" 200 512 "-" "-"',
+            '1.2.3.4 - - [01/Oct/2026:10:00:02 +0000] "GET /api/products/ HTTP/1.1" 200 512 "-" "-"',
+            '1.2.3.4 - - [01/Oct/2026:10:00:03 +0000] "GET /api/products/999/ HTTP/1.1" 404 20 "-" "-"',
+            '1.2.3.4 - - [01/Oct/2026:10:00:04 +0000] "GET /admin/ HTTP/1.1" 200 900 "-" "-"',
+            '1.2.3.4 - - [01/Oct/2026:10:00:05 +0000] "POST /api/products/ HTTP/1.1" 200 10 "-" "-"',
+        ]
+        self.assertEqual(paths_from_access_log(log), ['/api/products/', '/api/products/?category=resinas'])
+
+    def test_command_fills_response_cache(self):
+        out = StringIO()
+        call_command('warm_caches', workers=1, stdout=out)
+        self.assertIn('Precalentamiento completo', out.getvalue())
+        self.assertIn('(0 con error)', out.getvalue())
+
+        url = f'/api/products/?category={self.category.slug}&audience=PROFESSIONAL'
+        with self.assertQueryBudget(0, label='ruta precalentada'):
+            response = self.client.get(url, HTTP_HOST=settings.WARMUP_HOST)
+        self.assertEqual(response.status_code, 200)
+
+
+class StartupTests(TestCase):
+    """django.setup() no carga DRF ni los admin.py; profile_startup los mide."""
+
+    def loaded_modules(self, code):
+        output = subprocess.run(
+            [sys.executable, '-c', 'import json, os, sys, django\n'
+             'os.environ.setdefault("DJANGO_SETTINGS_MODULE", "dental_api.settings")\n'
+             f'django.setup()\n{code}\n'
+             'print(json.dumps(sorted(sys.modules)))'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout
+        return set(json.loads(output.splitlines()[-1]))
+
+    def test_setup_is_lazy(self):
+        modules = self.loaded_modules('')
+        self.assertNotIn('rest_framework.serializers', modules)
+        self.assertNotIn('products.admin', modules)
+        self.assertIn('products.signals', modules)
+        self.assertIn('products.tasks', modules)  # tareas registradas para el worker
+
+    def test_admin_loaded_on_first_admin_url(self):
+        modules = self.loaded_modules(
+            'from django.urls import resolve\n'
+            'resolve("/api/products/")\n'
+            'assert "products.admin" not in sys.modules\n'
+            'resolve("/admin/products/product/")'
+        )
+        self.assertIn('products.admin', modules)
+
+    def test_parse_importtime(self):
+        rows = parse_importtime(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     products.text\n"
+            "import time:      2000 |       3500 |   products.signals\n"
+            "Traceback: otra salida\n"
+        )
+        self.assertEqual([(row.module, row.self_us, row.cumulative_us, row.depth) for row in rows],
+                         [('products.text', 120, 120, 2), ('products.signals', 2000, 3500, 1)])
+        self.assertEqual(rows[0].package, 'products')
+
+    def test_profile_startup_command(self):
+        out = StringIO()
+        call_command('profile_startup', target='setup', repeat=1, top=5, stdout=out)
+        self.assertIn('django.setup()', out.getvalue())
+        self.assertIn('products.signals', out.getvalue())
+
+
+class GunicornConfigTests(TestCase):
+    """gunicorn.conf.py deriva procesos, hilos y app del entorno y de las CPU."""
+
+    SHARED = {
+        'DJANGO_CACHE_BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'DJANGO_LIVE_RELAY': 'database',
+        'DJANGO_THROTTLE_CACHE': 'default',
+    }
+
+    def load(self, cpus=2, shared=True, **env):
+        env = {'GUNICORN_CPUS': str(cpus), **(self.SHARED if shared else {}), **env}
+        with mock.patch.dict(os.environ, env):
+            for name in self.SHARED.keys() - env.keys():
+                os.environ.pop(name, None)
+            return runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+
+    def test_single_process_without_shared_state(self):
+        self.assertEqual(self.load(cpus=4, shared=False)['workers'], 1)
+        self.assertEqual(self.load(cpus=4, shared=False, GUNICORN_WORKER_CLASS='sync')['workers'], 1)
+        local_cache = {**self.SHARED, 'DJANGO_CACHE_BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        self.assertEqual(self.load(cpus=4, shared=False, **local_cache)['workers'], 1)
+        self.assertEqual(self.load(cpus=4, shared=False, GUNICORN_WORKERS='3')['workers'], 3)
+
+    def test_defaults_from_cpu_count(self):
+        conf = self.load(cpus=2)
+        self.assertEqual((conf['worker_class'], conf['workers'], conf['threads']), ('gthread', 3, 4))
+        self.assertEqual(conf['wsgi_app'], 'dental_api.wsgi:application')
+        self.assertTrue(conf['preload_app'])
+        self.assertEqual((conf['max_requests'], conf['max_requests_jitter']), (1000, 100))
+
+        sync = self.load(cpus=2, GUNICORN_WORKER_CLASS='sync')
+        self.assertEqual((sync['worker_class'], sync['workers'], sync['threads']), ('sync', 5, 1))
+
+    def test_environment_overrides(self):
+        conf = self.load(GUNICORN_WORKERS='7', GUNICORN_THREADS='2', GUNICORN_PRELOAD='False',
+                         GUNICORN_KEEPALIVE='15', PORT='9000')
+        self.assertEqual((conf['workers'], conf['threads'], conf['keepalive']), (7, 2, 15))
+        self.assertFalse(conf['preload_app'])
+        self.assertEqual(conf['bind'], '0.0.0.0:9000')
+
+    def test_uvicorn_serves_asgi_app(self):
+        conf = self.load(GUNICORN_WORKER_CLASS='uvicorn')
+        self.assertIn('UvicornWorker', conf['worker_class'])
+        self.assertEqual(conf['wsgi_app'], 'dental_api.asgi:application')
+
+
+# Cliente externo: las IPs locales (el test client) están exentas de límites
+CLIENT_IP = {'REMOTE_ADDR': '203.0.113.7'}
+
+
+@override_settings(THROTTLE_RATES={'catalog': '3/min', 'search': '2/min', 'export': '1/min', 'finance_write': '2/min'})
+class ThrottleTests(QueryBudgetMixin, TestCase):
+    """Token bucket por cliente y scope, sin consultas a la BD al rechazar."""
+
+    @classmethod
+    def setUpTestData(cls):
+        build_catalog(products=5, sales=0, expenses=0)
+
+    def setUp(self):
+        get_buckets().clear()
+
+    def test_bucket_refills_continuously(self):
+        buckets = LocalBuckets(max_clients=10)
+        capacity, refill = parse_rate('2/s')
+        self.assertEqual((capacity, refill), (2, 2.0))
+        self.assertEqual([buckets.consume('a', capacity, refill, 100.0) for _ in range(3)], [0, 0, 0.5])
+        self.assertEqual(buckets.consume('a', capacity, refill, 100.5), 0)
+        self.assertEqual(buckets.consume('b', capacity, refill, 100.5), 0)
+
+    def test_least_recent_client_is_evicted(self):
+        buckets = LocalBuckets(max_clients=2)
+        for key in ('a', 'b', 'a', 'c'):
+            buckets.consume(key, 5, 1.0, 0.0)
+        self.assertEqual(list(buckets._buckets), ['a', 'c'])
+
+    def test_catalog_limit_returns_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/categories/', **CLIENT_IP).status_code, 200)
+        with self.assertQueryBudget(0, label='429'):
+            response = self.client.get('/api/brands/', **CLIENT_IP)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(response['Retry-After'], ('19', '20'))  # 3/min: un token cada 20 s
+        # Otro cliente y el propio servidor no comparten el bucket
+        self.assertEqual(self.client.get('/api/brands/', REMOTE_ADDR='203.0.113.8').status_code, 200)
+        self.assertEqual(self.client.get('/api/brands/').status_code, 200)
+
+    def test_search_and_export_scopes(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/products/?search=prod', **CLIENT_IP).status_code, 200)
+        self.assertEqual(self.client.get('/api/products/?search=prod', **CLIENT_IP).status_code, 429)
+
+        get_buckets().clear()
+        self.assertEqual(self.client.get('/api/products/?fast=true', **CLIENT_IP).status_code, 200)
+        self.assertEqual(self.client.get('/api/products/?page_size=500', **CLIENT_IP).status_code, 429)
+        self.assertEqual(self.client.get('/api/products/?page_size=50', **CLIENT_IP).status_code, 200)
+
+    def test_forwarded_for_does_not_exempt(self):
+        spoofed = {**CLIENT_IP, 'HTTP_X_FORWARDED_FOR': '127.0.0.1'}
+        statuses = [self.client.get('/api/products/?search=prod', **spoofed).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        # Un proxy local tampoco exime a sus clientes
+        proxied = {'REMOTE_ADDR': '127.0.0.1', 'HTTP_X_FORWARDED_FOR': '203.0.113.9'}
+        statuses = [self.client.get('/api/categories/', **proxied).status_code for _ in range(4)]
+        self.assertEqual(statuses[-1], 429)
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_can_be_disabled(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get('/api/categories/', **CLIENT_IP).status_code, 200)
+
+
+@override_settings(LIVE_HEARTBEAT=0.05, LIVE_STOCK_LINGER=0.01)
+class StockStreamTests(QueryBudgetMixin, TestCase):
+    """Stock en vivo por producto, sin consultas por conexión después del inicio."""
+
+    @classmethod
+    def setUpTestData(cls):
+        products = build_catalog(products=8, sales=0, expenses=0)['products']
+        cls.product, cls.other = [product for product in products if product.stock_count >= 6][:2]
+
+    def open_stream(self, *products):
+        ids = ','.join(str(product.pk) for product in products)
+        response = self.client.get(reverse('product-stock-stream'), {'ids': f'{ids},999999'})
+        self.addCleanup(response.close)
+        self.assertEqual(response.status_code, 200)
+        stream = iter(response.streaming_content)
+        return parse_events(next(stream)), stream
+
+    def sell(self, product, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            Sale.objects.create(product=product, quantity=quantity, unit_price=product.price,
+                                sale_date=timezone.now())
+
+    def test_initial_state_then_sales(self):
+        initial, stream = self.open_stream(self.product)
+        self.assertEqual(initial, [('stock', {
+            'id': self.product.pk, 'stock_count': self.product.stock_count,
+            'in_stock': True, 'stock_status': 'En Stock',
+        })])
+
+        self.sell(self.product, self.product.stock_count - 1)
+        self.sell(self.other, 1)  # otro producto: no llega a esta conexión
+        self.assertEqual(parse_events(next(stream)), [('stock', {
+            'id': self.product.pk, 'stock_count': 1, 'in_stock': True, 'stock_status': 'Poco Stock',
+        })])
+
+    def test_burst_is_coalesced(self):
+        _, stream = self.open_stream(self.product, self.other)
+        expected = [(self.product.pk, self.product.stock_count - 3), (self.other.pk, self.other.stock_count - 1)]
+        for _ in range(3):
+            self.sell(self.product, 1)
+        self.sell(self.other, 1)
+        events = parse_events(next(stream))
+        self.assertEqual([(data['id'], data['stock_count']) for _, data in events], expected)
+
+    def test_idle_connections_cost_no_queries(self):
+        _, stream = self.open_stream(self.product)
+        with self.assertQueryBudget(0, label='stream ocioso'):
+            self.assertEqual(parse_events(next(stream)), [])  # ping
+
+    def test_unwatched_product_publishes_nothing(self):
+        with mock.patch('products.stock.publish_on_commit') as publish:
+            self.sell(self.product, 1)
+        publish.assert_not_called()
+
+    def test_invalid_ids(self):
+        url = reverse('product-stock-stream')
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'ids': 'a,b'}).status_code, 400)
+        with override_settings(LIVE_STOCK_MAX_PRODUCTS=2):
+            self.assertEqual(self.client.get(url, {'ids': '1,2,3'}).status_code, 400)
+
+
+@override_settings(CATALOG_SNAPSHOT_BASE_URL='https://api.test', CATALOG_SNAPSHOT_AUTO=True)
+class CatalogSnapshotTests(TestCase):
+    """Snapshot estático igual a la API; los cambios reescriben solo lo afectado."""
+
+    @classmethod
+    def setUpTestData(cls):
+        catalog = build_catalog(products=40, images_per_product=1, sales=0, expenses=0)
+        cls.categories, cls.brands = catalog['categories'], catalog['brands']
+        cls.product = next(p for p in catalog['products'] if p.brand_id and p.stock_count >= 5)
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.enterContext(override_settings(CATALOG_SNAPSHOT_DIR=self.root))
+        call_command('build_catalog_snapshots', stdout=StringIO())
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), 'rb') as handle:
+            return handle.read()
+
+    def manifest(self):
+        return json.loads(self.read('manifest.json'))['files']
+
+    def api(self, url):
+        return self.client.get(url, HTTP_HOST='api.test', secure=True).content
+
+    def apply(self, change):
+        """Ejecuta `change` como una transacción y luego la tarea del snapshot."""
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertTrue(work_off())
+
+    def test_build_matches_api(self):
+        category, brand = self.categories[0], self.product.brand
+        self.assertEqual(self.read(f'category/{category.slug}/student/1.json'),
+                         self.api(f'/api/products/?category={category.slug}&audience=STUDENT'))
+        self.assertEqual(self.read(f'brand/{brand.slug}/1.json'), self.api(f'/api/products/?brand={brand.slug}'))
+        self.assertEqual(self.read(f'product/{self.product.pk}.json'),
+                         self.api(f'/api/products/{self.product.pk}/'))
+        self.assertEqual(self.read('categories/all/1.json'), self.api('/api/categories/'))
+        self.assertEqual(self.read('brands/professional/1.json'), self.api('/api/brands/?audience=PROFESSIONAL'))
+        self.assertEqual(len([name for name in self.manifest() if name.startswith('product/')]), 40)
+
+        out = StringIO()
+        call_command('build_catalog_snapshots', stdout=out)
+        self.assertIn(' 0 escritos', out.getvalue())
+
+    def test_move_product_rewrites_old_and_new_pages_only(self):
+        before = self.manifest()
+        old, new = self.product.category, next(c for c in self.categories if c != self.product.category)
+        self.product.category = new
+        self.apply(self.product.save)
+
+        after = self.manifest()
+        self.assertNotIn(self.product.pk, after[f'category/{old.slug}/all/1.json']['products'])
+        self.assertIn(self.product.pk, after[f'category/{new.slug}/all/1.json']['products'])
+        changed = {name for name in after if after[name]['sha256'] != before.get(name, {}).get('sha256')}
+        self.assertIn(f'product/{self.product.pk}.json', changed)
+        self.assertIn('categories/all/1.json', changed)  # conteos de productos
+        untouched = next(c for c in self.categories if c not in (old, new))
+        self.assertFalse({name for name in changed if name.startswith(f'category/{untouched.slug}/')})
+        self.assertFalse({name for name in changed if name.startswith('product/') and
+                          name != f'product/{self.product.pk}.json'})
+
+    def test_stock_change_rewrites_pages_containing_product(self):
+        with mock.patch.object(CatalogSnapshot, 'render_lists') as render_lists:
+            self.apply(lambda: Sale.objects.create(
+                product=self.product, quantity=1, unit_price=self.product.price, sale_date=timezone.now(),
+            ))
+        render_lists.assert_not_called()
+        self.product.refresh_from_db()
+        detail = json.loads(self.read(f'product/{self.product.pk}.json'))
+        self.assertEqual(detail['stock_count'], self.product.stock_count)
+        page = json.loads(self.read(f'brand/{self.product.brand.slug}/1.json'))
+        row = next(item for item in page['results'] if item['id'] == self.product.pk)
+        self.assertEqual(row['stock_count'], self.product.stock_count)
+
+    def test_deleted_product_and_renamed_brand(self):
+        brand = self.product.brand
+        old_slug = brand.slug
+        self.apply(self.product.delete)
+        self.assertNotIn(f'product/{self.product.pk}.json', self.manifest())
+        self.assertFalse(os.path.exists(os.path.join(self.root, f'product/{self.product.pk}.json')))
+
+        brand.slug = 'marca-renombrada'
+        self.apply(brand.save)
+        work_off()  # search_text de sus productos
+        names = self.manifest()
+        self.assertIn('brand/marca-renombrada/1.json', names)
+        self.assertNotIn(f'brand/{old_slug}/1.json', names)
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'brand', old_slug)))
+
+    def test_change_from_another_process_is_rendered(self):
+        # queryset.update no emite señales: como un cambio hecho en otro
+        # proceso, la versión del catálogo de este proceso no se enteró
+        self.api(f'/api/products/{self.product.pk}/')  # respuesta cacheada
+        Product.objects.filter(pk=self.product.pk).update(stock_count=F('stock_count') - 1)
+        version = get_catalog_version()
+        with CatalogSnapshot() as snapshot:
+            stats = snapshot.update(in_place=[self.product.pk])
+        self.assertGreater(stats['written'], 0)
+        detail = json.loads(self.read(f'product/{self.product.pk}.json'))
+        self.assertEqual(detail['stock_count'], self.product.stock_count - 1)
+        # Sin invalidar la caché de respuestas de los demás procesos
+        self.assertEqual(get_catalog_version(), version)
+
+    @override_settings(CATALOG_SNAPSHOT_AUTO=False)
+    def test_auto_disabled_enqueues_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertEqual(work_off(), 0)
+
+
+@override_settings(CATALOG_CHANGES_SETTLE_SECONDS=0)
+class CatalogChangesTests(QueryBudgetMixin, TestCase):
+    """Cambios desde un token: altas y cambios completos, bajas como ids."""
+
+    @classmethod
+    def setUpTestData(cls):
+        catalog = build_catalog(products=10, images_per_product=1, sales=0, expenses=0)
+        cls.products, cls.brands = catalog['products'], catalog['brands']
+
+    def changes(self, since=None):
+        params = {} if since is None else {'since': since}
+        response = self.client.get(reverse('product-changes'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, data, kind):
+        return [item['id'] for item in data[kind]['updated']]
+
+    def test_full_sync_then_only_changes(self):
+        full = self.changes()
+        self.assertEqual(sorted(self.ids(full, 'products')), sorted(p.pk for p in self.products))
+        self.assertEqual(len(full['categories']['updated']), 6)
+        self.assertNotIn('product_count', full['categories']['updated'][0])
+        self.assertFalse(full['has_more'])
+
+        product, gone = self.products[0], self.products[1]
+        product.price += 1
+        product.save()
+        gone_id, image_ids = gone.pk, list(gone.images.values_list('pk', flat=True))
+        gone.delete()
+        delta = self.changes(full['token'])
+        self.assertEqual(self.ids(delta, 'products'), [product.pk])
+        self.assertEqual(delta['products']['updated'][0]['price'], str(product.price))
+        self.assertEqual(delta['products']['deleted'], [gone_id])
+        self.assertEqual(delta['images']['deleted'], image_ids)
+        self.assertEqual(delta['categories'], {'updated': [], 'deleted': []})
+
+        with self.assertQueryBudget(1, label='sin cambios'):
+            self.assertEqual(self.changes(delta['token'])['products'], {'updated': [], 'deleted': []})
+
+    def test_sale_and_brand_rename(self):
+        token = self.changes()['token']
+        product = next(p for p in self.products if p.brand_id and p.stock_count)
+        expected = product.stock_count - 1
+        Sale.objects.create(product=product, quantity=1, unit_price=product.price, sale_date=timezone.now())
+        delta = self.changes(token)
+        self.assertEqual(self.ids(delta, 'products'), [product.pk])
+        self.assertEqual(delta['products']['updated'][0]['stock_count'], expected)
+
+        brand = product.brand
+        brand.name = 'Marca renombrada'
+        brand.save()
+        delta = self.changes(delta['token'])
+        self.assertEqual(self.ids(delta, 'brands'), [brand.pk])
+        self.assertEqual(sorted(self.ids(delta, 'products')), sorted(brand.products.values_list('pk', flat=True)))
+        self.assertEqual({p['brand_name'] for p in delta['products']['updated']}, {'Marca renombrada'})
+
+    def test_category_edit_without_rename_skips_products(self):
+        token = self.changes()['token']
+        category = Category.objects.get(pk=self.products[0].category_id)
+        category.description = 'Otra descripción'
+        category.save()
+        delta = self.changes(token)
+        self.assertEqual([item['id'] for item in delta['categories']['updated']], [category.pk])
+        self.assertEqual(delta['products']['updated'], [])
+
+        category.slug = 'categoria-nueva'
+        category.save(update_fields=['slug'])
+        delta = self.changes(delta['token'])
+        self.assertIn(self.products[0].pk, self.ids(delta, 'products'))
+        self.assertEqual(sorted(self.ids(delta, 'products')),
+                         sorted(category.products.values_list('pk', flat=True)))
+
+    @override_settings(CATALOG_CHANGES_PAGE_SIZE=4)
+    def test_batches(self):
+        token, seen, calls = None, [], 0
+        while True:
+            data = self.changes(token)
+            seen += self.ids(data, 'products')
+            token, calls = data['token'], calls + 1
+            if not data['has_more']:
+                break
+        self.assertEqual(sorted(seen), sorted(p.pk for p in self.products))
+        self.assertEqual(calls, 6)  # 21 cambios (6 categorías, 5 marcas, 10 productos) de a 4
+
+    @override_settings(CATALOG_CHANGES_SETTLE_SECONDS=60)
+    def test_recent_changes_do_not_advance_token(self):
+        data = self.changes()
+        self.assertEqual(data['token'], '0')
+        self.assertEqual(len(data['products']['updated']), 10)
+        self.assertFalse(data['has_more'])
+
+    def test_invalid_since(self):
+        for since in ('abc', '-1'):
+            response = self.client.get(reverse('product-changes'), {'since': since})
+            self.assertEqual(response.status_code, 400)
+
+
+class StorefrontBootstrapTests(QueryBudgetMixin, TestCase):
+    """La home en una petición: mismo contenido que los endpoints separados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        build_catalog(products=40, images_per_product=1, sales=0, expenses=0)
+
+    def test_matches_separate_endpoints(self):
+        data = self.client.get(reverse('storefront-bootstrap'), {'audience': 'STUDENT'}).json()
+        self.assertEqual(data['categories'], self.client.get('/api/categories/?audience=STUDENT').json()['results'])
+        self.assertEqual(data['brands'], self.client.get('/api/brands/?audience=STUDENT').json()['results'])
+        listing = self.client.get('/api/products/?audience=STUDENT').json()
+        self.assertEqual(data['products'], listing)
+        self.assertTrue(data['products']['next'].endswith('/api/products/?audience=STUDENT&page=2'))
+        # Un valor cualquiera no agrega parámetros al enlace
+        odd = self.client.get(reverse('storefront-bootstrap'), {'audience': 'x&page=9'}).json()
+        self.assertTrue(odd['products']['next'].endswith('/api/products/?audience=X%26PAGE%3D9&page=2'))
+
+        self.assertEqual(len(data['featured']), settings.STOREFRONT_FEATURED_COUNT)
+        self.assertTrue(all(product['in_stock'] for product in data['featured'] + data['discounted']))
+        self.assertTrue(all(product['target_audience'] in ('STUDENT', 'GENERAL') for product in data['featured']))
+        discounts = [product['discount_percentage'] for product in data['discounted']]
+        self.assertTrue(discounts and min(discounts) > 0)
+        self.assertEqual(discounts, sorted(discounts, reverse=True))
+
+    def test_fixed_queries_then_cached(self):
+        url = reverse('storefront-bootstrap')
+        with self.assertQueryBudget(7, label='bootstrap'):
+            self.client.get(url)
+        category = Product.objects.first().category
+        for i in range(40):
+            product = Product.objects.create(name=f'Extra {i}', description='x', price=Decimal('20.00'),
+                                             discount_price=Decimal('15.00'), category=category, stock_count=5)
+            ProductImage.objects.create(product=product, image=f'products/gallery/extra-{i}.jpg')
+        with self.assertQueryBudget(7, label='bootstrap con el doble de catálogo'):
+            response = self.client.get(url)
+        self.assertEqual(response.json()['products']['count'], 80)
+        with self.assertQueryBudget(0, label='bootstrap cacheado'):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class StockReservationTests(TestCase):
+    """Reservas por carrito: descuentan del disponible hasta que vencen, sin tocar Product."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = build_catalog(products=1, sales=0, expenses=0)['categories'][0]
+        cls.product = Product.objects.create(name='Resina', description='x', price=Decimal('30.00'),
+                                             category=category, stock_count=5)
+
+    def setUp(self):
+        cache.delete(SWEEP_KEY)
+
+    def url(self, cart_id, product=None):
+        if product is None:
+            return reverse('cart-reservations', kwargs={'cart_id': cart_id})
+        return reverse('cart-reservation', kwargs={'cart_id': cart_id, 'product_id': product.pk})
+
+    def put(self, cart_id, quantity, product=None):
+        return self.client.put(self.url(cart_id, product or self.product), {'quantity': quantity},
+                               content_type='application/json')
+
+    def test_reservations_limit_other_carts(self):
+        response = self.put('cart-aaaa', 3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['quantity'], response.data['available']), (3, 5))
+
+        response = self.put('cart-bbbb', 3)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.data['quantity'], response.data['available']), (0, 2))
+        self.assertEqual(self.put('cart-bbbb', 2).status_code, 200)
+
+        # Cambiar la cantidad propia reemplaza, no suma
+        self.assertEqual(self.put('cart-aaaa', 2).data['quantity'], 2)
+        self.assertEqual(self.client.get(self.url('cart-cccc', self.product)).data['available'], 1)
+        self.assertEqual(StockReservation.objects.count(), 2)
+
+    def test_expired_reservations_stop_counting(self):
+        self.put('cart-aaaa', 5)
+        self.assertEqual(self.put('cart-bbbb', 1).status_code, 409)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self.client.get(self.url('cart-aaaa')).data, [])
+        self.assertEqual(self.put('cart-bbbb', 5).status_code, 200)
+
+    def test_release(self):
+        other = Product.objects.exclude(pk=self.product.pk).first()
+        Product.objects.filter(pk=other.pk).update(stock_count=1)
+        self.put('cart-aaaa', 5)
+        self.put('cart-aaaa', 1, other)
+        self.assertEqual([row['product'] for row in self.client.get(self.url('cart-aaaa')).data],
+                         sorted([self.product.pk, other.pk]))
+
+        self.assertEqual(self.client.delete(self.url('cart-aaaa', self.product)).status_code, 204)
+        self.assertEqual(self.put('cart-bbbb', 5).status_code, 200)
+        self.assertEqual(self.put('cart-bbbb', 0).data['quantity'], 0)
+        self.assertEqual(self.client.delete(self.url('cart-aaaa')).status_code, 204)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_product_row_is_not_written(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.put('cart-aaaa', 2)
+            self.put('cart-aaaa', 3)
+        table = f'"{Product._meta.db_table}"'
+        locking = [query['sql'] for query in queries
+                   if query['sql'].startswith(f'UPDATE {table}') or 'FOR UPDATE' in query['sql']]
+        self.assertEqual(locking, [])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_count, 5)
+
+    def test_expired_rows_are_purged_in_background(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.put('cart-aaaa', 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.put('cart-bbbb', 1)  # ya hay una limpieza encolada en este intervalo
+        StockReservation.objects.filter(cart_id='cart-aaaa').update(expires_at=timezone.now())
+
+        self.assertEqual(work_off(), 1)
+        self.assertEqual(list(StockReservation.objects.values_list('cart_id', flat=True)), ['cart-bbbb'])
+
+        StockReservation.objects.update(expires_at=timezone.now())
+        out = StringIO()
+        call_command('expire_stock_reservations', stdout=out)
+        self.assertIn('1 reservas vencidas', out.getvalue())
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url('corto')).status_code, 400)
+        self.assertEqual(self.put('cart-aaaa', -1).status_code, 400)
+        self.assertEqual(self.put('cart-aaaa', '2').status_code, 400)
+        missing = reverse('cart-reservation', kwargs={'cart_id': 'cart-aaaa', 'product_id': 999999})
+        self.assertEqual(self.client.get(missing).status_code, 404)
+        for quantity in (1, 0):
+            response = self.client.put(missing, {'quantity': quantity}, content_type='application/json')
+            self.assertEqual(response.status_code, 404)
+        self.assertFalse(StockReservation.objects.exists())
 
-# Create your tests here.
@@ -0,0 +1,31 @@
+"""
+Normalización de texto para búsquedas del catálogo.
+
+Incluye:
+- normalize_text: Minúsculas, sin tildes y sin signos ("RESÍNA 3M" -> "resina 3m")
+- trigrams: Trigramas de un texto con el mismo relleno que pg_trgm
+"""
+import unicodedata
+
+
+def normalize_text(value: str) -> str:
+    """Minúsculas sin tildes; todo lo que no sea letra o número pasa a un espacio."""
+    decomposed = unicodedata.normalize('NFKD', value.lower())
+    chars = [
+        char if char.isalnum() else ' '
+        for char in decomposed
+        if not unicodedata.combining(char)
+    ]
+    return ' '.join(''.join(chars).split())
+
+
+def trigrams(value: str) -> set:
+    """
+    Trigramas de cada palabra del texto normalizado, rellenando con dos
+    espacios delante y uno detrás como pg_trgm: "kit" -> {"  k", " ki", "kit", "it "}.
+    """
+    result = set()
+    for word in normalize_text(value).split():
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
@@ -1,11 +1,17 @@
 """
 URLs para la aplicación de productos.
 
-Configura las rutas de la API REST usando Django REST Framework Router.
+Configura las rutas de la API REST usando Django REST Framework Router,
+más el stock en vivo (/api/products/stock/stream/, SSE) y los datos iniciales
+de la tienda (/api/storefront/bootstrap/) y las reservas de stock del carrito
+(/api/cart/<id>/reservations/).
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, ProductViewSet, BrandViewSet
+from .views import (
+    CategoryViewSet, ProductViewSet, BrandViewSet, StorefrontBootstrapView, stock_stream,
+    CartReservationsView, CartReservationView,
+)
 
 # Crear router y registrar viewsets
 router = DefaultRouter()
@@ -15,5 +21,10 @@ router.register(r'products', ProductViewSet, basename='product')
 
 # Las URLs se incluyen automáticamente del router
 urlpatterns = [
+    path('products/stock/stream/', stock_stream, name='product-stock-stream'),
+    path('storefront/bootstrap/', StorefrontBootstrapView.as_view(), name='storefront-bootstrap'),
+    path('cart/<slug:cart_id>/reservations/', CartReservationsView.as_view(), name='cart-reservations'),
+    path('cart/<slug:cart_id>/reservations/<int:product_id>/', CartReservationView.as_view(),
+         name='cart-reservation'),
     path('', include(router.urls)),
 ]
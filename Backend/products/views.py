@@ -2,14 +2,122 @@
 Vistas de la API REST para productos.
 
 Proporciona endpoints de solo lectura para el catálogo público.
+Las respuestas se cachean por versión del catálogo y llevan ETag (ver cache.py).
+Cada cliente tiene límites de peticiones por scope (ver dental_api/throttling.py).
+El stock en vivo (stock_stream) es una vista SSE aparte (ver products/stock.py).
+StorefrontBootstrapView junta en una respuesta lo que pide la home al cargar.
+Las reservas de stock del carrito (CartReservation*View) son las únicas
+escrituras: no se cachean (ver products/reservations.py).
 """
-from rest_framework import viewsets, filters
+from collections import defaultdict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db.models import Count, prefetch_related_objects
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny
-from .models import Category, Product, Brand
-from .serializers import CategorySerializer, ProductSerializer, BrandSerializer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from dental_api.fastlist import DATETIME, FastListMixin, decimal_str, media_url_builder
+from dental_api.throttling import (
+    CartThrottle, CatalogThrottle, ExportThrottle, LiveStreamThrottle, SearchThrottle, throttle_view,
+)
+from live.broadcast import Event, get_broadcaster
+from live.sse import stream_response
+from .cache import CatalogCacheMixin
+from .changes import changes_since
+from .models import (
+    Category, Product, Brand, ProductImage,
+    STOCK_STATUS_SQL,
+)
+from .reservations import InsufficientStock, release, reservation_status, reserve, valid_cart_id
+from .search import FuzzySearchFilter, RankedOrderingFilter
+from .serializers import CategorySerializer, ProductSerializer, BrandSerializer, ProductImageSerializer
+from .stock import parse_product_ids, stock_channel, stock_payload
+from .suggest import suggest_index
+
+
+def filter_audience(queryset, audience):
+    """?audience=: STUDENT o PROFESSIONAL incluyen GENERAL; otro valor no filtra."""
+    audience = (audience or '').upper()
+    if audience in ['STUDENT', 'PROFESSIONAL']:
+        return queryset.filter(target_audience__in=[audience, 'GENERAL'])
+    if audience == 'GENERAL':
+        return queryset.filter(target_audience='GENERAL')
+    return queryset
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class SparseFieldsetMixin:
+    """
+    Soporte de ?fields=a,b y ?expand=x,y en los ViewSets del catálogo.
+
+    Los campos pedidos no solo recortan la respuesta: también determinan el
+    SQL. `field_requirements` indica, por campo del serializador, qué columnas
+    lee (para .only()), qué relaciones une (select_related) y qué precarga
+    (prefetch_related). Un campo sin entrada se asume columna del modelo con
+    el mismo nombre. `expand_requirements` hace lo mismo para ?expand=.
+    """
+    field_requirements = {}
+    expand_requirements = {}
+
+    def _query_list(self, param):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        return [item.strip() for item in value.split(',') if item.strip()]
+
+    def get_sparse_fields(self):
+        """Campos a devolver: los válidos de ?fields= o todos los del serializador."""
+        declared = self.get_serializer_class().Meta.fields
+        requested = self._query_list('fields')
+        if requested is None:
+            return list(declared)
+        return [name for name in declared if name in requested]
+
+    def get_expand(self):
+        """Relaciones válidas pedidas en ?expand=."""
+        expandable = self.get_serializer_class().expandable_fields
+        return [name for name in self._query_list('expand') or () if name in expandable]
+
+    def is_sparse(self):
+        return 'fields' in self.request.query_params
+
+    def apply_field_requirements(self, queryset):
+        """Ajusta columnas, joins y prefetch del queryset a los campos pedidos."""
+        only, select_related, prefetch_related = {'pk'}, set(), set()
+        requirements = [
+            self.field_requirements.get(name, {'only': [name]})
+            for name in self.get_sparse_fields()
+        ] + [self.expand_requirements[name] for name in self.get_expand()]
+
+        for requirement in requirements:
+            only.update(requirement.get('only', ()))
+            select_related.update(requirement.get('select_related', ()))
+            prefetch_related.update(requirement.get('prefetch_related', ()))
+
+        if self.is_sparse():
+            queryset = queryset.only(*only)
+        if select_related:
+            queryset = queryset.select_related(*sorted(select_related))
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(prefetch_related))
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.is_sparse():
+            context['fields'] = self.get_sparse_fields()
+        context['expand'] = self.get_expand()
+        return context
+
+
+class CategoryViewSet(CatalogCacheMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint para listar categorías.
     
@@ -20,27 +128,27 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     Filtros disponibles:
         - ?audience=STUDENT         - Solo categorías para estudiantes + generales
         - ?audience=PROFESSIONAL    - Solo categorías para profesionales + generales
+        - ?fields=id,name,slug      - Solo esos campos (sin product_count no se cuenta)
     """
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
+    throttle_classes = [CatalogThrottle]
     lookup_field = 'slug'
+    field_requirements = {
+        'product_count': {},  # anotación en get_queryset
+    }
     
     def get_queryset(self):
-        queryset = Category.objects.all()
+        queryset = self.apply_field_requirements(Category.objects.all())
+        if 'product_count' in self.get_sparse_fields():
+            # Meta.ordering no se aplica a consultas con GROUP BY: ordenar explícitamente
+            queryset = queryset.annotate(product_count=Count('products')).order_by('name')
         
         # Filtrar por audiencia
-        audience = self.request.query_params.get('audience')
-        if audience:
-            audience = audience.upper()
-            if audience in ['STUDENT', 'PROFESSIONAL']:
-                queryset = queryset.filter(target_audience__in=[audience, 'GENERAL'])
-            elif audience == 'GENERAL':
-                queryset = queryset.filter(target_audience='GENERAL')
-        
-        return queryset
+        return filter_audience(queryset, self.request.query_params.get('audience'))
 
 
-class BrandViewSet(viewsets.ReadOnlyModelViewSet):
+class BrandViewSet(CatalogCacheMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint para listar marcas.
     
@@ -51,57 +159,95 @@ class BrandViewSet(viewsets.ReadOnlyModelViewSet):
     Filtros disponibles:
         - ?audience=STUDENT         - Solo marcas para estudiantes + generales
         - ?audience=PROFESSIONAL    - Solo marcas para profesionales + generales
+        - ?fields=id,name,slug      - Solo esos campos (sin product_count no se cuenta)
     """
     serializer_class = BrandSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [CatalogThrottle]
     lookup_field = 'slug'
+    field_requirements = {
+        'product_count': {},  # anotación en get_queryset
+    }
     
     def get_queryset(self):
-        queryset = Brand.objects.all()
+        queryset = self.apply_field_requirements(Brand.objects.all())
+        if 'product_count' in self.get_sparse_fields():
+            # Meta.ordering no se aplica a consultas con GROUP BY: ordenar explícitamente
+            queryset = queryset.annotate(product_count=Count('products')).order_by('name')
         
         # Filtrar por audiencia
-        audience = self.request.query_params.get('audience')
-        if audience:
-            audience = audience.upper()
-            if audience in ['STUDENT', 'PROFESSIONAL']:
-                queryset = queryset.filter(target_audience__in=[audience, 'GENERAL'])
-            elif audience == 'GENERAL':
-                queryset = queryset.filter(target_audience='GENERAL')
-        
-        return queryset
+        return filter_audience(queryset, self.request.query_params.get('audience'))
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(CatalogCacheMixin, FastListMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint para listar productos.
     
     Endpoints:
         GET /api/products/          - Lista todos los productos
         GET /api/products/{id}/     - Detalle de un producto
+        GET /api/products/batch/?ids=3,1,2 - Varios productos en una consulta (orden pedido)
+        GET /api/products/suggest/?q=res    - Sugerencias mientras se escribe (índice en memoria)
+        GET /api/products/{id}/related/     - Productos relacionados (precalculados)
+        GET /api/products/changes/?since=t  - Cambios del catálogo desde el token t (POS / offline)
     
     Filtros disponibles:
         - ?category={slug o id}     - Filtrar por categoría
         - ?brand={slug o id}        - Filtrar por marca
-        - ?min_price={número}       - Precio mínimo
-        - ?max_price={número}       - Precio máximo
+        - ?min_price={número}       - Precio actual mínimo (con descuento aplicado)
+        - ?max_price={número}       - Precio actual máximo (con descuento aplicado)
+        - ?min_discount={número}    - Descuento mínimo en %
         - ?in_stock=true            - Solo productos en stock
-        - ?search={texto}           - Buscar en nombre y descripción
-        - ?ordering=price           - Ordenar por precio (use -price para descendente)
+        - ?search={texto}           - Búsqueda difusa en nombre, marca y categoría (ordena por relevancia)
+        - ?ordering=current_price   - Ordenar por precio actual (use -current_price para descendente)
+        - ?fields=id,name,image     - Solo esos campos (y solo las columnas/joins necesarios)
+        - ?expand=category,brand    - Categoría y marca como objetos anidados
+        - ?fast=true&page_size=200  - Listado sin serializador (misma salida, para POS/exportación)
     
     Nota: Si no se envía ningún filtro de categoría, devuelve TODOS los productos
     (lógica "Todo el catálogo" automática).
     """
-    queryset = Product.objects.select_related('category', 'brand').all()
+    queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [CatalogThrottle, SearchThrottle, ExportThrottle]
+    # Solo ids numéricos: /api/products/abc/related/ es 404, no un ValueError
+    lookup_value_regex = r'\d+'
+    
+    # SQL que necesita cada campo calculado (ver SparseFieldsetMixin)
+    field_requirements = {
+        'current_price': {'only': ['current_price']},
+        'has_discount': {'only': ['discount_price']},
+        'discount_percentage': {'only': ['discount_percentage']},
+        'stock_status': {'only': ['stock_count']},
+        'category_name': {'only': ['category', 'category__name'], 'select_related': ['category']},
+        'category_slug': {'only': ['category', 'category__slug'], 'select_related': ['category']},
+        'brand_name': {'only': ['brand', 'brand__name'], 'select_related': ['brand']},
+        'brand_slug': {'only': ['brand', 'brand__slug'], 'select_related': ['brand']},
+        'image': {'only': ['image'], 'prefetch_related': ['images']},
+        'images': {'prefetch_related': ['images']},
+    }
+    expand_requirements = {
+        'category': {
+            'only': ['category', 'category__name', 'category__slug'],
+            'select_related': ['category'],
+        },
+        'brand': {
+            'only': ['brand', 'brand__name', 'brand__slug', 'brand__image'],
+            'select_related': ['brand'],
+        },
+    }
     
     # Configuración de filtros
     filter_backends = [
-        filters.SearchFilter,
-        filters.OrderingFilter,
+        FuzzySearchFilter,
+        RankedOrderingFilter,
     ]
+    # Solo se usan con FUZZY_SEARCH_ENABLED = False (búsqueda icontains)
     search_fields = ['name', 'description']
-    ordering_fields = ['price', 'created_at', 'stock_count', 'name']
+    ordering_fields = [
+        'current_price', 'discount_percentage', 'price', 'created_at', 'stock_count', 'name',
+    ]
     ordering = ['-created_at']  # Orden por defecto
     
     def get_queryset(self):
@@ -111,7 +257,7 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         Filtros acumulativos - se pueden combinar:
             /api/products/?category=resinas&brand=3m&min_price=10&max_price=50
         """
-        queryset = super().get_queryset()
+        queryset = self.apply_field_requirements(super().get_queryset())
         
         # Filtrar por categoría (slug o id)
         category = self.request.query_params.get('category')
@@ -129,19 +275,27 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
             else:
                 queryset = queryset.filter(brand__slug=brand)
         
-        # Filtrar por rango de precio
+        # Filtrar por rango de precio (precio actual: con descuento si lo hay)
         min_price = self.request.query_params.get('min_price')
         max_price = self.request.query_params.get('max_price')
         
         if min_price:
             try:
-                queryset = queryset.filter(price__gte=float(min_price))
+                queryset = queryset.filter(current_price__gte=float(min_price))
             except ValueError:
                 pass
         
         if max_price:
             try:
-                queryset = queryset.filter(price__lte=float(max_price))
+                queryset = queryset.filter(current_price__lte=float(max_price))
+            except ValueError:
+                pass
+        
+        # Filtrar por descuento mínimo (%)
+        min_discount = self.request.query_params.get('min_discount')
+        if min_discount:
+            try:
+                queryset = queryset.filter(discount_percentage__gte=int(min_discount))
             except ValueError:
                 pass
         
@@ -154,13 +308,373 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
                 queryset = queryset.filter(in_stock=False)
         
         # Filtrar por audiencia (STUDENT o PROFESSIONAL incluyen GENERAL)
-        audience = self.request.query_params.get('audience')
-        if audience:
-            audience = audience.upper()
-            if audience in ['STUDENT', 'PROFESSIONAL']:
-                # Incluir productos específicos + productos GENERAL
-                queryset = queryset.filter(target_audience__in=[audience, 'GENERAL'])
-            elif audience == 'GENERAL':
-                queryset = queryset.filter(target_audience='GENERAL')
+        return filter_audience(queryset, self.request.query_params.get('audience'))
+    
+    # Máximo de ids por petición en /api/products/batch/
+    batch_max_ids = 50
+    
+    @action(detail=False, methods=['get'], url_path='batch')
+    def batch(self, request):
+        """
+        Varios productos por id en una sola consulta, en el orden pedido.
         
-        return queryset
+        Pensado para el carrito y los productos relacionados. Los ids
+        repetidos se devuelven una vez y los inexistentes se omiten.
+        Admite ?fields= / ?expand= y comparte caché y ETag con el listado.
+        """
+        raw_ids = request.query_params.get('ids', '')
+        try:
+            ids = list(dict.fromkeys(int(value) for value in raw_ids.split(',') if value.strip()))
+        except ValueError:
+            return Response(
+                {'ids': 'Debe ser una lista de ids separados por comas.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(ids) > self.batch_max_ids:
+            return Response(
+                {'ids': f'Máximo {self.batch_max_ids} productos por petición.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        
+        def build():
+            products = {product.pk: product for product in self.get_queryset().filter(pk__in=ids)}
+            ordered = [products[pk] for pk in ids if pk in products]
+            return Response(self.get_serializer(ordered, many=True).data)
+        
+        return self.cached_response(request, build)
+    
+    # Vecinos por defecto en /api/products/{id}/related/ (?limit= hasta RELATED_PRODUCTS_LIMIT)
+    related_default_limit = 4
+    
+    @action(detail=True, methods=['get'], url_path='related')
+    def related(self, request, pk=None):
+        """
+        Productos relacionados precalculados (tabla RelatedProduct), en orden
+        de puntuación. Si el producto aún no tiene vecinos calculados se
+        devuelven otros de su categoría.
+        """
+        try:
+            limit = int(request.query_params.get('limit', self.related_default_limit))
+        except ValueError:
+            limit = self.related_default_limit
+        limit = max(1, min(limit, settings.RELATED_PRODUCTS_LIMIT))
+        
+        def build():
+            products = list(
+                self.get_queryset()
+                .filter(neighbour_of__product_id=pk)
+                .order_by('neighbour_of__rank')[:limit]
+            )
+            if not products:
+                category_id = Product.objects.filter(pk=pk).values_list('category_id', flat=True).first()
+                if category_id is None:
+                    return Response({'detail': 'No encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+                products = list(
+                    self.get_queryset().filter(category_id=category_id, in_stock=True).exclude(pk=pk)[:limit]
+                )
+            return Response(self.get_serializer(products, many=True).data)
+        
+        return self.cached_response(request, build)
+    
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        """
+        Sincronización incremental para el POS y clientes offline.
+        
+        Devuelve los productos, categorías, marcas e imágenes creados o
+        modificados desde ?since= (en `updated`) y los ids de los eliminados
+        (en `deleted`), más el `token` para la próxima consulta. Sin ?since=
+        devuelve todo el catálogo. Con `has_more` pedir enseguida el
+        siguiente lote. Los listados no incluyen `product_count`: los conteos
+        cambian sin que cambie la categoría o la marca.
+        
+        No se cachea: sin cambios es una sola consulta por la clave primaria.
+        """
+        try:
+            since = int(request.query_params.get('since', 0))
+            if since < 0:
+                raise ValueError(since)
+        except ValueError:
+            return Response(
+                {'since': 'Debe ser un token devuelto por este endpoint.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        
+        changes, token, has_more = changes_since(since)
+        updated, deleted = defaultdict(list), defaultdict(list)
+        for change in changes:
+            (deleted if change.deleted else updated)[change.kind].append(change.object_id)
+        
+        context = self.get_serializer_context()
+        
+        def changed(kind, queryset):
+            return list(queryset.filter(pk__in=updated[kind]).order_by('pk')) if updated[kind] else []
+        
+        products = changed('product', Product.objects.select_related('category', 'brand').prefetch_related('images'))
+        categories = changed('category', Category.objects.all())
+        brands = changed('brand', Brand.objects.all())
+        images = changed('image', ProductImage.objects.all())
+        image_data = ProductImageSerializer(images, many=True, context=context).data
+        
+        return Response({
+            'token': str(token),
+            'has_more': has_more,
+            'products': {
+                'updated': ProductSerializer(products, many=True, context=context).data,
+                'deleted': deleted['product'],
+            },
+            'categories': {
+                'updated': CategorySerializer(categories, many=True, context=context,
+                                              fields=['id', 'name', 'slug', 'description']).data,
+                'deleted': deleted['category'],
+            },
+            'brands': {
+                'updated': BrandSerializer(brands, many=True, context=context,
+                                           fields=['id', 'name', 'slug', 'image']).data,
+                'deleted': deleted['brand'],
+            },
+            'images': {
+                'updated': [
+                    {**data, 'product': image.product_id} for image, data in zip(images, image_data)
+                ],
+                'deleted': deleted['image'],
+            },
+        })
+    
+    # Sugerencias por petición en /api/products/suggest/ (por defecto y máximo)
+    suggest_default_limit = 8
+    suggest_max_limit = 20
+    
+    @action(detail=False, methods=['get'], url_path='suggest')
+    def suggest(self, request):
+        """
+        Sugerencias mientras se escribe: productos, marcas y categorías cuyo
+        nombre (o alguna de sus palabras) empieza por ?q=, sin tildes ni
+        mayúsculas. Se responde desde el índice en memoria de suggest.py.
+        
+        Parámetros: ?q=res&limit=8&audience=STUDENT
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', self.suggest_default_limit)),
+                        self.suggest_max_limit)
+        except ValueError:
+            limit = self.suggest_default_limit
+        audience = request.query_params.get('audience', '').upper() or None
+        return Response(suggest_index.search(request.query_params.get('q', ''), max(limit, 1), audience))
+    
+    # =========================================================================
+    # LISTADO RÁPIDO (?fast=true)
+    # =========================================================================
+    
+    fast_columns = (
+        'id', 'name', 'description', 'price', 'discount_price',
+        'current_price', 'discount_percentage',
+        'category_id', 'category__name', 'category__slug',
+        'brand_id', 'brand__name', 'brand__slug',
+        'target_audience', 'stock_count', 'in_stock', 'fast_stock_status',
+        'image', 'created_at', 'updated_at',
+    )
+    
+    def fast_values(self, queryset):
+        """Tuplas con todo lo que necesita ProductSerializer, calculado en SQL."""
+        return queryset.prefetch_related(None).annotate(
+            fast_stock_status=STOCK_STATUS_SQL,
+        ).values_list(*self.fast_columns)
+    
+    def fast_rows(self, tuples):
+        """Filas idénticas a ProductSerializer (una consulta extra para la galería)."""
+        media_url = media_url_builder(self.request)
+        
+        gallery = defaultdict(list)
+        gallery_rows = ProductImage.objects.filter(
+            product_id__in=[row[0] for row in tuples]
+        ).values_list('product_id', 'id', 'image', 'order')
+        for product_id, image_id, image, order in gallery_rows:
+            gallery[product_id].append({'id': image_id, 'image': media_url(image), 'order': order})
+        
+        rows = []
+        for (pk, name, description, price, discount_price, current_price, discount_percentage,
+             category_id, category_name, category_slug, brand_id, brand_name, brand_slug,
+             target_audience, stock_count, in_stock, stock_status,
+             image, created_at, updated_at) in tuples:
+            images = gallery.get(pk, [])
+            rows.append({
+                'id': pk,
+                'name': name,
+                'description': description,
+                'price': decimal_str(price),
+                'discount_price': decimal_str(discount_price),
+                'current_price': decimal_str(current_price),
+                'has_discount': discount_price is not None,
+                'discount_percentage': discount_percentage,
+                'category': category_id,
+                'category_name': category_name,
+                'category_slug': category_slug,
+                'brand': brand_id,
+                'brand_name': brand_name,
+                'brand_slug': brand_slug,
+                'target_audience': target_audience,
+                'stock_count': stock_count,
+                'in_stock': in_stock,
+                'stock_status': stock_status,
+                # Imagen principal o, si no hay, la primera de la galería
+                'image': media_url(image) if image else (images[0]['image'] if images else None),
+                'images': images,
+                'created_at': DATETIME.to_representation(created_at),
+                'updated_at': DATETIME.to_representation(updated_at),
+            })
+        return rows
+
+
+class StorefrontBootstrapView(CatalogCacheMixin, APIView):
+    """
+    GET /api/storefront/bootstrap/?audience=STUDENT - Datos iniciales de la tienda
+    
+    En una sola respuesta (y una sola entrada de caché):
+        - categories / brands: todas, con product_count
+        - featured: los STOREFRONT_FEATURED_COUNT productos en stock más nuevos
+        - discounted: los STOREFRONT_DISCOUNTED_COUNT en stock con más descuento
+        - products: la primera página de /api/products/?audience=, con `next`
+          apuntando a ese listado
+    
+    Siempre 7 consultas, sin importar el tamaño del catálogo: categorías,
+    marcas, COUNT y página del listado, destacados, descuentos y las imágenes
+    de todos los productos juntos.
+    """
+    permission_classes = [AllowAny]
+    throttle_classes = [CatalogThrottle]
+    
+    def get(self, request):
+        return self.cached_response(request, lambda: Response(self.build(request)))
+    
+    def build(self, request):
+        audience = (request.query_params.get('audience') or '').upper()
+        context = {'request': request}
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        
+        categories = filter_audience(
+            Category.objects.annotate(product_count=Count('products')).order_by('name'), audience
+        )
+        brands = filter_audience(
+            Brand.objects.annotate(product_count=Count('products')).order_by('name'), audience
+        )
+        products = filter_audience(Product.objects.select_related('category', 'brand'), audience)
+        
+        count = products.count()
+        page = list(products.order_by('-created_at')[:page_size])
+        featured = list(products.filter(in_stock=True).order_by('-created_at')[:settings.STOREFRONT_FEATURED_COUNT])
+        discounted = list(
+            products.filter(in_stock=True, discount_percentage__gt=0)
+            .order_by('-discount_percentage', '-created_at')[:settings.STOREFRONT_DISCOUNTED_COUNT]
+        )
+        # Una sola consulta de imágenes para las tres listas (mismas instancias)
+        unique = {product.pk: product for product in page + featured + discounted}
+        prefetch_related_objects(list(unique.values()), 'images')
+        page, featured, discounted = (
+            [unique[product.pk] for product in rows] for rows in (page, featured, discounted)
+        )
+        
+        def listing_url(page_number):
+            params = {'audience': audience, 'page': page_number} if audience else {'page': page_number}
+            return request.build_absolute_uri(reverse('product-list')) + '?' + urlencode(params)
+        
+        return {
+            'audience': audience or None,
+            'categories': CategorySerializer(categories, many=True, context=context).data,
+            'brands': BrandSerializer(brands, many=True, context=context).data,
+            'featured': ProductSerializer(featured, many=True, context=context).data,
+            'discounted': ProductSerializer(discounted, many=True, context=context).data,
+            'products': {
+                'count': count,
+                'next': listing_url(2) if count > page_size else None,
+                'previous': None,
+                'results': ProductSerializer(page, many=True, context=context).data,
+            },
+        }
+
+
+class CartReservationMixin:
+    """Id de carrito válido en la URL; GET con el límite del catálogo y escrituras con el del carrito."""
+    permission_classes = [AllowAny]
+    throttle_classes = [CatalogThrottle, CartThrottle]
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not valid_cart_id(kwargs['cart_id']):
+            raise ValidationError({'cart_id': 'Entre 8 y 64 letras, números, guiones o guiones bajos.'})
+
+
+class CartReservationsView(CartReservationMixin, APIView):
+    """
+    GET    /api/cart/{cart_id}/reservations/ - Reservas vigentes del carrito
+    DELETE /api/cart/{cart_id}/reservations/ - Libera todas (carrito vaciado o venta hecha)
+    
+    Cada reserva: {product, quantity, expires_at, available}, donde available
+    es lo máximo que el carrito puede apartar de ese producto.
+    """
+    
+    def get(self, request, cart_id):
+        return Response(reservation_status(cart_id))
+    
+    def delete(self, request, cart_id):
+        release(cart_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CartReservationView(CartReservationMixin, APIView):
+    """
+    GET    /api/cart/{cart_id}/reservations/{product_id}/ - Reserva del producto (quantity 0 si no hay)
+    PUT    /api/cart/{cart_id}/reservations/{product_id}/ - {"quantity": n}: aparta n unidades
+    DELETE /api/cart/{cart_id}/reservations/{product_id}/ - Libera el producto
+    
+    PUT reemplaza la cantidad y renueva el vencimiento (STOCK_RESERVATION_TTL);
+    el frontend lo repite mientras el carrito sigue abierto. Si no hay stock
+    libre responde 409 con la reserva actual y el máximo disponible.
+    """
+    
+    def get(self, request, cart_id, product_id):
+        rows = reservation_status(cart_id, [product_id])
+        if not rows:
+            return Response({'detail': 'No encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(rows[0])
+    
+    def put(self, request, cart_id, product_id):
+        quantity = request.data.get('quantity')
+        if type(quantity) is not int or quantity < 0:
+            raise ValidationError({'quantity': 'Debe ser un entero mayor o igual a 0.'})
+        try:
+            return Response(reserve(cart_id, product_id, quantity))
+        except Product.DoesNotExist:
+            return Response({'detail': 'No encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        except InsufficientStock as exc:
+            return Response({'detail': str(exc), **exc.status}, status=status.HTTP_409_CONFLICT)
+    
+    def delete(self, request, cart_id, product_id):
+        release(cart_id, [product_id])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@require_GET
+@throttle_view(LiveStreamThrottle)
+def stock_stream(request):
+    """
+    GET /api/products/stock/stream/?ids=1,2,3 - Stock en vivo por SSE
+
+    Envía un evento `stock` por producto con el valor actual y después uno
+    cada vez que cambia (una ráfaga de ventas sale como un solo evento con el
+    último valor). Los ids inexistentes se ignoran.
+    """
+    try:
+        ids = parse_product_ids(request.GET.get('ids', ''))
+    except ValueError:
+        return JsonResponse(
+            {'ids': f'Entre 1 y {settings.LIVE_STOCK_MAX_PRODUCTS} ids separados por comas.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    subscription = get_broadcaster().subscribe([stock_channel(pk) for pk in ids])
+    products = Product.objects.filter(pk__in=ids).only('id', 'stock_count', 'in_stock')
+    initial = [
+        Event(stock_channel(product.pk), 'stock', stock_payload(product), key=str(product.pk))
+        for product in products
+    ]
+    return stream_response(request, subscription, initial, linger=settings.LIVE_STOCK_LINGER)
@@ -0,0 +1,159 @@
+"""
+Precalentamiento del catálogo tras un deploy (comando warm_caches).
+
+Incluye:
+- catalog_paths: Rutas más comunes del frontend (home, categoría x audiencia, marcas)
+- paths_from_access_log: Rutas del catálogo más pedidas según un access log
+- warm_paths: Repite las peticiones en paralelo y precarga las imágenes que devuelven
+- preload_file: Lee un archivo para dejar sus páginas en la caché del sistema operativo
+
+Las peticiones pasan por toda la pila de Django (middleware, vistas,
+CatalogCacheMixin), así que dejan las respuestas en la caché con la misma
+clave que usará un visitante (versión del catálogo + URL con WARMUP_HOST).
+Con LocMemCache la caché es de cada proceso: el comando solo calienta la BD
+y los archivos; para calentar el servidor en marcha usar --url.
+"""
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+
+from .models import AUDIENCE_CHOICES, Brand, Category
+
+
+CATALOG_PREFIXES = ('/api/products/', '/api/categories/', '/api/brands/')
+
+# Línea de access log (formato common/combined de gunicorn o nginx)
+ACCESS_LOG_LINE = re.compile(r'"GET (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3}) ')
+
+
+# =============================================================================
+# RUTAS A PRECALENTAR
+# =============================================================================
+
+def catalog_paths(brand_pages=None):
+    """
+    Rutas que pide el frontend al navegar el catálogo, con los parámetros en
+    el mismo orden que productService.ts (la URL es parte de la clave de caché).
+    """
+    brand_pages = settings.WARMUP_BRAND_PAGES if brand_pages is None else brand_pages
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    audiences = [code for code, _ in AUDIENCE_CHOICES]
+
+    paths = ['/api/products/', '/api/categories/', '/api/brands/']
+    for audience in audiences:
+        paths += [
+            f'/api/products/?audience={audience}',
+            f'/api/categories/?audience={audience}',
+            f'/api/brands/?audience={audience}',
+        ]
+
+    for slug in Category.objects.values_list('slug', flat=True):
+        paths.append(f'/api/products/?category={slug}')
+        paths += [f'/api/products/?category={slug}&audience={audience}' for audience in audiences]
+
+    brands = Brand.objects.annotate(product_count=Count('products')).values_list('slug', 'product_count')
+    for slug, product_count in brands:
+        pages = min(brand_pages, -(-product_count // page_size))  # división hacia arriba
+        paths.append(f'/api/products/?brand={slug}')
+        paths += [f'/api/products/?brand={slug}&page={page}' for page in range(2, pages + 1)]
+
+    paths += settings.WARMUP_PATHS
+    return list(dict.fromkeys(paths))
+
+
+def paths_from_access_log(lines, top=200):
+    """Las `top` rutas GET del catálogo con respuesta 200 más frecuentes del log."""
+    counts = Counter()
+    for line in lines:
+        match = ACCESS_LOG_LINE.search(line)
+        if match and match['status'] == '200' and match['path'].startswith(CATALOG_PREFIXES):
+            counts[match['path']] += 1
+    return [path for path, _ in counts.most_common(top)]
+
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+def preload_file(path, chunk_size=1024 * 1024):
+    """Lee el archivo completo y retorna los bytes leídos (0 si no existe)."""
+    try:
+        with open(path, 'rb') as handle:
+            return sum(len(chunk) for chunk in iter(lambda: handle.read(chunk_size), b''))
+    except OSError:
+        return 0
+
+
+def _image_files(data):
+    """Archivos en MEDIA_ROOT de los campos `image` de una respuesta del catálogo."""
+    items = data.get('results', []) if isinstance(data, dict) else data
+    for item in items if isinstance(items, list) else []:
+        url = item.get('image') if isinstance(item, dict) else None
+        path = urlparse(url).path if url else ''
+        if path.startswith(settings.MEDIA_URL):
+            yield Path(settings.MEDIA_ROOT) / path.removeprefix(settings.MEDIA_URL)
+
+
+def _fetch(client, base_url, path):
+    """Una petición. Retorna (ruta, status, segundos, imágenes de la respuesta)."""
+    started = time.perf_counter()
+    if base_url:
+        request = Request(base_url.rstrip('/') + path, headers={'Accept-Encoding': 'gzip'})
+        try:
+            with urlopen(request, timeout=60) as response:
+                response.read()
+                status = response.status
+        except HTTPError as error:
+            status = error.code
+        return path, status, time.perf_counter() - started, set()
+
+    response = client.get(path)
+    images = set(_image_files(getattr(response, 'data', None) or {}))
+    return path, response.status_code, time.perf_counter() - started, images
+
+
+def _warm_chunk(paths, host, base_url, own_thread=True):
+    client = None if base_url else Client(HTTP_HOST=host)
+    try:
+        return [_fetch(client, base_url, path) for path in paths]
+    finally:
+        if own_thread and client is not None:
+            connections.close_all()
+
+
+def warm_paths(paths, workers=4, host=None, base_url=None):
+    """
+    Pide `paths` repartidas en `workers` hilos y precarga las imágenes que
+    aparecen en las respuestas. Con `base_url` las peticiones van por HTTP a
+    un servidor en marcha; si no, se procesan en este proceso.
+
+    Retorna {'requests': [(ruta, status, segundos)], 'images': n, 'image_bytes': n}.
+    """
+    host = host or settings.WARMUP_HOST
+    if workers == 1:
+        # En este hilo: comparte la conexión (y la transacción de los tests)
+        results = _warm_chunk(paths, host, base_url, own_thread=False)
+    else:
+        chunks = [paths[n::workers] for n in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_warm_chunk, chunk, host, base_url) for chunk in chunks if chunk]
+            results = [row for future in futures for row in future.result()]
+
+    images = set().union(*(row[3] for row in results))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        image_bytes = sum(pool.map(preload_file, images))
+    return {
+        'requests': [row[:3] for row in results],
+        'images': len(images),
+        'image_bytes': image_bytes,
+    }
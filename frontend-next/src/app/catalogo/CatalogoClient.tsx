@@ -110,8 +110,8 @@ export function CatalogoClient() {
                     className="w-full sm:w-auto px-4 py-2.5 border border-slate-200 dark:border-slate-700 rounded-xl bg-white dark:bg-slate-800 text-slate-700 dark:text-slate-300 focus:outline-none focus:ring-2 focus:ring-primary text-sm min-h-[44px]"
                 >
                     <option value="-created_at">Más recientes</option>
-                    <option value="price">Precio: menor a mayor</option>
-                    <option value="-price">Precio: mayor a menor</option>
+                    <option value="current_price">Precio: menor a mayor</option>
+                    <option value="-current_price">Precio: mayor a menor</option>
                     <option value="name">Nombre: A-Z</option>
                     <option value="-name">Nombre: Z-A</option>
                 </select>
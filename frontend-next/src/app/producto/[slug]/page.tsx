@@ -6,7 +6,7 @@ import { Footer } from "@/components/layout/Footer";
 import { ProductCard } from "@/components/shop/ProductCard";
 import { WhatsAppButton } from "@/components/shop/WhatsAppButton";
 import { AddToCartButton } from "@/components/shop/AddToCartButton";
-import { getProductById, getProducts } from "@/services/productService";
+import { getProductById, getRelatedProducts } from "@/services/productService";
 
 // Imagen placeholder
 const PLACEHOLDER_IMAGE = "https://upload.wikimedia.org/wikipedia/commons/thumb/3/3f/Placeholder_view_vector.svg/681px-Placeholder_view_vector.svg.png";
@@ -26,11 +26,8 @@ export default async function ProductoPage({ params }: ProductPageProps) {
         notFound();
     }
 
-    // Obtener productos relacionados (excluyendo el actual)
-    const allProducts = await getProducts();
-    const relatedProducts = allProducts
-        .filter(p => p.id !== product.id)
-        .slice(0, 4);
+    // Productos relacionados precalculados en el backend
+    const relatedProducts = await getRelatedProducts(product.id, 4);
 
     // Determinar estilos de stock
     const getStockStyle = () => {
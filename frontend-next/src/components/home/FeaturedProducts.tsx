@@ -1,15 +1,16 @@
 import { ProductCard } from "@/components/shop/ProductCard";
-import { getProducts } from "@/services/productService";
+import { getStorefrontBootstrap } from "@/services/productService";
+import { toProductDisplay } from "@/types/product";
 import Link from "next/link";
 
 /**
  * Sección de productos destacados en la página principal.
- * Obtiene los primeros 4 productos desde la API de Django.
+ * Usa los destacados de /api/storefront/bootstrap/ (los más nuevos en stock).
  */
 export async function FeaturedProducts() {
     // Obtener productos desde la API
-    const allProducts = await getProducts();
-    const featuredProducts = allProducts.slice(0, 4);
+    const bootstrap = await getStorefrontBootstrap();
+    const featuredProducts = (bootstrap?.featured ?? []).map(toProductDisplay);
 
     // Si no hay productos, no renderizar la sección
     if (featuredProducts.length === 0) {
@@ -1,7 +1,8 @@
 "use client";
 
-import React, { createContext, useContext, useState, useEffect, useCallback, ReactNode } from "react";
+import React, { createContext, useContext, useState, useEffect, useCallback, useRef, ReactNode } from "react";
 import { ProductDisplay } from "@/types/product";
+import { getProductsByIds, releaseCartStock, reserveStock } from "@/services/productService";
 
 /**
  * Item del carrito con cantidad
@@ -31,6 +32,21 @@ interface CartContextType {
 const CartContext = createContext<CartContextType | undefined>(undefined);
 
 const CART_STORAGE_KEY = "dental-gest-cart";
+const CART_ID_STORAGE_KEY = "dental-gest-cart-id";
+// Renovar las reservas antes de que venzan (el backend las guarda 15 min)
+const RESERVATION_REFRESH_MS = 10 * 60 * 1000;
+
+/**
+ * Id aleatorio del carrito para las reservas de stock (se guarda en localStorage)
+ */
+function getCartId(): string {
+    let cartId = localStorage.getItem(CART_ID_STORAGE_KEY);
+    if (!cartId) {
+        cartId = crypto.randomUUID();
+        localStorage.setItem(CART_ID_STORAGE_KEY, cartId);
+    }
+    return cartId;
+}
 
 /**
  * Provider del carrito de compras
@@ -53,6 +69,31 @@ export function CartProvider({ children }: { children: ReactNode }) {
         setIsHydrated(true);
     }, []);
 
+    // Refrescar precios y stock del carrito guardado con una sola petición
+    useEffect(() => {
+        if (!isHydrated) {
+            return;
+        }
+        const ids = items.map((item) => item.product.id);
+        if (ids.length === 0) {
+            return;
+        }
+        getProductsByIds(ids).then((freshProducts) => {
+            if (freshProducts.length === 0) {
+                return;
+            }
+            const byId = new Map(freshProducts.map((product) => [product.id, product]));
+            setItems((currentItems) =>
+                currentItems.map((item) => ({
+                    ...item,
+                    product: byId.get(item.product.id) ?? item.product,
+                }))
+            );
+        });
+        // Solo al hidratar: los cambios posteriores ya traen datos frescos
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [isHydrated]);
+
     // Guardar carrito en localStorage cuando cambia
     useEffect(() => {
         if (isHydrated) {
@@ -60,6 +101,59 @@ export function CartProvider({ children }: { children: ReactNode }) {
         }
     }, [items, isHydrated]);
 
+    // Reservar stock de las cantidades que cambiaron; si no alcanza, ajustar al máximo
+    const reserved = useRef(new Map<number, number>());
+    useEffect(() => {
+        if (!isHydrated) {
+            return;
+        }
+        const cartId = getCartId();
+        const wanted = new Map(items.map((item) => [item.product.id, item.quantity]));
+        reserved.current.forEach((_, productId) => {
+            if (!wanted.has(productId)) {
+                wanted.set(productId, 0);
+            }
+        });
+        wanted.forEach((quantity, productId) => {
+            if (reserved.current.get(productId) === quantity) {
+                return;
+            }
+            reserved.current.set(productId, quantity);
+            reserveStock(cartId, productId, quantity).then((reservation) => {
+                if (!reservation || reservation.quantity >= quantity) {
+                    return;
+                }
+                reserved.current.set(productId, reservation.quantity);
+                setItems((currentItems) =>
+                    currentItems
+                        .map((item) =>
+                            item.product.id === productId
+                                ? { ...item, quantity: Math.min(item.quantity, reservation.available) }
+                                : item
+                        )
+                        .filter((item) => item.quantity > 0)
+                );
+            });
+        });
+        reserved.current.forEach((quantity, productId) => {
+            if (quantity === 0) {
+                reserved.current.delete(productId);
+            }
+        });
+    }, [items, isHydrated]);
+
+    // Renovar las reservas mientras el carrito sigue abierto en la pestaña
+    useEffect(() => {
+        if (!isHydrated || items.length === 0) {
+            return;
+        }
+        const timer = setInterval(() => {
+            const cartId = getCartId();
+            items.forEach((item) => reserveStock(cartId, item.product.id, item.quantity));
+        }, RESERVATION_REFRESH_MS);
+        return () => clearInterval(timer);
+    }, [items, isHydrated]);
+
     // Añadir producto al carrito
     const addToCart = useCallback((product: ProductDisplay, quantity: number = 1) => {
         setItems((currentItems) => {
@@ -103,6 +197,8 @@ export function CartProvider({ children }: { children: ReactNode }) {
     // Limpiar carrito
     const clearCart = useCallback(() => {
         setItems([]);
+        reserved.current.clear();
+        releaseCartStock(getCartId());
     }, []);
 
     // Obtener cantidad total de items
@@ -1,7 +1,7 @@
 /**
  * Servicio de API para consumir datos del backend Django
  */
-import { Product, Category, Brand, PaginatedResponse, ProductDisplay, toProductDisplay } from '@/types/product';
+import { Product, Category, Brand, PaginatedResponse, ProductDisplay, StockReservation, StorefrontBootstrap, Suggestion, toProductDisplay } from '@/types/product';
 
 // URL base de la API Django
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://127.0.0.1:8000/api';
@@ -107,6 +107,115 @@ export async function getProductById(id: number): Promise<ProductDisplay | null>
     }
 }
 
+/**
+ * Productos relacionados precalculados por el backend (máx. 8).
+ */
+export async function getRelatedProducts(id: number, limit = 4): Promise<ProductDisplay[]> {
+    try {
+        const response = await fetch(`${API_URL}/products/${id}/related/?limit=${limit}`, {
+            cache: 'no-store',
+        });
+
+        if (!response.ok) {
+            throw new Error(`API Error: ${response.status}`);
+        }
+
+        const data: Product[] = await response.json();
+        return data.map(toProductDisplay);
+    } catch (error) {
+        console.error(`Error fetching related products for ${id}:`, error);
+        return [];
+    }
+}
+
+/**
+ * Obtiene varios productos por ID en una sola petición (máx. 50).
+ * Respeta el orden de `ids` y omite los que ya no existen.
+ */
+export async function getProductsByIds(ids: number[]): Promise<ProductDisplay[]> {
+    if (ids.length === 0) {
+        return [];
+    }
+    try {
+        const params = new URLSearchParams({ ids: ids.join(',') });
+        const response = await fetch(`${API_URL}/products/batch/?${params.toString()}`, {
+            cache: 'no-store',
+        });
+
+        if (!response.ok) {
+            throw new Error(`API Error: ${response.status}`);
+        }
+
+        const data: Product[] = await response.json();
+        return data.map(toProductDisplay);
+    } catch (error) {
+        console.error('Error fetching products batch:', error);
+        return [];
+    }
+}
+
+/**
+ * Categorías, marcas, destacados, ofertas y la primera página del catálogo
+ * en una sola petición (para el primer render de la home).
+ * @param audience - Filtro opcional por audiencia (STUDENT, PROFESSIONAL, GENERAL)
+ */
+export async function getStorefrontBootstrap(audience?: string): Promise<StorefrontBootstrap | null> {
+    try {
+        const params = new URLSearchParams();
+        if (audience) {
+            params.append('audience', audience);
+        }
+        const queryString = params.toString();
+        const response = await fetch(`${API_URL}/storefront/bootstrap/${queryString ? `?${queryString}` : ''}`, {
+            cache: 'no-store',
+        });
+
+        if (!response.ok) {
+            throw new Error(`API Error: ${response.status}`);
+        }
+
+        return await response.json();
+    } catch (error) {
+        console.error('Error fetching storefront bootstrap:', error);
+        return null;
+    }
+}
+
+/**
+ * Aparta `quantity` unidades para el carrito (0 libera) y renueva el vencimiento.
+ * Sin stock suficiente (409) también devuelve la reserva, con el máximo en `available`.
+ * null si la petición falla: el carrito sigue funcionando sin reserva.
+ */
+export async function reserveStock(cartId: string, productId: number, quantity: number): Promise<StockReservation | null> {
+    try {
+        const response = await fetch(`${API_URL}/cart/${cartId}/reservations/${productId}/`, {
+            method: 'PUT',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ quantity }),
+        });
+
+        if (!response.ok && response.status !== 409) {
+            throw new Error(`API Error: ${response.status}`);
+        }
+
+        return await response.json();
+    } catch (error) {
+        console.error(`Error reserving stock for ${productId}:`, error);
+        return null;
+    }
+}
+
+/**
+ * Libera todas las reservas del carrito (carrito vaciado).
+ */
+export async function releaseCartStock(cartId: string): Promise<void> {
+    try {
+        await fetch(`${API_URL}/cart/${cartId}/reservations/`, { method: 'DELETE' });
+    } catch (error) {
+        console.error('Error releasing cart stock:', error);
+    }
+}
+
 /**
  * Obtiene todas las categorías
  * @param audience - Filtro opcional por audiencia (STUDENT, PROFESSIONAL, GENERAL)
@@ -196,3 +305,29 @@ export async function getProductsByCategory(categorySlug: string): Promise<Produ
 export async function searchProducts(query: string): Promise<ProductDisplay[]> {
     return getProducts({ search: query });
 }
+
+/**
+ * Sugerencias mientras se escribe (productos, marcas y categorías).
+ * Responde desde un índice en memoria: apto para llamar en cada tecla.
+ */
+export async function getSuggestions(query: string, audience?: string): Promise<Suggestion[]> {
+    if (!query.trim()) {
+        return [];
+    }
+    try {
+        const params = new URLSearchParams({ q: query });
+        if (audience) {
+            params.append('audience', audience);
+        }
+        const response = await fetch(`${API_URL}/products/suggest/?${params.toString()}`);
+
+        if (!response.ok) {
+            throw new Error(`API Error: ${response.status}`);
+        }
+
+        return await response.json();
+    } catch (error) {
+        console.error('Error fetching suggestions:', error);
+        return [];
+    }
+}
@@ -72,6 +72,41 @@ export interface PaginatedResponse<T> {
     results: T[];
 }
 
+/**
+ * Datos iniciales de la tienda de /api/storefront/bootstrap/
+ */
+export interface StorefrontBootstrap {
+    audience: 'STUDENT' | 'PROFESSIONAL' | 'GENERAL' | null;
+    categories: Category[];
+    brands: Brand[];
+    featured: Product[];
+    discounted: Product[];
+    products: PaginatedResponse<Product>;
+}
+
+/**
+ * Reserva de stock de un carrito (/api/cart/{id}/reservations/)
+ * `available` es lo máximo que el carrito puede apartar del producto.
+ */
+export interface StockReservation {
+    product: number;
+    quantity: number;
+    expires_at: string | null;
+    available: number;
+}
+
+/**
+ * Sugerencia de búsqueda de /api/products/suggest/
+ */
+export interface Suggestion {
+    type: 'product' | 'brand' | 'category';
+    id: number;
+    name: string;
+    slug: string | null;    // null para productos
+    audience: 'STUDENT' | 'PROFESSIONAL' | 'GENERAL';
+    in_stock: boolean;
+}
+
 /**
  * Tipo simplificado para usar en componentes
  */